@@ -0,0 +1,110 @@
+using System;
+using System.Diagnostics;
+using System.Text;
+
+// Escape throughput (input MB/s) for text (HTML, JSON) and random binary payloads:
+// the byte-at-a-time escape loop versus DataEscaper, and the base64 and hex data
+// encodings with the output bytes each writes per input byte.
+// Run: dotnet run -c Release --project bench/EscapeBench
+
+var random = new Random(1);
+var binary = new byte[64 * 1024];
+random.NextBytes(binary);
+var text = new byte[64 * 1024];
+var sample = Encoding.ASCII.GetBytes("HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n\r\n{\"id\": 42, \"name\": \"rawprox\", \"ratio\": \"100%\", \"path\": \"C:\\\\logs\"}\n");
+for (int i = 0; i < text.Length; i++) text[i] = sample[i % sample.Length];
+var html = new byte[64 * 1024];
+var page = Encoding.ASCII.GetBytes("<p class=article>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor incididunt ut labore et dolore magna aliqua.</p>\n");
+for (int i = 0; i < html.Length; i++) html[i] = page[i % page.Length];
+
+var expected = new byte[binary.Length * 3];
+var actual = new byte[binary.Length * 3];
+for (int i = 0; i < 2000; i++)
+{
+    var data = new byte[random.Next(0, 2000)];
+    random.NextBytes(data);
+    if (i % 2 == 0)
+    {
+        for (int j = 0; j < data.Length; j++) data[j] = (byte)(data[j] % 0x80);
+    }
+    var n = Scalar(data, expected);
+    var m = DataEscaper.Escape(data, actual);
+    if (!expected.AsSpan(0, n).SequenceEqual(actual.AsSpan(0, m)))
+    {
+        Console.WriteLine("MISMATCH");
+        return 1;
+    }
+}
+Console.WriteLine("output: identical on 2000 random payloads");
+
+Run("html   scalar    ", html, data => Scalar(data, actual));
+Run("html   vectorized", html, data => DataEscaper.Escape(data, actual));
+Run("json   scalar    ", text, data => Scalar(data, actual));
+Run("json   vectorized", text, data => DataEscaper.Escape(data, actual));
+Run("binary scalar    ", binary, data => Scalar(data, actual));
+Run("binary vectorized", binary, data => DataEscaper.Escape(data, actual));
+
+var encoded = new byte[DataEscaper.MaxBase64Length(binary.Length)];
+if (!encoded.AsSpan(0, DataEscaper.Base64Encode(binary, encoded)).SequenceEqual(Encoding.ASCII.GetBytes(Convert.ToBase64String(binary)))
+    || !actual.AsSpan(0, DataEscaper.Hex(binary, actual)).SequenceEqual(Encoding.ASCII.GetBytes(Convert.ToHexString(binary).ToLowerInvariant())))
+{
+    Console.WriteLine("MISMATCH");
+    return 1;
+}
+Console.WriteLine($"auto: {(DataEscaper.PrefersBase64(text) ? "base64" : "url")} for json, {(DataEscaper.PrefersBase64(binary) ? "base64" : "url")} for binary");
+Console.WriteLine();
+foreach (var (name, data) in new[] { ("json  ", text), ("binary", binary) })
+{
+    Console.WriteLine($"{name} output bytes per input byte: url {(double)DataEscaper.Escape(data, actual) / data.Length:N2}, base64 {(double)DataEscaper.Base64Encode(data, encoded) / data.Length:N2}, hex 2.00");
+}
+Run("binary url       ", binary, data => DataEscaper.Escape(data, actual));
+Run("binary base64    ", binary, data => DataEscaper.Base64Encode(data, encoded));
+Run("binary hex       ", binary, data => DataEscaper.Hex(data, actual));
+Run("binary auto pick ", binary, data => DataEscaper.PrefersBase64(data) ? 1 : 0);
+return 0;
+
+static void Run(string name, byte[] data, Func<byte[], int> escape)
+{
+    for (int i = 0; i < 2000; i++) escape(data);
+    const int count = 5000;
+    var stopwatch = Stopwatch.StartNew();
+    for (int i = 0; i < count; i++) escape(data);
+    stopwatch.Stop();
+    Console.WriteLine($"{name}  {(double)data.Length * count / stopwatch.Elapsed.TotalSeconds / 1e6,8:N0} MB/s");
+}
+
+// Byte-at-a-time loop used by EventWriter before DataEscaper
+static int Scalar(ReadOnlySpan<byte> data, byte[] buffer)
+{
+    const string hex = "0123456789ABCDEF";
+    var length = 0;
+    foreach (var b in data)
+    {
+        if (b == 0x25)
+        {
+            buffer[length++] = (byte)'%';
+            buffer[length++] = (byte)'2';
+            buffer[length++] = (byte)'5';
+        }
+        else if (b == 0x09 || b == 0x0A || b == 0x0D)
+        {
+            buffer[length++] = (byte)'\\';
+            buffer[length++] = b == 0x09 ? (byte)'t' : b == 0x0A ? (byte)'n' : (byte)'r';
+        }
+        else if (b >= 0x20 && b <= 0x7E)
+        {
+            if (b == '"' || b == '\\')
+            {
+                buffer[length++] = (byte)'\\';
+            }
+            buffer[length++] = b;
+        }
+        else
+        {
+            buffer[length++] = (byte)'%';
+            buffer[length++] = (byte)hex[b >> 4];
+            buffer[length++] = (byte)hex[b & 0xF];
+        }
+    }
+    return length;
+}
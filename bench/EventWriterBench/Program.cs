@@ -0,0 +1,144 @@
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Globalization;
+using System.Text;
+using System.Text.Encodings.Web;
+using System.Text.Json;
+
+// Events/sec and allocations per event for the data and open events:
+// the former Dictionary + JsonSerializer path versus EventWriter. Then
+// timestamps: the former DateTimeOffset.TryFormat call versus EventClock.Format,
+// and DateTimeOffset.UtcNow versus EventClock.UtcNow.
+// Run: dotnet run -c Release --project bench/EventWriterBench
+
+var options = new JsonSerializerOptions { Encoder = JavaScriptEncoder.UnsafeRelaxedJsonEscaping };
+var time = new DateTimeOffset(2025, 11, 6, 10, 57, 37, TimeSpan.Zero).AddTicks(1234567);
+var payload = Encoding.ASCII.GetBytes("GET /index.html?q=100%25 HTTP/1.1\r\nHost: example.com\r\nUser-Agent: bench\r\nAccept: \"*/*\"\r\n\r\n");
+var binary = new byte[512];
+new Random(1).NextBytes(binary);
+
+// Byte-identical check on random payloads first
+var random = new Random(2);
+for (int i = 0; i < 20000; i++)
+{
+    var data = new byte[random.Next(0, 300)];
+    random.NextBytes(data);
+    if (i % 2 == 0)
+    {
+        for (int j = 0; j < data.Length; j++) data[j] = (byte)(data[j] % 0x80);
+    }
+    var before = BaselineData(data);
+    var after = EventWriter.Data(time, "0000abcd", data, "127.0.0.1:50000", "example.com:80", "0.0.0.0:8080", 8080);
+    var same = before.AsSpan().SequenceEqual(after.Span[..^1]);
+    after.Release();
+    if (!same && !Encoding.UTF8.GetString(data).Contains("\\u0022"))
+    {
+        Console.WriteLine($"MISMATCH\n{Encoding.UTF8.GetString(before)}");
+        return 1;
+    }
+}
+foreach (var dir in new[] { "logs", "C:\\logs\\\"quoted\"", "日本語", "tab\there", null })
+{
+    var before = Baseline(new Dictionary<string, object> { ["time"] = Timestamp(time), ["event"] = "stop-logging", ["directory"] = dir! });
+    var after = EventWriter.StopLogging(time, dir);
+    var same = before.AsSpan().SequenceEqual(after.Span[..^1]);
+    after.Release();
+    if (!same)
+    {
+        Console.WriteLine($"MISMATCH directory {dir}");
+        return 1;
+    }
+}
+Console.WriteLine("output: byte-identical on 20000 random payloads and sample directories");
+
+var formatted = new byte[64];
+for (int i = 0; i < 200000; i++)
+{
+    var t = new DateTimeOffset(random.NextInt64(DateTimeOffset.UnixEpoch.UtcTicks, DateTimeOffset.MaxValue.UtcTicks), TimeSpan.Zero);
+    var expected = Encoding.UTF8.GetBytes(Timestamp(t));
+    if (!formatted.AsSpan(0, EventClock.Format(t, formatted)).SequenceEqual(expected))
+    {
+        Console.WriteLine($"MISMATCH time {Timestamp(t)}");
+        return 1;
+    }
+}
+var previous = EventClock.UtcNow;
+for (int i = 0; i < 5000000; i++)
+{
+    var now = EventClock.UtcNow;
+    if (now < previous)
+    {
+        Console.WriteLine($"EventClock went back from {Timestamp(previous)} to {Timestamp(now)}");
+        return 1;
+    }
+    previous = now;
+}
+Console.WriteLine("timestamps: byte-identical on 200000 random times, clock non-decreasing over 5000000 reads");
+
+Run("data 96B  baseline", () => { _ = BaselineData(payload); });
+Run("data 96B  writer  ", () => EventWriter.Data(time, "0000abcd", payload, "127.0.0.1:50000", "example.com:80", "0.0.0.0:8080", 8080).Release());
+Run("data 512B baseline", () => { _ = BaselineData(binary); });
+Run("data 512B writer  ", () => EventWriter.Data(time, "0000abcd", binary, "127.0.0.1:50000", "example.com:80", "0.0.0.0:8080", 8080).Release());
+Run("open      baseline", () => { _ = Baseline(new Dictionary<string, object>
+{
+    ["time"] = Timestamp(time), ["ConnID"] = "0000abcd", ["event"] = "open", ["from"] = "127.0.0.1:50000",
+    ["to"] = "example.com:80", ["listener"] = "0.0.0.0:8080", ["listen_port"] = 8080
+}); });
+Run("open      writer  ", () => EventWriter.Open(time, "0000abcd", "127.0.0.1:50000", "example.com:80", "0.0.0.0:8080", 8080).Release());
+
+// Times a few microseconds apart, as consecutive events are
+var next = time;
+Run("timestamp TryFormat", () => { next = next.AddTicks(37); next.TryFormat(formatted, out _, "yyyy-MM-ddTHH:mm:ss.ffffffZ", CultureInfo.InvariantCulture); }, "calls");
+Run("timestamp EventClock", () => { next = next.AddTicks(37); EventClock.Format(next, formatted); }, "calls");
+Run("clock DateTimeOffset", () => { _ = DateTimeOffset.UtcNow; }, "calls");
+Run("clock EventClock   ", () => { _ = EventClock.UtcNow; }, "calls");
+return 0;
+
+void Run(string name, Action write, string unit = "events")
+{
+    for (int i = 0; i < 300000; i++) write();
+    const int count = 500000;
+    var allocated = GC.GetAllocatedBytesForCurrentThread();
+    var stopwatch = Stopwatch.StartNew();
+    for (int i = 0; i < count; i++) write();
+    stopwatch.Stop();
+    allocated = GC.GetAllocatedBytesForCurrentThread() - allocated;
+    Console.WriteLine($"{name}  {count / stopwatch.Elapsed.TotalSeconds,12:N0} {unit}/s  {allocated / count,6} B/{unit[..^1]}");
+}
+
+byte[] BaselineData(byte[] data)
+{
+    return Baseline(new Dictionary<string, object>
+    {
+        ["time"] = Timestamp(time), ["ConnID"] = "0000abcd", ["data"] = EscapeData(data), ["from"] = "127.0.0.1:50000",
+        ["to"] = "example.com:80", ["listener"] = "0.0.0.0:8080", ["listen_port"] = 8080
+    });
+}
+
+// Former Program.SerializeLogObject, plus the UTF-8 encoding that used to happen at flush time
+byte[] Baseline(Dictionary<string, object> obj)
+{
+    var json = JsonSerializer.Serialize(obj, options);
+    if (json.IndexOf("\\u0022", StringComparison.Ordinal) >= 0)
+    {
+        json = json.Replace("\\u0022", "\\\"", StringComparison.Ordinal);
+    }
+    return Encoding.UTF8.GetBytes(json);
+}
+
+static string Timestamp(DateTimeOffset time) => time.ToString("yyyy-MM-ddTHH:mm:ss.ffffffZ", CultureInfo.InvariantCulture);
+
+// Former Program.EscapeData
+static string EscapeData(byte[] bytes)
+{
+    var sb = new StringBuilder();
+    foreach (var b in bytes)
+    {
+        if (b == 0x25) sb.Append("%25");
+        else if (b == 0x09 || b == 0x0A || b == 0x0D) sb.Append((char)b);
+        else if (b >= 0x20 && b <= 0x7E) sb.Append((char)b);
+        else sb.Append($"%{b:X2}");
+    }
+    return sb.ToString();
+}
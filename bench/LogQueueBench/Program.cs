@@ -0,0 +1,100 @@
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Threading;
+
+// Queued events/sec with 1 to N producer threads and one consumer draining in a
+// loop: the former shared ConcurrentQueue per destination versus LogRings. Each
+// producer logs for 64 connections; the rings' output is checked to keep every
+// connection's events in order.
+// Run: dotnet run -c Release --project bench/LogQueueBench
+
+const int EventsPerProducer = 2_000_000;
+const int ConnectionsPerProducer = 64;
+
+var slab = new LogSlab(new byte[1]);
+var time = DateTimeOffset.UtcNow;
+var producerCounts = new SortedSet<int> { 1, 2, 4, Environment.ProcessorCount };
+foreach (var producers in producerCounts)
+{
+    Run($"{producers,2} producers  ConcurrentQueue", producers, () =>
+    {
+        var queue = new ConcurrentQueue<LogLine>();
+        var batch = new List<LogLine>();
+        return (line => queue.Enqueue(line), () =>
+        {
+            while (queue.TryDequeue(out var line)) batch.Add(line);
+            var count = batch.Count;
+            batch.Clear();
+            return count;
+        });
+    });
+    Run($"{producers,2} producers  LogRings       ", producers, () => Rings(check: false));
+}
+
+// Untimed: every connection's events come out of the rings in order
+Run("order check          ", 4, () => Rings(check: true));
+Console.WriteLine("order: every connection's events drained in order");
+
+(Action<LogLine>, Func<int>) Rings(bool check)
+{
+    var rings = new LogRings(0, 1024);
+    var batch = new List<LogLine>();
+    var last = new Dictionary<string, int>();
+    return (line =>
+    {
+        var spin = new SpinWait();
+        while (!rings.TryEnqueue(line, out _)) spin.SpinOnce();
+    }, () =>
+    {
+        rings.Drain(batch);
+        if (check)
+        {
+            foreach (var line in batch)
+            {
+                if (last.TryGetValue(line.ConnId!, out var previous) && line.Offset <= previous)
+                {
+                    throw new InvalidOperationException($"{line.ConnId}: event {line.Offset} after {previous}");
+                }
+                last[line.ConnId!] = line.Offset;
+            }
+        }
+        var count = batch.Count;
+        batch.Clear();
+        return count;
+    });
+}
+
+void Run(string name, int producers, Func<(Action<LogLine> Enqueue, Func<int> Drain)> create)
+{
+    var (enqueue, drain) = create();
+    var connIds = new string[producers * ConnectionsPerProducer];
+    for (int i = 0; i < connIds.Length; i++) connIds[i] = i.ToString("x8");
+    var total = (long)producers * EventsPerProducer;
+    var threads = new Thread[producers];
+    var stopwatch = Stopwatch.StartNew();
+    for (int p = 0; p < producers; p++)
+    {
+        var first = p * ConnectionsPerProducer;
+        threads[p] = new Thread(() =>
+        {
+            // The offset field carries each connection's event number
+            for (int i = 0; i < EventsPerProducer; i++)
+            {
+                enqueue(new LogLine(slab, i / ConnectionsPerProducer, 100, time, connIds[first + i % ConnectionsPerProducer]));
+            }
+        });
+        threads[p].Start();
+    }
+    var drained = 0L;
+    while (drained < total)
+    {
+        var count = drain();
+        drained += count;
+        if (count == 0) Thread.Yield();
+    }
+    stopwatch.Stop();
+    foreach (var thread in threads) thread.Join();
+    Console.WriteLine($"{name}  {total / stopwatch.Elapsed.TotalSeconds,14:N0} events/s");
+}
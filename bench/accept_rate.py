@@ -0,0 +1,128 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = []
+# ///
+"""
+Connection-storm benchmark for --listeners.
+
+Starts a local target that accepts and immediately closes, runs RawProx in front
+of it with 1, 2, 4... SO_REUSEPORT listeners (logging stopped through MCP so only
+accept/connect/teardown is measured), and hammers the proxy from several client
+processes. Prints completed proxied connections per second for each listener count.
+
+Usage: python bench/accept_rate.py [--seconds S] [--clients C] [--listeners 1,2,4,8]
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+RAWPROX = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'release', 'rawprox.exe')
+
+def find_free_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def run_target(port, ready):
+    """Accept-and-close target; one accept thread per core."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', port))
+    server.listen(4096)
+
+    def loop():
+        while True:
+            conn, _ = server.accept()
+            conn.close()
+
+    for _ in range(max(1, os.cpu_count() or 1)):
+        threading.Thread(target=loop, daemon=True).start()
+    ready.set()
+    threading.Event().wait()
+
+def run_client(port, seconds, results):
+    """Connect, wait for the proxied close, repeat until the deadline."""
+    completed = 0
+    errors = 0
+    deadline = time.time() + seconds
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=5) as s:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, b'\x01\x00\x00\x00\x00\x00\x00\x00')
+                while s.recv(4096):
+                    pass
+            completed += 1
+        except OSError:
+            errors += 1
+    results.put((completed, errors))
+
+def mcp_call(endpoint, tool, arguments=None):
+    body = json.dumps({'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+                       'params': {'name': tool, 'arguments': arguments or {}}}).encode()
+    request = urllib.request.Request(endpoint, data=body, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+def measure(listeners, target_port, seconds, clients):
+    local_port = find_free_port()
+    process = subprocess.Popen(
+        [RAWPROX, '--mcp-port', '0', '--listeners', str(listeners), f'{local_port}:127.0.0.1:{target_port}'],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True
+    )
+    try:
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        mcp_call(endpoint, 'stop-logging')
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+        time.sleep(0.5)
+
+        results = multiprocessing.Queue()
+        workers = [multiprocessing.Process(target=run_client, args=(local_port, seconds, results))
+                   for _ in range(clients)]
+        started = time.time()
+        for worker in workers:
+            worker.start()
+        totals = [results.get() for _ in workers]
+        elapsed = time.time() - started
+        for worker in workers:
+            worker.join()
+
+        completed = sum(t[0] for t in totals)
+        errors = sum(t[1] for t in totals)
+        return completed / elapsed, errors
+    finally:
+        process.kill()
+        process.wait(timeout=5)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--clients', type=int, default=max(4, 2 * (os.cpu_count() or 1)))
+    parser.add_argument('--listeners', default='1,2,4')
+    options = parser.parse_args()
+
+    target_port = find_free_port()
+    ready = multiprocessing.Event()
+    target = multiprocessing.Process(target=run_target, args=(target_port, ready), daemon=True)
+    target.start()
+    ready.wait()
+
+    print(f'cores={os.cpu_count()} clients={options.clients} seconds={options.seconds}')
+    print(f'{"listeners":>9} {"conn/s":>10} {"errors":>7}')
+    for listeners in [int(n) for n in options.listeners.split(',')]:
+        rate, errors = measure(listeners, target_port, options.seconds, options.clients)
+        print(f'{listeners:>9} {rate:>10.0f} {errors:>7}')
+
+    target.terminate()
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,304 @@
+using System;
+using System.Buffers.Binary;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Text;
+using System.Threading;
+
+/// <summary>
+/// Writes log events as length-prefixed binary records (--log-format binary) into the
+/// <see cref="LogArena"/>. Every record is a type byte, the body length as a 32-bit
+/// little-endian integer, and the body, which starts with the event time in UTC
+/// ticks (64-bit). Connection endpoints are written once per connection and file in
+/// an open or declare record; data and close records refer to the connection by its
+/// index, and data records carry the payload bytes as they are. <c>rawprox --decode</c>
+/// turns the records back into the same NDJSON lines <see cref="EventWriter"/> writes.
+/// </summary>
+/// <remarks>
+/// Bodies, after the time:
+/// <list type="bullet">
+/// <item>open, declare: index u32, listen_port u16, then ConnID, client, target and
+/// listener endpoints as UTF-8 strings with a u16 length</item>
+/// <item>data: index u32, flags u8 (1 = from the client, 2 = truncated, 4 = coalesced),
+/// the original payload length u32 when truncated, the chunk count u32 and the last
+/// chunk's time in ticks i64 when coalesced, payload</item>
+/// <item>close: index u32, then bytes and chunks from the client and from the
+/// target (u64 each) and the duration in ticks (i64)</item>
+/// <item>event: any other event as its NDJSON line without the newline</item>
+/// </list>
+/// </remarks>
+static class BinaryEventWriter
+{
+    public const byte OpenRecord = 1;
+    public const byte DataRecord = 2;
+    public const byte CloseRecord = 3;
+    public const byte EventRecord = 4;
+    /// <summary>Endpoints of a connection opened before the file's first record of it; not an open event.</summary>
+    public const byte DeclareRecord = 5;
+
+    public const int HeaderLength = 5;
+    public const byte FromClient = 1;
+    public const byte Truncated = 2;
+    public const byte Coalesced = 4;
+    private const int CloseBodyLength = 52;
+
+    [ThreadStatic] private static byte[]? _scratch;
+
+    public static LogLine Open(DateTimeOffset time, uint index, string connId)
+    {
+        ConnectionTable.TryGetBody(index, out var body);
+        var header = Scratch(HeaderLength);
+        WriteHeader(header, OpenRecord, body.Length);
+        return LogArena.AppendRecord(header.AsSpan(0, HeaderLength), body, time, connId);
+    }
+
+    /// <param name="truncatedFrom">Original payload length when <paramref name="data"/> was cut short by the truncate overflow policy, otherwise -1.</param>
+    /// <param name="chunks">Chunks coalesced into the event, the last one read at <paramref name="lastTime"/>.</param>
+    public static LogLine Data(DateTimeOffset time, uint index, string connId, bool fromClient, ReadOnlySpan<byte> data, int truncatedFrom = -1,
+        int chunks = 1, DateTimeOffset lastTime = default)
+    {
+        var fixedLength = 13 + (truncatedFrom >= 0 ? 4 : 0) + (chunks > 1 ? 12 : 0);
+        var header = Scratch(HeaderLength + fixedLength);
+        WriteHeader(header, DataRecord, fixedLength + data.Length);
+        var body = header.AsSpan(HeaderLength, fixedLength);
+        BinaryPrimitives.WriteInt64LittleEndian(body, time.UtcTicks);
+        BinaryPrimitives.WriteUInt32LittleEndian(body[8..], index);
+        body[12] = (byte)((fromClient ? FromClient : 0) | (truncatedFrom >= 0 ? Truncated : 0) | (chunks > 1 ? Coalesced : 0));
+        var rest = body[13..];
+        if (truncatedFrom >= 0)
+        {
+            BinaryPrimitives.WriteInt32LittleEndian(rest, truncatedFrom);
+            rest = rest[4..];
+        }
+        if (chunks > 1)
+        {
+            BinaryPrimitives.WriteInt32LittleEndian(rest, chunks);
+            BinaryPrimitives.WriteInt64LittleEndian(rest[4..], lastTime.UtcTicks);
+        }
+        // Header and payload go into the arena back to back: the payload is copied once
+        return LogArena.AppendRecord(header.AsSpan(0, HeaderLength + fixedLength), data, time, connId);
+    }
+
+    public static LogLine Close(DateTimeOffset time, uint index, string connId, ConnectionTotals totals)
+    {
+        var record = Scratch(HeaderLength + CloseBodyLength);
+        WriteHeader(record, CloseRecord, CloseBodyLength);
+        var body = record.AsSpan(HeaderLength, CloseBodyLength);
+        BinaryPrimitives.WriteInt64LittleEndian(body, time.UtcTicks);
+        BinaryPrimitives.WriteUInt32LittleEndian(body[8..], index);
+        BinaryPrimitives.WriteInt64LittleEndian(body[12..], totals.BytesFromClient);
+        BinaryPrimitives.WriteInt64LittleEndian(body[20..], totals.BytesFromTarget);
+        BinaryPrimitives.WriteInt64LittleEndian(body[28..], totals.ChunksFromClient);
+        BinaryPrimitives.WriteInt64LittleEndian(body[36..], totals.ChunksFromTarget);
+        BinaryPrimitives.WriteInt64LittleEndian(body[44..], totals.Duration.Ticks);
+        return LogArena.AppendRecord(record.AsSpan(0, HeaderLength + CloseBodyLength), ReadOnlySpan<byte>.Empty, time, connId);
+    }
+
+    /// <summary>Totals of a close record, whose body starts after the time and index.</summary>
+    public static ConnectionTotals ReadTotals(ReadOnlySpan<byte> body)
+    {
+        return new ConnectionTotals(BinaryPrimitives.ReadInt64LittleEndian(body), BinaryPrimitives.ReadInt64LittleEndian(body[8..]),
+            BinaryPrimitives.ReadInt64LittleEndian(body[16..]), BinaryPrimitives.ReadInt64LittleEndian(body[24..]),
+            TimeSpan.FromTicks(BinaryPrimitives.ReadInt64LittleEndian(body[32..])));
+    }
+
+    /// <summary>Wraps an NDJSON control event (start-logging, capture-gap, ...) in an event record.</summary>
+    public static LogLine Event(LogLine line)
+    {
+        var json = line.Span[..^1];
+        var record = Scratch(HeaderLength + 8);
+        WriteHeader(record, EventRecord, 8 + json.Length);
+        BinaryPrimitives.WriteInt64LittleEndian(record.AsSpan(HeaderLength), line.Time.UtcTicks);
+        return LogArena.AppendRecord(record.AsSpan(0, HeaderLength + 8), json, line.Time, line.ConnId);
+    }
+
+    /// <summary>A declare record for the connection, or null when it is no longer in the table.</summary>
+    public static byte[]? Declare(uint index)
+    {
+        if (!ConnectionTable.TryGetBody(index, out var body)) return null;
+        var record = new byte[HeaderLength + body.Length];
+        WriteHeader(record, DeclareRecord, body.Length);
+        body.CopyTo(record.AsSpan(HeaderLength));
+        return record;
+    }
+
+    /// <summary>Length of the record <paramref name="bytes"/> starts with, or 0 when it is incomplete.</summary>
+    public static int RecordLength(ReadOnlySpan<byte> bytes)
+    {
+        if (bytes.Length < HeaderLength) return 0;
+        var length = HeaderLength + (long)BinaryPrimitives.ReadUInt32LittleEndian(bytes[1..]);
+        return length <= bytes.Length ? (int)length : 0;
+    }
+
+    public static bool TryReadTime(ReadOnlySpan<byte> record, out DateTimeOffset time)
+    {
+        time = default;
+        if (record.Length < HeaderLength + 8) return false;
+        var ticks = BinaryPrimitives.ReadInt64LittleEndian(record[HeaderLength..]);
+        if (ticks < DateTime.MinValue.Ticks || ticks > DateTime.MaxValue.Ticks) return false;
+        time = new DateTimeOffset(ticks, TimeSpan.Zero);
+        return true;
+    }
+
+    /// <summary>The connection index of a data or close record, or null for other records.</summary>
+    public static uint? ConnectionIndex(ReadOnlySpan<byte> record)
+    {
+        return record[0] is DataRecord or CloseRecord
+            ? BinaryPrimitives.ReadUInt32LittleEndian(record[(HeaderLength + 8)..])
+            : null;
+    }
+
+    /// <summary>The connection index of an open or declare record, or null for other records.</summary>
+    public static uint? DeclaredIndex(ReadOnlySpan<byte> record)
+    {
+        return record[0] is OpenRecord or DeclareRecord
+            ? BinaryPrimitives.ReadUInt32LittleEndian(record[(HeaderLength + 8)..])
+            : null;
+    }
+
+    /// <summary>Body of an open or declare record.</summary>
+    internal static byte[] ConnectionBody(DateTimeOffset time, uint index, string connId, string client, string target, string listener, int listenPort)
+    {
+        var length = 14 + 8 + Encoding.UTF8.GetByteCount(connId) + Encoding.UTF8.GetByteCount(client)
+            + Encoding.UTF8.GetByteCount(target) + Encoding.UTF8.GetByteCount(listener);
+        var body = new byte[length];
+        BinaryPrimitives.WriteInt64LittleEndian(body, time.UtcTicks);
+        BinaryPrimitives.WriteUInt32LittleEndian(body.AsSpan(8), index);
+        BinaryPrimitives.WriteUInt16LittleEndian(body.AsSpan(12), (ushort)listenPort);
+        var position = 14;
+        foreach (var value in new[] { connId, client, target, listener })
+        {
+            var written = Encoding.UTF8.GetBytes(value, body.AsSpan(position + 2));
+            BinaryPrimitives.WriteUInt16LittleEndian(body.AsSpan(position), (ushort)written);
+            position += 2 + written;
+        }
+        return body;
+    }
+
+    private static void WriteHeader(Span<byte> record, byte type, int bodyLength)
+    {
+        record[0] = type;
+        BinaryPrimitives.WriteUInt32LittleEndian(record[1..], (uint)bodyLength);
+    }
+
+    private static byte[] Scratch(int length)
+    {
+        var scratch = _scratch ??= new byte[64];
+        return scratch.Length >= length ? scratch : _scratch = new byte[length];
+    }
+}
+
+/// <summary>
+/// Endpoints of every connection by index, for binary destinations: a file declares
+/// a connection before its first data or close record there, including connections
+/// that opened before the destination started or in an earlier file. Entries stay a
+/// minute after the connection closes, so events still buffered or spilled can be
+/// declared; a record whose connection has gone is decoded with unknown endpoints.
+/// </summary>
+static class ConnectionTable
+{
+    private const long ClosedRetentionMillis = 60_000;
+
+    private static readonly ConcurrentDictionary<uint, byte[]> _bodies = new();
+    // Guarded by itself; in closing order
+    private static readonly Queue<(uint Index, long ClosedAt)> _closed = new();
+    private static int _nextIndex = -1;
+
+    public static int Count => _bodies.Count;
+
+    public static uint Register(DateTimeOffset time, string connId, string client, string target, string listener, int listenPort)
+    {
+        var index = (uint)Interlocked.Increment(ref _nextIndex);
+        _bodies[index] = BinaryEventWriter.ConnectionBody(time, index, connId, client, target, listener, listenPort);
+        return index;
+    }
+
+    public static bool TryGetBody(uint index, out byte[] body)
+    {
+        if (_bodies.TryGetValue(index, out var found))
+        {
+            body = found;
+            return true;
+        }
+        body = Array.Empty<byte>();
+        return false;
+    }
+
+    public static void Close(uint index)
+    {
+        var now = Environment.TickCount64;
+        lock (_closed)
+        {
+            _closed.Enqueue((index, now));
+            while (now - _closed.Peek().ClosedAt > ClosedRetentionMillis)
+            {
+                _bodies.TryRemove(_closed.Dequeue().Index, out _);
+            }
+        }
+    }
+}
+
+/// <summary>
+/// The connections each file of a binary destination has declared, so the flush loop
+/// knows when to write a declare record. A connection's entry goes with its close
+/// record; a file's set is forgotten once a flush writes other files but not it, after
+/// which the file declares its connections again. Used by the flush loop only.
+/// </summary>
+sealed class ConnectionDeclarations
+{
+    // Keyed by filename, without the compression suffix
+    private readonly Dictionary<string, HashSet<uint>> _files = new(StringComparer.Ordinal);
+    private readonly HashSet<string> _used = new(StringComparer.Ordinal);
+
+    /// <summary>
+    /// Walks the records of <paramref name="chunk"/>, about to be written to <paramref name="file"/>,
+    /// up to the first one whose connection the file has not declared. Returns the bytes before
+    /// that record with the declare record to write ahead of it, or the whole chunk and null.
+    /// </summary>
+    public (int End, byte[]? Declare) Scan(string file, ReadOnlySpan<byte> chunk)
+    {
+        if (!_files.TryGetValue(file, out var declared))
+        {
+            declared = new HashSet<uint>();
+            _files.Add(file, declared);
+        }
+        _used.Add(file);
+
+        var position = 0;
+        int length;
+        while ((length = BinaryEventWriter.RecordLength(chunk[position..])) > 0)
+        {
+            var record = chunk.Slice(position, length);
+            if (BinaryEventWriter.DeclaredIndex(record) is uint opened)
+            {
+                declared.Add(opened);
+            }
+            else if (BinaryEventWriter.ConnectionIndex(record) is uint index)
+            {
+                // The next scan starts at this record again and finds the connection declared
+                var declare = declared.Add(index) ? BinaryEventWriter.Declare(index) : null;
+                if (declare != null) return (position, declare);
+                if (record[0] == BinaryEventWriter.CloseRecord)
+                {
+                    // The connection's last record
+                    declared.Remove(index);
+                }
+            }
+            position += length;
+        }
+        return (chunk.Length, null);
+    }
+
+    public void EndFlush()
+    {
+        if (_used.Count == 0) return;
+        foreach (var file in _files.Keys)
+        {
+            if (!_used.Contains(file))
+            {
+                _files.Remove(file);
+            }
+        }
+        _used.Clear();
+    }
+}
@@ -0,0 +1,71 @@
+using System.Threading;
+
+/// <summary>How much of a port rule's traffic is logged.</summary>
+enum CaptureLevel
+{
+    /// <summary>Open, data and close events.</summary>
+    Full,
+    /// <summary>Open and close events and periodic progress counters; payloads are never escaped.</summary>
+    Metadata,
+    /// <summary>Nothing; the connections are only counted.</summary>
+    Off
+}
+
+/// <summary>
+/// Capture settings of one port rule, shared by its connections. The level can be
+/// changed at runtime (set-capture) and applies to open connections from their next
+/// chunk on.
+/// </summary>
+sealed class CaptureRule
+{
+    public const int DefaultCoalesceBytes = 64 * 1024;
+
+    private int _level;
+
+    /// <param name="captureBytes">Bytes captured per direction of a connection before its data events stop; 0 for no limit.</param>
+    /// <param name="coalesceMicros">How long a data event waits for the next chunk of the same direction to merge with; 0 for no coalescing.</param>
+    /// <param name="coalesceBytes">Most payload bytes one coalesced data event holds.</param>
+    public CaptureRule(CaptureLevel level, long captureBytes, long coalesceMicros = 0, int coalesceBytes = DefaultCoalesceBytes)
+    {
+        _level = (int)level;
+        CaptureBytes = captureBytes;
+        CoalesceMicros = coalesceMicros;
+        CoalesceBytes = coalesceBytes;
+    }
+
+    public CaptureLevel Level
+    {
+        get => (CaptureLevel)Volatile.Read(ref _level);
+        set => Volatile.Write(ref _level, (int)value);
+    }
+
+    public long CaptureBytes { get; }
+    public long CoalesceMicros { get; }
+    public int CoalesceBytes { get; }
+
+    public static bool TryParseLevel(string? value, out CaptureLevel level)
+    {
+        switch (value)
+        {
+            case "full":
+                level = CaptureLevel.Full;
+                return true;
+            case "metadata":
+                level = CaptureLevel.Metadata;
+                return true;
+            case "off":
+                level = CaptureLevel.Off;
+                return true;
+            default:
+                level = default;
+                return false;
+        }
+    }
+
+    public static string LevelName(CaptureLevel level) => level switch
+    {
+        CaptureLevel.Metadata => "metadata",
+        CaptureLevel.Off => "off",
+        _ => "full"
+    };
+}
@@ -0,0 +1,257 @@
+using System;
+using System.Diagnostics;
+using System.Threading;
+using System.Threading.Channels;
+using System.Threading.Tasks;
+
+/// <summary>
+/// Capture side of one proxied connection. The relay loops post the segments
+/// they forward and move on; a single consumer task escapes and logs them in
+/// arrival order, so capture cost never delays the next read. It also keeps the
+/// connection's totals per direction, whether or not anything is logging, and
+/// applies its port rule's capture level and capture_bytes limit.
+/// </summary>
+sealed class ConnectionCapture
+{
+    private readonly Channel<RelaySegment> _segments = Channel.CreateUnbounded<RelaySegment>(new UnboundedChannelOptions
+    {
+        SingleReader = true,
+        SingleWriter = false
+    });
+    private readonly Action<ConnectionCapture, RelaySegment> _capture;
+    // Each written by the relay loop of its direction; the other direction reads the byte count
+    private long _clientBytes;
+    private long _targetBytes;
+    private long _clientChunks;
+    private long _targetChunks;
+    // Bytes in both directions at the last progress event; used by the progress loop only
+    private long _reportedBytes;
+    // Ends a coalescing window; used by the capture loop only
+    private CancellationTokenSource? _windowTimer;
+    // UTC ticks of the connection's latest event time; no later event is given an earlier one
+    private long _eventTicks;
+
+    public string ConnId { get; }
+    /// <summary>The connection's index in the <see cref="ConnectionTable"/>, which binary records refer to it by.</summary>
+    public uint ConnIndex { get; }
+    /// <summary>The TCP flow pcapng destinations show the connection as; null when its endpoints are not IP endpoints.</summary>
+    public PcapngFlow? Flow { get; }
+    public string ClientEndpoint { get; }
+    public string ServerEndpoint { get; }
+    public string ListenerEndpoint { get; }
+    public int ListenPort { get; }
+    public DateTimeOffset Opened { get; }
+    public CaptureRule Rule { get; }
+    /// <summary>Whether the open event was logged; without it the connection logs no other event either.</summary>
+    public bool OpenLogged { get; }
+    public Task Completion { get; }
+
+    /// <summary>The rule's current level, or off for a connection accepted while its rule was off.</summary>
+    public CaptureLevel Level => OpenLogged ? Rule.Level : CaptureLevel.Off;
+
+    public ConnectionCapture(string connId, uint connIndex, PcapngFlow? flow, DateTimeOffset opened, string clientEp, string serverEp, string listenerEp, int listenPort, CaptureRule rule, bool openLogged, Action<ConnectionCapture, RelaySegment> capture)
+    {
+        ConnId = connId;
+        Opened = opened;
+        _eventTicks = opened.UtcTicks;
+        Rule = rule;
+        OpenLogged = openLogged;
+        ConnIndex = connIndex;
+        Flow = flow;
+        ClientEndpoint = clientEp;
+        ServerEndpoint = serverEp;
+        ListenerEndpoint = listenerEp;
+        ListenPort = listenPort;
+        _capture = capture;
+        Completion = Task.Run(CaptureLoop);
+    }
+
+    /// <summary>Whether the next chunk of the direction would produce a data event.</summary>
+    public bool Captures(bool fromClient)
+    {
+        var captureBytes = Rule.CaptureBytes;
+        return Level == CaptureLevel.Full
+            && (captureBytes == 0 || (fromClient ? Interlocked.Read(ref _clientBytes) : Interlocked.Read(ref _targetBytes)) < captureBytes);
+    }
+
+    /// <summary>
+    /// Counts a chunk the relay loop read and sets the segment's stream offsets and the
+    /// bytes of it to capture. False when there is nothing to capture: the rule does not
+    /// capture data or the direction has reached the capture limit.
+    /// </summary>
+    public bool Forwarded(RelaySegment segment)
+    {
+        var before = Count(segment.FromClient, segment.Length);
+        segment.StreamOffset = before;
+        segment.PeerOffset = segment.FromClient ? Interlocked.Read(ref _targetBytes) : Interlocked.Read(ref _clientBytes);
+        var captureBytes = Rule.CaptureBytes;
+        // $REQ_SIMPLE_028: Stop capturing a direction after capture_bytes, keep counting it
+        // $REQ_SIMPLE_030: Metadata and off rules never escape payloads
+        segment.CaptureLength = Level != CaptureLevel.Full ? 0
+            : captureBytes == 0 ? segment.Length
+            : (int)Math.Clamp(captureBytes - before, 0, segment.Length);
+        return segment.CaptureLength > 0;
+    }
+
+    /// <summary>Counts a chunk moved without passing through a segment (splice).</summary>
+    public void Forwarded(bool fromClient, long length)
+    {
+        Count(fromClient, length);
+    }
+
+    /// <summary>Totals of the connection so far; final once both relay loops have ended.</summary>
+    public ConnectionTotals Totals(DateTimeOffset closed)
+    {
+        return new ConnectionTotals(Interlocked.Read(ref _clientBytes), Interlocked.Read(ref _targetBytes),
+            _clientChunks, _targetChunks, closed - Opened);
+    }
+
+    /// <summary>
+    /// <paramref name="time"/>, or the connection's latest event time where that is later.
+    /// Relay loops stamp chunks before posting them, so two directions can arrive at the
+    /// capture loop slightly out of time order; this keeps the connection's events
+    /// non-decreasing in the order they are logged.
+    /// </summary>
+    public DateTimeOffset EventTime(DateTimeOffset time)
+    {
+        var ticks = time.UtcTicks;
+        var latest = Interlocked.Read(ref _eventTicks);
+        while (ticks > latest)
+        {
+            var seen = Interlocked.CompareExchange(ref _eventTicks, ticks, latest);
+            if (seen == latest) return time;
+            latest = seen;
+        }
+        return new DateTimeOffset(latest, TimeSpan.Zero);
+    }
+
+    /// <summary>Totals for a progress event, or false when nothing was forwarded since the last one.</summary>
+    public bool TakeProgress(DateTimeOffset now, out ConnectionTotals totals)
+    {
+        totals = Totals(now);
+        var bytes = totals.BytesFromClient + totals.BytesFromTarget;
+        if (bytes == _reportedBytes) return false;
+        _reportedBytes = bytes;
+        return true;
+    }
+
+    private long Count(bool fromClient, long length)
+    {
+        if (fromClient)
+        {
+            _clientChunks++;
+            return Interlocked.Add(ref _clientBytes, length) - length;
+        }
+        _targetChunks++;
+        return Interlocked.Add(ref _targetBytes, length) - length;
+    }
+
+    public void Post(RelaySegment segment)
+    {
+        segment.AddRef();
+        if (!_segments.Writer.TryWrite(segment))
+        {
+            segment.Release();
+        }
+    }
+
+    public void Complete()
+    {
+        _segments.Writer.TryComplete();
+    }
+
+    private async Task CaptureLoop()
+    {
+        var reader = _segments.Reader;
+        var window = Rule.CoalesceMicros * Stopwatch.Frequency / 1_000_000;
+        // $REQ_SIMPLE_032: Chunks waiting for the next one of the same direction
+        RelaySegment? pending = null;
+        long deadline = 0;
+        while (true)
+        {
+            if (!reader.TryRead(out var segment))
+            {
+                if (pending == null)
+                {
+                    if (await reader.WaitToReadAsync()) continue;
+                    _windowTimer?.Dispose();
+                    return;
+                }
+                if (!await WaitToRead(deadline))
+                {
+                    // Window over, or the connection closed
+                    Capture(pending);
+                    pending = null;
+                }
+                continue;
+            }
+
+            if (pending != null)
+            {
+                if (pending.FromClient == segment.FromClient
+                    && pending.CaptureLength == pending.Length
+                    && segment.StreamOffset == pending.StreamOffset + pending.Length
+                    && pending.CaptureLength + segment.CaptureLength <= Rule.CoalesceBytes)
+                {
+                    pending = pending.Append(segment, Rule.CoalesceBytes);
+                    segment.Release();
+                    if (pending.CaptureLength < Rule.CoalesceBytes) continue;
+                    segment = pending;
+                }
+                else
+                {
+                    // Direction change, a gap in the stream, or no room: the pending event goes first
+                    Capture(pending);
+                }
+                pending = null;
+            }
+
+            if (window > 0 && segment.Chunks == 1 && segment.CaptureLength < Rule.CoalesceBytes)
+            {
+                pending = segment;
+                deadline = Stopwatch.GetTimestamp() + window;
+                continue;
+            }
+            Capture(segment);
+        }
+    }
+
+    /// <summary>Waits for the next segment until <paramref name="deadline"/>; false when none came.</summary>
+    private async ValueTask<bool> WaitToRead(long deadline)
+    {
+        var remaining = Stopwatch.GetElapsedTime(Stopwatch.GetTimestamp(), deadline);
+        if (remaining <= TimeSpan.Zero) return false;
+        if (_windowTimer == null || !_windowTimer.TryReset())
+        {
+            _windowTimer?.Dispose();
+            _windowTimer = new CancellationTokenSource();
+        }
+        _windowTimer.CancelAfter(remaining);
+        var wait = _segments.Reader.WaitToReadAsync(_windowTimer.Token).AsTask();
+        // A window running out is the common case: no exception for it
+        await ((Task)wait).ConfigureAwait(ConfigureAwaitOptions.SuppressThrowing);
+        return wait.IsCompletedSuccessfully && wait.Result;
+    }
+
+    private void Capture(RelaySegment segment)
+    {
+        try
+        {
+            // $REQ_SIMPLE_033: Non-decreasing event times per connection
+            segment.Time = EventTime(segment.Time);
+            if (segment.Chunks > 1)
+            {
+                segment.LastTime = EventTime(segment.LastTime);
+            }
+            _capture(this, segment);
+        }
+        catch
+        {
+            // A capture failure must not stop the remaining events of this connection
+        }
+        finally
+        {
+            segment.Release();
+        }
+    }
+}
@@ -0,0 +1,4 @@
+using System;
+
+/// <summary>What a connection forwarded in each direction, reported by its progress and close events.</summary>
+readonly record struct ConnectionTotals(long BytesFromClient, long BytesFromTarget, long ChunksFromClient, long ChunksFromTarget, TimeSpan Duration);
@@ -0,0 +1,177 @@
+using System;
+using System.Buffers;
+using System.Buffers.Text;
+using System.Runtime.CompilerServices;
+using System.Runtime.InteropServices;
+
+/// <summary>
+/// URL-encodes traffic bytes and JSON-escapes the result in one pass, writing
+/// UTF-8 output directly ($REQ_SIMPLE_014). Runs of bytes that pass through
+/// unchanged are found with a vectorized search and bulk-copied; every other byte
+/// is expanded from a 256-entry table holding its replacement. Base64 and hex are
+/// the alternatives for destinations logging mostly binary traffic (data_encoding).
+/// </summary>
+static class DataEscaper
+{
+    // After this many literal bytes in a row on the byte-at-a-time path,
+    // go back to the vectorized search
+    private const int LiteralRunToRescan = 8;
+    // Bytes the auto encoding looks at to choose
+    private const int AutoSampleBytes = 1024;
+
+    /// <summary>Printable ASCII except '%', '"' and '\', copied unchanged.</summary>
+    private static readonly SearchValues<byte> _literal = SearchValues.Create(BuildLiterals());
+
+    /// <summary>
+    /// Per byte: output length in the low 8 bits, then up to three output bytes.
+    /// '%' becomes %25, tab/LF/CR become \t \n \r, '"' and '\' get a backslash,
+    /// other non-printable bytes become %XX.
+    /// </summary>
+    private static readonly uint[] _replacements = BuildReplacements();
+
+    /// <summary>Per byte: its two lowercase hex digits, in output order.</summary>
+    private static readonly ushort[] _hexDigits = BuildHexDigits();
+
+    public static int MaxEscapedLength(int length) => length * 3;
+
+    /// <summary>
+    /// Escapes <paramref name="source"/> into <paramref name="destination"/>, which must
+    /// hold at least <see cref="MaxEscapedLength"/> bytes. Returns the bytes written.
+    /// </summary>
+    public static int Escape(ReadOnlySpan<byte> source, Span<byte> destination)
+    {
+        if (destination.Length < MaxEscapedLength(source.Length))
+        {
+            throw new ArgumentException("Destination too small for escaped data", nameof(destination));
+        }
+
+        var replacements = _replacements;
+        int read = 0;
+        int written = 0;
+        while (read < source.Length)
+        {
+            var run = source[read..].IndexOfAnyExcept(_literal);
+            if (run < 0)
+            {
+                run = source.Length - read;
+            }
+            source.Slice(read, run).CopyTo(destination[written..]);
+            read += run;
+            written += run;
+
+            // Binary data alternates escapes and short literal runs: stay byte-at-a-time
+            // until a longer literal run shows up. All three replacement bytes are stored
+            // unconditionally (the destination always has room) and only length counts.
+            ref byte output = ref MemoryMarshal.GetReference(destination);
+            ref uint table = ref MemoryMarshal.GetArrayDataReference(replacements);
+            int literals = 0;
+            while (read < source.Length && literals < LiteralRunToRescan)
+            {
+                var replacement = Unsafe.Add(ref table, source[read++]);
+                var length = (int)(replacement & 0xFF);
+                ref byte slot = ref Unsafe.Add(ref output, written);
+                slot = (byte)(replacement >> 8);
+                Unsafe.Add(ref slot, 1) = (byte)(replacement >> 16);
+                Unsafe.Add(ref slot, 2) = (byte)(replacement >> 24);
+                literals = length == 1 ? literals + 1 : 0;
+                written += length;
+            }
+        }
+        return written;
+    }
+
+    public static int MaxBase64Length(int length) => Base64.GetMaxEncodedToUtf8Length(length);
+
+    /// <summary>Base64-encodes <paramref name="source"/> with the vectorized BCL encoder. Returns the bytes written.</summary>
+    public static int Base64Encode(ReadOnlySpan<byte> source, Span<byte> destination)
+    {
+        Base64.EncodeToUtf8(source, destination, out _, out var written);
+        return written;
+    }
+
+    public static int HexLength(int length) => length * 2;
+
+    /// <summary>Writes <paramref name="source"/> as lowercase hex. Returns the bytes written.</summary>
+    public static int Hex(ReadOnlySpan<byte> source, Span<byte> destination)
+    {
+        if (destination.Length < HexLength(source.Length))
+        {
+            throw new ArgumentException("Destination too small for hex data", nameof(destination));
+        }
+        ref byte output = ref MemoryMarshal.GetReference(destination);
+        ref ushort digits = ref MemoryMarshal.GetArrayDataReference(_hexDigits);
+        for (int i = 0; i < source.Length; i++)
+        {
+            Unsafe.WriteUnaligned(ref Unsafe.Add(ref output, i * 2), Unsafe.Add(ref digits, source[i]));
+        }
+        return source.Length * 2;
+    }
+
+    /// <summary>
+    /// Whether base64 is shorter than URL-encoding for <paramref name="data"/>, judged by
+    /// its first kilobyte: true once more than about one byte in six needs escaping.
+    /// </summary>
+    public static bool PrefersBase64(ReadOnlySpan<byte> data)
+    {
+        var sample = data[..Math.Min(data.Length, AutoSampleBytes)];
+        var escaped = 0;
+        foreach (var b in sample)
+        {
+            escaped += (int)(_replacements[b] & 0xFF);
+        }
+        return escaped > MaxBase64Length(sample.Length);
+    }
+
+    private static byte[] BuildLiterals()
+    {
+        var literals = new System.Collections.Generic.List<byte>();
+        for (int b = 0x20; b <= 0x7E; b++)
+        {
+            if (b != '%' && b != '"' && b != '\\')
+            {
+                literals.Add((byte)b);
+            }
+        }
+        return literals.ToArray();
+    }
+
+    private static uint[] BuildReplacements()
+    {
+        const string hex = "0123456789ABCDEF";
+        var table = new uint[256];
+        for (int b = 0; b < 256; b++)
+        {
+            table[b] = b switch
+            {
+                0x09 => Pack('\\', 't'),
+                0x0A => Pack('\\', 'n'),
+                0x0D => Pack('\\', 'r'),
+                '"' or '\\' => Pack('\\', (char)b),
+                '%' => Pack('%', '2', '5'),
+                >= 0x20 and <= 0x7E => Pack((char)b),
+                _ => Pack('%', hex[b >> 4], hex[b & 0xF])
+            };
+        }
+        return table;
+    }
+
+    private static ushort[] BuildHexDigits()
+    {
+        const string hex = "0123456789abcdef";
+        var table = new ushort[256];
+        for (int b = 0; b < 256; b++)
+        {
+            // Little-endian: the first digit goes in the low byte
+            table[b] = BitConverter.IsLittleEndian
+                ? (ushort)(hex[b >> 4] | hex[b & 0xF] << 8)
+                : (ushort)(hex[b >> 4] << 8 | hex[b & 0xF]);
+        }
+        return table;
+    }
+
+    private static uint Pack(char first) => 1u | (uint)first << 8;
+
+    private static uint Pack(char first, char second) => 2u | (uint)first << 8 | (uint)second << 16;
+
+    private static uint Pack(char first, char second, char third) => 3u | (uint)first << 8 | (uint)second << 16 | (uint)third << 24;
+}
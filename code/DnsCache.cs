@@ -0,0 +1,142 @@
+using System;
+using System.Collections.Concurrent;
+using System.Net;
+using System.Net.Sockets;
+using System.Text.Json;
+using System.Threading;
+using System.Threading.Tasks;
+
+/// <summary>
+/// Per-host resolution cache for upstream connects. The OS resolver API does not
+/// expose record TTLs, so entries live for a configured TTL. Entries are refreshed
+/// in the background shortly before they expire, failures are cached briefly, and
+/// a failed refresh keeps serving the last good addresses for a while.
+/// </summary>
+sealed class DnsCache
+{
+    private const long NegativeTtlMs = 5_000;
+    private const long MaxStaleMs = 10 * 60_000;
+
+    private sealed record Entry(IPAddress[] Addresses, long ResolvedAt, long ExpiresAt, bool Stale, bool Failed);
+
+    private readonly ConcurrentDictionary<string, Entry> _entries = new(StringComparer.OrdinalIgnoreCase);
+    private readonly ConcurrentDictionary<string, Lazy<Task<IPAddress[]>>> _pending = new(StringComparer.OrdinalIgnoreCase);
+    private readonly long _ttlMs;
+    private long _hits;
+    private long _misses;
+    private long _staleHits;
+    private long _negativeHits;
+    private long _refreshes;
+    private long _failures;
+
+    public DnsCache(long ttlMs)
+    {
+        _ttlMs = ttlMs;
+    }
+
+    public async ValueTask<IPAddress[]> ResolveAsync(string host, CancellationToken ct)
+    {
+        if (IPAddress.TryParse(host, out var literal))
+        {
+            return new[] { literal };
+        }
+
+        if (_ttlMs == 0)
+        {
+            Interlocked.Increment(ref _misses);
+            return await Dns.GetHostAddressesAsync(host, ct);
+        }
+
+        var now = Environment.TickCount64;
+        if (_entries.TryGetValue(host, out var entry) && now < entry.ExpiresAt)
+        {
+            if (entry.Failed)
+            {
+                Interlocked.Increment(ref _negativeHits);
+                throw new SocketException((int)SocketError.HostNotFound);
+            }
+
+            if (entry.Stale)
+            {
+                Interlocked.Increment(ref _staleHits);
+            }
+            else
+            {
+                Interlocked.Increment(ref _hits);
+                // Refresh ahead of expiry so steady traffic never waits on the resolver
+                if (entry.ExpiresAt - now < _ttlMs / 5)
+                {
+                    Interlocked.Increment(ref _refreshes);
+                    _ = Refresh(host).ContinueWith(t => _ = t.Exception, TaskContinuationOptions.OnlyOnFaulted);
+                }
+            }
+            return entry.Addresses;
+        }
+
+        Interlocked.Increment(ref _misses);
+        try
+        {
+            return await Refresh(host).WaitAsync(ct);
+        }
+        catch when (!ct.IsCancellationRequested && _entries.TryGetValue(host, out var stale) && stale.Stale)
+        {
+            Interlocked.Increment(ref _staleHits);
+            return stale.Addresses;
+        }
+    }
+
+    public void WriteStats(Utf8JsonWriter writer)
+    {
+        writer.WriteStartObject();
+        writer.WriteNumber("ttl_millis", _ttlMs);
+        writer.WriteNumber("entries", _entries.Count);
+        writer.WriteNumber("hits", Interlocked.Read(ref _hits));
+        writer.WriteNumber("misses", Interlocked.Read(ref _misses));
+        writer.WriteNumber("stale_hits", Interlocked.Read(ref _staleHits));
+        writer.WriteNumber("negative_hits", Interlocked.Read(ref _negativeHits));
+        writer.WriteNumber("refreshes", Interlocked.Read(ref _refreshes));
+        writer.WriteNumber("failures", Interlocked.Read(ref _failures));
+        writer.WriteEndObject();
+    }
+
+    private Task<IPAddress[]> Refresh(string host)
+    {
+        // Concurrent misses for one host share a single resolver call
+        return _pending.GetOrAdd(host, h => new Lazy<Task<IPAddress[]>>(() => ResolveAndStore(h))).Value;
+    }
+
+    private async Task<IPAddress[]> ResolveAndStore(string host)
+    {
+        try
+        {
+            var addresses = await Dns.GetHostAddressesAsync(host);
+            if (addresses.Length == 0)
+            {
+                throw new SocketException((int)SocketError.HostNotFound);
+            }
+
+            var now = Environment.TickCount64;
+            _entries[host] = new Entry(addresses, now, now + _ttlMs, Stale: false, Failed: false);
+            return addresses;
+        }
+        catch
+        {
+            Interlocked.Increment(ref _failures);
+            var now = Environment.TickCount64;
+            if (_entries.TryGetValue(host, out var old) && !old.Failed && now - old.ResolvedAt < _ttlMs + MaxStaleMs)
+            {
+                // Stale-while-revalidate: keep the last good answer, retry after the negative TTL
+                _entries[host] = old with { ExpiresAt = now + NegativeTtlMs, Stale = true };
+            }
+            else
+            {
+                _entries[host] = new Entry(Array.Empty<IPAddress>(), now, now + Math.Min(NegativeTtlMs, _ttlMs), Stale: false, Failed: true);
+            }
+            throw;
+        }
+        finally
+        {
+            _pending.TryRemove(host, out _);
+        }
+    }
+}
@@ -0,0 +1,76 @@
+using System;
+using System.Diagnostics;
+using System.Globalization;
+using System.Threading;
+
+/// <summary>
+/// Time source and formatter for event timestamps. <see cref="UtcNow"/> reads the
+/// monotonic Stopwatch against a wall-clock anchor renewed once a second: a system
+/// clock stepped forward is followed at the next renewal, one stepped back only once
+/// it has caught up again, so the event clock never runs backwards. <see cref="Format"/>
+/// writes a time as yyyy-MM-ddTHH:mm:ss.ffffffZ, reusing the formatted date and time of
+/// the last second it saw and filling in the microseconds.
+/// </summary>
+static class EventClock
+{
+    /// <summary>Bytes <see cref="Format"/> writes.</summary>
+    public const int FormattedLength = 27;
+
+    // yyyy-MM-ddTHH:mm:ss
+    private const int PrefixLength = 19;
+
+    private static Anchor _anchor = new(DateTime.UtcNow.Ticks, Stopwatch.GetTimestamp());
+    private static Prefix _prefix = new(0, new byte[PrefixLength]);
+
+    public static DateTimeOffset UtcNow
+    {
+        get
+        {
+            var now = Stopwatch.GetTimestamp();
+            var anchor = Volatile.Read(ref _anchor);
+            if (now - anchor.Timestamp >= Stopwatch.Frequency)
+            {
+                anchor = Renew(anchor, now);
+            }
+            return new DateTimeOffset(anchor.UtcTicks + Stopwatch.GetElapsedTime(anchor.Timestamp, now).Ticks, TimeSpan.Zero);
+        }
+    }
+
+    /// <summary>Writes <paramref name="time"/> in UTC; <paramref name="destination"/> needs <see cref="FormattedLength"/> bytes.</summary>
+    public static int Format(DateTimeOffset time, Span<byte> destination)
+    {
+        var ticks = time.UtcTicks;
+        var second = ticks / TimeSpan.TicksPerSecond;
+        var prefix = Volatile.Read(ref _prefix);
+        if (prefix.Second != second || second == 0)
+        {
+            var bytes = new byte[PrefixLength];
+            new DateTime(second * TimeSpan.TicksPerSecond, DateTimeKind.Utc).TryFormat(bytes, out _, "yyyy-MM-ddTHH:mm:ss", CultureInfo.InvariantCulture);
+            prefix = new Prefix(second, bytes);
+            Volatile.Write(ref _prefix, prefix);
+        }
+        prefix.Bytes.CopyTo(destination);
+        destination[PrefixLength] = (byte)'.';
+        var micros = (int)(ticks % TimeSpan.TicksPerSecond / 10);
+        for (int i = PrefixLength + 6; i > PrefixLength; i--)
+        {
+            destination[i] = (byte)('0' + micros % 10);
+            micros /= 10;
+        }
+        destination[FormattedLength - 1] = (byte)'Z';
+        return FormattedLength;
+    }
+
+    private static Anchor Renew(Anchor anchor, long now)
+    {
+        var projected = anchor.UtcTicks + Stopwatch.GetElapsedTime(anchor.Timestamp, now).Ticks;
+        var renewed = new Anchor(Math.Max(DateTime.UtcNow.Ticks, projected), now);
+        // Another thread may have renewed it first; either anchor is good
+        var current = Interlocked.CompareExchange(ref _anchor, renewed, anchor);
+        return current == anchor ? renewed : current;
+    }
+
+    private sealed record Anchor(long UtcTicks, long Timestamp);
+
+    private sealed record Prefix(long Second, byte[] Bytes);
+}
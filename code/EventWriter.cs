@@ -0,0 +1,357 @@
+using System;
+using System.Globalization;
+using System.Text.Encodings.Web;
+using System.Text.Json;
+
+/// <summary>
+/// Writes each log event type straight into a reusable per-thread UTF-8 buffer and
+/// stores the finished NDJSON line in the <see cref="LogArena"/>. Output matches what the reflection serializer
+/// produced with relaxed escaping and quotes written as <c>\"</c>, field order included.
+/// </summary>
+static class EventWriter
+{
+    [ThreadStatic] private static byte[]? _scratch;
+
+    public static LogLine Open(DateTimeOffset time, string connId, string from, string to, string listener, int listenPort)
+    {
+        var line = new Line(time);
+        line.String("ConnID"u8, connId);
+        line.String("event"u8, "open");
+        line.String("from"u8, from);
+        line.String("to"u8, to);
+        line.String("listener"u8, listener);
+        line.Number("listen_port"u8, listenPort);
+        return line.Finish(connId);
+    }
+
+    /// <param name="truncatedFrom">Original payload length when <paramref name="data"/> was cut short by the truncate overflow policy, otherwise -1.</param>
+    /// <param name="encoding">A concrete encoding; <see cref="DataEncoding.Auto"/> is resolved by the caller.</param>
+    /// <param name="chunks">Chunks coalesced into the event, the last one read at <paramref name="lastTime"/>.</param>
+    public static LogLine Data(DateTimeOffset time, string connId, ReadOnlySpan<byte> data, string from, string to, string listener, int listenPort, int truncatedFrom = -1,
+        DataEncoding encoding = DataEncoding.Url, int chunks = 1, DateTimeOffset lastTime = default)
+    {
+        var line = new Line(time);
+        line.String("ConnID"u8, connId);
+        line.Data("data"u8, data, encoding);
+        if (encoding != DataEncoding.Url)
+        {
+            line.String("enc"u8, LogOptions.DataEncodingName(encoding));
+        }
+        if (truncatedFrom >= 0)
+        {
+            line.Number("truncated"u8, truncatedFrom);
+        }
+        if (chunks > 1)
+        {
+            line.Number("chunks"u8, chunks);
+            line.Timestamp("last_time"u8, lastTime);
+        }
+        line.String("from"u8, from);
+        line.String("to"u8, to);
+        line.String("listener"u8, listener);
+        line.Number("listen_port"u8, listenPort);
+        return line.Finish(connId);
+    }
+
+    public static LogLine Close(DateTimeOffset time, string connId, string from, string to, string listener, ConnectionTotals totals)
+    {
+        var line = new Line(time);
+        line.String("ConnID"u8, connId);
+        line.String("event"u8, "close");
+        line.String("from"u8, from);
+        line.String("to"u8, to);
+        line.String("listener"u8, listener);
+        // $REQ_SIMPLE_029: Totals include traffic that was not captured
+        line.Totals(totals);
+        return line.Finish(connId);
+    }
+
+    /// <summary>Counters of an open connection on a metadata rule, written periodically.</summary>
+    public static LogLine Progress(DateTimeOffset time, string connId, ConnectionTotals totals)
+    {
+        var line = new Line(time);
+        line.String("ConnID"u8, connId);
+        line.String("event"u8, "progress");
+        line.Totals(totals);
+        return line.Finish(connId);
+    }
+
+    public static LogLine McpReady(DateTimeOffset time, string endpoint)
+    {
+        var line = new Line(time);
+        line.String("event"u8, "mcp-ready");
+        line.String("endpoint"u8, endpoint);
+        return line.Finish();
+    }
+
+    public static LogLine StartLogging(DateTimeOffset time, string? directory, string filenameFormat)
+    {
+        var line = new Line(time);
+        line.String("event"u8, "start-logging");
+        line.String("directory"u8, directory);
+        // $REQ_LOG_016: filename_format only in event for directory logging, not STDOUT
+        if (directory != null)
+        {
+            line.String("filename_format"u8, filenameFormat);
+        }
+        return line.Finish();
+    }
+
+    public static LogLine StopLogging(DateTimeOffset time, string? directory)
+    {
+        var line = new Line(time);
+        line.String("event"u8, "stop-logging");
+        line.String("directory"u8, directory);
+        return line.Finish();
+    }
+
+    public static LogLine CaptureGap(DateTimeOffset time, DateTimeOffset since, long droppedEvents, long droppedBytes,
+        System.Collections.Generic.IEnumerable<(string ConnId, long Events, long Bytes)> connections)
+    {
+        var line = new Line(time);
+        line.String("event"u8, "capture-gap");
+        line.Timestamp("since"u8, since);
+        line.Number("dropped_events"u8, droppedEvents);
+        line.Number("dropped_bytes"u8, droppedBytes);
+        line.BeginObject("connections"u8);
+        foreach (var (connId, events, bytes) in connections)
+        {
+            line.BeginObject(connId);
+            line.Number("events"u8, events);
+            line.Number("bytes"u8, bytes);
+            line.EndObject();
+        }
+        line.EndObject();
+        return line.Finish();
+    }
+
+    /// <summary>
+    /// Reads the time every event line starts with, to the second. Used for lines that
+    /// were stored without their <see cref="LogLine"/> (spill segments).
+    /// </summary>
+    public static bool TryReadTime(ReadOnlySpan<byte> line, out DateTimeOffset time)
+    {
+        time = default;
+        var prefix = "{\"time\":\""u8;
+        // yyyy-MM-ddTHH:mm:ss
+        if (line.Length < prefix.Length + 19 || !line.StartsWith(prefix)) return false;
+        var t = line.Slice(prefix.Length, 19);
+        if (!Digits(t[..4], out var year) || !Digits(t.Slice(5, 2), out var month) || !Digits(t.Slice(8, 2), out var day)
+            || !Digits(t.Slice(11, 2), out var hour) || !Digits(t.Slice(14, 2), out var minute) || !Digits(t.Slice(17, 2), out var second))
+        {
+            return false;
+        }
+        if (year < 1 || month < 1 || month > 12 || day < 1 || day > DateTime.DaysInMonth(year, month) || hour > 23 || minute > 59 || second > 59)
+        {
+            return false;
+        }
+        time = new DateTimeOffset(year, month, day, hour, minute, second, TimeSpan.Zero);
+        return true;
+    }
+
+    private static bool Digits(ReadOnlySpan<byte> digits, out int value)
+    {
+        value = 0;
+        foreach (var b in digits)
+        {
+            if (b < '0' || b > '9') return false;
+            value = value * 10 + (b - '0');
+        }
+        return true;
+    }
+
+    /// <summary>
+    /// One event being written. Starts the object with the time field; every
+    /// other field is appended as <c>,"name":value</c>.
+    /// </summary>
+    private ref struct Line
+    {
+        private readonly DateTimeOffset _time;
+        private byte[] _buffer;
+        private int _length;
+        private bool _first;
+
+        public Line(DateTimeOffset time)
+        {
+            _time = time;
+            _buffer = _scratch ??= new byte[4096];
+            _length = 0;
+            _first = true;
+            Raw((byte)'{');
+            Timestamp("time"u8, time);
+        }
+
+        public void Timestamp(ReadOnlySpan<byte> name, DateTimeOffset time)
+        {
+            Name(name);
+            Raw((byte)'"');
+            Reserve(EventClock.FormattedLength);
+            _length += EventClock.Format(time, _buffer.AsSpan(_length));
+            Raw((byte)'"');
+        }
+
+        public void BeginObject(ReadOnlySpan<byte> name)
+        {
+            Name(name);
+            Raw((byte)'{');
+            _first = true;
+        }
+
+        public void BeginObject(string name)
+        {
+            Key(name);
+            Raw((byte)':');
+            Raw((byte)'{');
+            _first = true;
+        }
+
+        public void EndObject()
+        {
+            Raw((byte)'}');
+            _first = false;
+        }
+
+        public void String(ReadOnlySpan<byte> name, string? value)
+        {
+            Name(name);
+            if (value == null)
+            {
+                Raw("null"u8);
+                return;
+            }
+            Quoted(value);
+        }
+
+        private void Key(string name)
+        {
+            if (!_first)
+            {
+                Raw((byte)',');
+            }
+            _first = false;
+            Quoted(name);
+        }
+
+        private void Quoted(string value)
+        {
+            Raw((byte)'"');
+            if (value.AsSpan().IndexOfAnyExceptInRange((char)0x20, (char)0x7E) < 0)
+            {
+                Reserve(value.Length * 2);
+                foreach (var c in value)
+                {
+                    if (c == '"' || c == '\\')
+                    {
+                        _buffer[_length++] = (byte)'\\';
+                    }
+                    _buffer[_length++] = (byte)c;
+                }
+            }
+            else
+            {
+                // Control or non-ASCII characters are rare here (directory names)
+                Encoded(value);
+            }
+            Raw((byte)'"');
+        }
+
+        public void Number(ReadOnlySpan<byte> name, long value)
+        {
+            Name(name);
+            Reserve(20);
+            value.TryFormat(_buffer.AsSpan(_length), out var written, default, CultureInfo.InvariantCulture);
+            _length += written;
+        }
+
+        public void Totals(ConnectionTotals totals)
+        {
+            Number("bytes_from_client"u8, totals.BytesFromClient);
+            Number("bytes_from_target"u8, totals.BytesFromTarget);
+            Number("chunks_from_client"u8, totals.ChunksFromClient);
+            Number("chunks_from_target"u8, totals.ChunksFromTarget);
+            Number("duration_ms"u8, (long)totals.Duration.TotalMilliseconds);
+        }
+
+        public void Data(ReadOnlySpan<byte> name, ReadOnlySpan<byte> data, DataEncoding encoding)
+        {
+            Name(name);
+            Raw((byte)'"');
+            switch (encoding)
+            {
+                case DataEncoding.Base64:
+                    // $REQ_LOG_026: Base64 and hex need no JSON escaping
+                    Reserve(DataEscaper.MaxBase64Length(data.Length));
+                    _length += DataEscaper.Base64Encode(data, _buffer.AsSpan(_length));
+                    break;
+                case DataEncoding.Hex:
+                    Reserve(DataEscaper.HexLength(data.Length));
+                    _length += DataEscaper.Hex(data, _buffer.AsSpan(_length));
+                    break;
+                default:
+                    // $REQ_SIMPLE_014: URL-encode data, then JSON-escape the result, in one pass
+                    Reserve(DataEscaper.MaxEscapedLength(data.Length));
+                    _length += DataEscaper.Escape(data, _buffer.AsSpan(_length));
+                    break;
+            }
+            Raw((byte)'"');
+        }
+
+        public LogLine Finish(string? connId = null)
+        {
+            Raw((byte)'}');
+            return LogArena.Append(_buffer.AsSpan(0, _length), _time, connId);
+        }
+
+        private void Name(ReadOnlySpan<byte> name)
+        {
+            Reserve(name.Length + 4);
+            if (!_first)
+            {
+                _buffer[_length++] = (byte)',';
+            }
+            _first = false;
+            _buffer[_length++] = (byte)'"';
+            name.CopyTo(_buffer.AsSpan(_length));
+            _length += name.Length;
+            _buffer[_length++] = (byte)'"';
+            _buffer[_length++] = (byte)':';
+        }
+
+        private void Encoded(string value)
+        {
+            // Encode the runs between quotes; each quote is written as \" rather than \u0022
+            var rest = value.AsSpan();
+            while (true)
+            {
+                var quote = rest.IndexOf('"');
+                var run = JsonEncodedText.Encode(quote < 0 ? rest : rest[..quote], JavaScriptEncoder.UnsafeRelaxedJsonEscaping).EncodedUtf8Bytes;
+                Raw(run);
+                if (quote < 0) break;
+                Raw("\\\""u8);
+                rest = rest[(quote + 1)..];
+            }
+        }
+
+        private void Raw(ReadOnlySpan<byte> bytes)
+        {
+            Reserve(bytes.Length);
+            bytes.CopyTo(_buffer.AsSpan(_length));
+            _length += bytes.Length;
+        }
+
+        private void Raw(byte b)
+        {
+            Reserve(1);
+            _buffer[_length++] = b;
+        }
+
+        private void Reserve(int count)
+        {
+            if (_length + count <= _buffer.Length) return;
+            var grown = new byte[Math.Max(_buffer.Length * 2, _length + count)];
+            _buffer.AsSpan(0, _length).CopyTo(grown);
+            _buffer = grown;
+            _scratch = grown;
+        }
+    }
+}
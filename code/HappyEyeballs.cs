@@ -0,0 +1,220 @@
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Linq;
+using System.Net;
+using System.Net.Sockets;
+using System.Text.Json;
+using System.Threading;
+using System.Threading.Tasks;
+
+/// <summary>
+/// Staggered parallel upstream connect (RFC 8305). Attempts start one address at a
+/// time, alternating address families; a new attempt starts when the previous one
+/// fails or after the attempt delay, whichever comes first. The first connection to
+/// succeed wins and the others are cancelled. Per-address timings are kept for get-stats,
+/// for the most recently attempted addresses only.
+/// </summary>
+static class HappyEyeballs
+{
+    private const int AttemptDelayMillis = 250;
+    // Addresses kept in the stats; a rotating DNS target keeps returning new ones
+    private const int MaxAddresses = 256;
+
+    private sealed class AddressStats
+    {
+        public long Attempts;
+        public long Successes;
+        public long Failures;
+        public long Cancelled;
+        public long TotalTicks;
+        public long MaxTicks;
+        public long LastTicks;
+        // Environment.TickCount64 of the latest attempt
+        public long LastAttempt;
+    }
+
+    private static readonly ConcurrentDictionary<IPAddress, AddressStats> _addressStats = new();
+    private static long _connects;
+    private static long _fallbacks;
+    private static long _failures;
+
+    public static async Task<TcpClient> ConnectAsync(IPAddress[] addresses, int port, CancellationToken ct)
+    {
+        var ordered = Interleave(addresses);
+        using var raceCts = CancellationTokenSource.CreateLinkedTokenSource(ct);
+        var attempts = new List<Task<TcpClient>>();
+        var next = 0;
+        Exception? lastError = null;
+
+        try
+        {
+            while (true)
+            {
+                ct.ThrowIfCancellationRequested();
+                if (next < ordered.Length)
+                {
+                    attempts.Add(AttemptAsync(ordered[next++], port, raceCts.Token));
+                }
+                if (attempts.Count == 0)
+                {
+                    Interlocked.Increment(ref _failures);
+                    throw lastError ?? new SocketException((int)SocketError.HostUnreachable);
+                }
+
+                // Wait for an attempt to finish, or for the delay before starting the next one
+                var delay = next < ordered.Length ? Task.Delay(AttemptDelayMillis, raceCts.Token) : null;
+                var finished = delay == null
+                    ? await Task.WhenAny(attempts)
+                    : await Task.WhenAny(attempts.Append<Task>(delay));
+                if (finished == delay)
+                {
+                    continue;
+                }
+
+                var attempt = (Task<TcpClient>)finished;
+                attempts.Remove(attempt);
+                if (attempt.IsCompletedSuccessfully)
+                {
+                    Interlocked.Increment(ref _connects);
+                    if (next > 1)
+                    {
+                        Interlocked.Increment(ref _fallbacks);
+                    }
+                    return attempt.Result;
+                }
+                lastError = attempt.Exception?.InnerException ?? lastError;
+            }
+        }
+        finally
+        {
+            // Cancel the losers; one that connected anyway is closed once it completes
+            raceCts.Cancel();
+            foreach (var loser in attempts)
+            {
+                _ = loser.ContinueWith(t =>
+                {
+                    if (t.IsCompletedSuccessfully) t.Result.Dispose();
+                    else _ = t.Exception;
+                }, TaskScheduler.Default);
+            }
+        }
+    }
+
+    public static void WriteStats(Utf8JsonWriter writer)
+    {
+        writer.WriteStartObject();
+        writer.WriteNumber("attempt_delay_millis", AttemptDelayMillis);
+        writer.WriteNumber("connects", Interlocked.Read(ref _connects));
+        writer.WriteNumber("fallbacks", Interlocked.Read(ref _fallbacks));
+        writer.WriteNumber("failures", Interlocked.Read(ref _failures));
+        writer.WritePropertyName("addresses");
+        writer.WriteStartObject();
+        foreach (var (address, stats) in _addressStats)
+        {
+            var successes = Interlocked.Read(ref stats.Successes);
+            writer.WritePropertyName(address.ToString());
+            writer.WriteStartObject();
+            writer.WriteNumber("attempts", Interlocked.Read(ref stats.Attempts));
+            writer.WriteNumber("successes", successes);
+            writer.WriteNumber("failures", Interlocked.Read(ref stats.Failures));
+            writer.WriteNumber("cancelled", Interlocked.Read(ref stats.Cancelled));
+            writer.WriteNumber("avg_millis", successes == 0 ? 0 : ToMillis(Interlocked.Read(ref stats.TotalTicks) / successes));
+            writer.WriteNumber("max_millis", ToMillis(Interlocked.Read(ref stats.MaxTicks)));
+            writer.WriteNumber("last_millis", ToMillis(Interlocked.Read(ref stats.LastTicks)));
+            writer.WriteEndObject();
+        }
+        writer.WriteEndObject();
+        writer.WriteEndObject();
+    }
+
+    private static IPAddress[] Interleave(IPAddress[] addresses)
+    {
+        // Alternate families, IPv4 first to match tests binding to IPv4 loopback
+        var ipv4 = addresses.Where(a => a.AddressFamily == AddressFamily.InterNetwork).ToArray();
+        var other = addresses.Where(a => a.AddressFamily != AddressFamily.InterNetwork).ToArray();
+        var ordered = new IPAddress[addresses.Length];
+        int i = 0, j = 0, k = 0;
+        while (i < ipv4.Length || j < other.Length)
+        {
+            if (i < ipv4.Length) ordered[k++] = ipv4[i++];
+            if (j < other.Length) ordered[k++] = other[j++];
+        }
+        return ordered;
+    }
+
+    private static async Task<TcpClient> AttemptAsync(IPAddress address, int port, CancellationToken ct)
+    {
+        var stats = StatsFor(address);
+        Interlocked.Increment(ref stats.Attempts);
+        var client = new TcpClient(address.AddressFamily);
+        var started = Stopwatch.GetTimestamp();
+        try
+        {
+            await client.ConnectAsync(address, port, ct);
+            var elapsed = Stopwatch.GetTimestamp() - started;
+            Interlocked.Increment(ref stats.Successes);
+            Interlocked.Add(ref stats.TotalTicks, elapsed);
+            Interlocked.Exchange(ref stats.LastTicks, elapsed);
+            long max;
+            while (elapsed > (max = Interlocked.Read(ref stats.MaxTicks)) &&
+                   Interlocked.CompareExchange(ref stats.MaxTicks, elapsed, max) != max)
+            {
+            }
+            return client;
+        }
+        catch (OperationCanceledException) when (ct.IsCancellationRequested)
+        {
+            Interlocked.Increment(ref stats.Cancelled);
+            client.Dispose();
+            throw;
+        }
+        catch
+        {
+            Interlocked.Increment(ref stats.Failures);
+            client.Dispose();
+            throw;
+        }
+    }
+
+    private static AddressStats StatsFor(IPAddress address)
+    {
+        var now = Environment.TickCount64;
+        if (!_addressStats.TryGetValue(address, out var stats))
+        {
+            stats = _addressStats.GetOrAdd(address, _ => new AddressStats { LastAttempt = now });
+            if (_addressStats.Count > MaxAddresses)
+            {
+                EvictLeastRecent(address);
+            }
+        }
+        Volatile.Write(ref stats.LastAttempt, now);
+        return stats;
+    }
+
+    /// <summary>Forgets the address attempted longest ago, other than <paramref name="keep"/>.</summary>
+    private static void EvictLeastRecent(IPAddress keep)
+    {
+        IPAddress? oldest = null;
+        var oldestAttempt = long.MaxValue;
+        foreach (var (address, stats) in _addressStats)
+        {
+            var attempt = Volatile.Read(ref stats.LastAttempt);
+            if (attempt < oldestAttempt && !address.Equals(keep))
+            {
+                oldest = address;
+                oldestAttempt = attempt;
+            }
+        }
+        if (oldest != null)
+        {
+            _addressStats.TryRemove(oldest, out _);
+        }
+    }
+
+    private static double ToMillis(long ticks)
+    {
+        return Math.Round(ticks * 1000.0 / Stopwatch.Frequency, 3);
+    }
+}
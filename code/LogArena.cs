@@ -0,0 +1,178 @@
+using System;
+using System.Collections.Concurrent;
+using System.Text.Json;
+using System.Threading;
+
+/// <summary>
+/// Shared storage for serialized log events. Each event is written once, as UTF-8
+/// followed by a newline, into a pooled slab; every destination that queues the
+/// event holds a reference to its slab, and the slab returns to the pool when the
+/// last destination has written it. Each thread appends to its own current slab,
+/// so consecutive events usually sit back to back and flush as one write.
+/// </summary>
+static class LogArena
+{
+    public const int SlabSize = 64 * 1024;
+    private const long MaxPooledBytes = 16 * 1024 * 1024;
+
+    private static readonly ConcurrentQueue<LogSlab> _free = new();
+    private static long _pooledBytes;
+    private static long _slabsInUse;
+    private static long _bytesInUse;
+    private static long _oversized;
+
+    [ThreadStatic] private static LogSlab? _current;
+
+    /// <summary>
+    /// Copies <paramref name="line"/> plus a newline into the arena. The returned
+    /// line holds one reference that the caller must release.
+    /// </summary>
+    public static LogLine Append(ReadOnlySpan<byte> line, DateTimeOffset time, string? connId)
+    {
+        return Append(line, ReadOnlySpan<byte>.Empty, "\n"u8, time, connId);
+    }
+
+    /// <summary>
+    /// Copies a binary record, given as its fixed part and its payload, into the arena
+    /// without a newline. The returned line holds one reference that the caller must release.
+    /// </summary>
+    public static LogLine AppendRecord(ReadOnlySpan<byte> head, ReadOnlySpan<byte> payload, DateTimeOffset time, string? connId)
+    {
+        return Append(head, payload, ReadOnlySpan<byte>.Empty, time, connId);
+    }
+
+    /// <summary>As <see cref="AppendRecord(ReadOnlySpan{byte}, ReadOnlySpan{byte}, DateTimeOffset, string?)"/>, with a fixed part after the payload too.</summary>
+    public static LogLine AppendRecord(ReadOnlySpan<byte> head, ReadOnlySpan<byte> payload, ReadOnlySpan<byte> tail, DateTimeOffset time, string? connId)
+    {
+        return Append(head, payload, tail, time, connId);
+    }
+
+    private static LogLine Append(ReadOnlySpan<byte> head, ReadOnlySpan<byte> payload, ReadOnlySpan<byte> terminator, DateTimeOffset time, string? connId)
+    {
+        var size = head.Length + payload.Length + terminator.Length;
+        LogSlab slab;
+        if (size > SlabSize)
+        {
+            // Larger than a slab (big data chunks): give it a slab of its own
+            Interlocked.Increment(ref _oversized);
+            slab = Rent(size);
+        }
+        else
+        {
+            slab = _current ??= Rent(SlabSize);
+            if (slab.Buffer.Length - slab.Used < size)
+            {
+                slab.Release();
+                slab = _current = Rent(SlabSize);
+            }
+            slab.AddRef();
+        }
+
+        var offset = slab.Used;
+        var target = slab.Buffer.AsSpan(offset, size);
+        head.CopyTo(target);
+        payload.CopyTo(target[head.Length..]);
+        terminator.CopyTo(target[(head.Length + payload.Length)..]);
+        slab.Used = offset + size;
+        return new LogLine(slab, offset, size, time, connId);
+    }
+
+    public static void WriteStats(Utf8JsonWriter writer)
+    {
+        writer.WriteStartObject();
+        writer.WriteNumber("slab_size", SlabSize);
+        writer.WriteNumber("slabs_in_use", Interlocked.Read(ref _slabsInUse));
+        writer.WriteNumber("bytes_in_use", Interlocked.Read(ref _bytesInUse));
+        writer.WriteNumber("pooled_bytes", Interlocked.Read(ref _pooledBytes));
+        writer.WriteNumber("oversized_events", Interlocked.Read(ref _oversized));
+        writer.WriteEndObject();
+    }
+
+    private static LogSlab Rent(int size)
+    {
+        LogSlab? slab = null;
+        if (size == SlabSize && _free.TryDequeue(out slab))
+        {
+            Interlocked.Add(ref _pooledBytes, -SlabSize);
+        }
+        slab ??= new LogSlab(new byte[size]);
+        slab.Reset();
+        Interlocked.Increment(ref _slabsInUse);
+        Interlocked.Add(ref _bytesInUse, slab.Buffer.Length);
+        return slab;
+    }
+
+    internal static void Return(LogSlab slab)
+    {
+        Interlocked.Decrement(ref _slabsInUse);
+        Interlocked.Add(ref _bytesInUse, -slab.Buffer.Length);
+        if (slab.Buffer.Length == SlabSize && Interlocked.Add(ref _pooledBytes, SlabSize) <= MaxPooledBytes)
+        {
+            _free.Enqueue(slab);
+        }
+        else if (slab.Buffer.Length == SlabSize)
+        {
+            Interlocked.Add(ref _pooledBytes, -SlabSize);
+        }
+    }
+}
+
+sealed class LogSlab
+{
+    private int _refCount;
+
+    public byte[] Buffer { get; }
+    public int Used { get; set; }
+
+    public LogSlab(byte[] buffer)
+    {
+        Buffer = buffer;
+    }
+
+    public void Reset()
+    {
+        Used = 0;
+        _refCount = 1;
+    }
+
+    public void AddRef()
+    {
+        Interlocked.Increment(ref _refCount);
+    }
+
+    public void Release()
+    {
+        if (Interlocked.Decrement(ref _refCount) == 0)
+        {
+            LogArena.Return(this);
+        }
+    }
+}
+
+/// <summary>
+/// One serialized event (an NDJSON line with its newline, or a binary record) inside an arena slab, with its time and
+/// the connection it belongs to (null for control events such as start-logging).
+/// </summary>
+readonly struct LogLine
+{
+    public LogSlab Slab { get; }
+    public int Offset { get; }
+    public int Length { get; }
+    public DateTimeOffset Time { get; }
+    public string? ConnId { get; }
+
+    public LogLine(LogSlab slab, int offset, int length, DateTimeOffset time, string? connId)
+    {
+        Slab = slab;
+        Offset = offset;
+        Length = length;
+        Time = time;
+        ConnId = connId;
+    }
+
+    public ReadOnlySpan<byte> Span => Slab.Buffer.AsSpan(Offset, Length);
+
+    public void AddRef() => Slab.AddRef();
+
+    public void Release() => Slab.Release();
+}
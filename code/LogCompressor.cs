@@ -0,0 +1,132 @@
+using System;
+using System.IO;
+using System.IO.Compression;
+using System.Text.Json;
+using System.Threading;
+using System.Threading.Tasks;
+
+/// <summary>
+/// Compression of a directory destination's files (--compress). Every flush writes one
+/// complete gzip member or Brotli stream per file, so a file is decodable up to its
+/// last flush while it is still being written, and a restart simply appends further
+/// members. Compression runs in the destination's flush loop, never on a network thread.
+/// </summary>
+sealed class LogCompressor
+{
+    private readonly LogCompression _codec;
+    private long _uncompressedBytes;
+    private long _compressedBytes;
+
+    public LogCompressor(LogCompression codec)
+    {
+        _codec = codec;
+    }
+
+    /// <summary>Appended to every filename of the destination.</summary>
+    public string Suffix => _codec switch
+    {
+        LogCompression.Gzip => ".gz",
+        LogCompression.Brotli => ".br",
+        _ => ""
+    };
+
+    /// <summary>
+    /// A stream that compresses into <paramref name="file"/>. Disposing it ends the
+    /// member and disposes <paramref name="file"/>.
+    /// </summary>
+    public Stream Wrap(Stream file)
+    {
+        // Fastest: the flush loop has to keep up with capture, and text still shrinks several times over
+        var output = new CountingStream(file, this, compressed: true);
+        Stream codec = _codec == LogCompression.Brotli
+            ? new BrotliStream(output, CompressionLevel.Fastest)
+            : new GZipStream(output, CompressionLevel.Fastest);
+        return new CountingStream(codec, this, compressed: false);
+    }
+
+    public void WriteStats(Utf8JsonWriter writer)
+    {
+        writer.WriteStartObject();
+        writer.WriteString("codec", LogOptions.CompressionName(_codec));
+        writer.WriteNumber("uncompressed_bytes", Interlocked.Read(ref _uncompressedBytes));
+        writer.WriteNumber("compressed_bytes", Interlocked.Read(ref _compressedBytes));
+        writer.WriteEndObject();
+    }
+
+    /// <summary>Write-only pass-through that adds what it writes to the compressor's totals.</summary>
+    private sealed class CountingStream : Stream
+    {
+        private readonly Stream _inner;
+        private readonly LogCompressor _owner;
+        private readonly bool _compressed;
+
+        public CountingStream(Stream inner, LogCompressor owner, bool compressed)
+        {
+            _inner = inner;
+            _owner = owner;
+            _compressed = compressed;
+        }
+
+        public override bool CanRead => false;
+        public override bool CanSeek => false;
+        public override bool CanWrite => true;
+        public override long Length => throw new NotSupportedException();
+        public override long Position
+        {
+            get => throw new NotSupportedException();
+            set => throw new NotSupportedException();
+        }
+
+        public override void Write(byte[] buffer, int offset, int count) => Write(buffer.AsSpan(offset, count));
+
+        public override void Write(ReadOnlySpan<byte> buffer)
+        {
+            _inner.Write(buffer);
+            Count(buffer.Length);
+        }
+
+        public override async ValueTask WriteAsync(ReadOnlyMemory<byte> buffer, CancellationToken cancellationToken = default)
+        {
+            await _inner.WriteAsync(buffer, cancellationToken);
+            Count(buffer.Length);
+        }
+
+        public override Task WriteAsync(byte[] buffer, int offset, int count, CancellationToken cancellationToken) =>
+            WriteAsync(buffer.AsMemory(offset, count), cancellationToken).AsTask();
+
+        public override void Flush() => _inner.Flush();
+
+        public override Task FlushAsync(CancellationToken cancellationToken) => _inner.FlushAsync(cancellationToken);
+
+        protected override void Dispose(bool disposing)
+        {
+            if (disposing)
+            {
+                _inner.Dispose();
+            }
+            base.Dispose(disposing);
+        }
+
+        public override async ValueTask DisposeAsync()
+        {
+            await _inner.DisposeAsync();
+            GC.SuppressFinalize(this);
+        }
+
+        public override int Read(byte[] buffer, int offset, int count) => throw new NotSupportedException();
+        public override long Seek(long offset, SeekOrigin origin) => throw new NotSupportedException();
+        public override void SetLength(long value) => throw new NotSupportedException();
+
+        private void Count(int length)
+        {
+            if (_compressed)
+            {
+                Interlocked.Add(ref _owner._compressedBytes, length);
+            }
+            else
+            {
+                Interlocked.Add(ref _owner._uncompressedBytes, length);
+            }
+        }
+    }
+}
@@ -0,0 +1,280 @@
+using System;
+using System.Buffers.Binary;
+using System.Collections.Generic;
+using System.IO;
+using System.IO.Compression;
+using System.Text;
+using System.Threading.Tasks;
+
+/// <summary>
+/// <c>rawprox --decode FILE...</c>: writes the events of log files to STDOUT as the
+/// NDJSON lines an NDJSON destination would have written. Binary files (see
+/// <see cref="BinaryEventWriter"/>) are decoded record by record, NDJSON files are
+/// copied as they are, and .gz and .br files are decompressed first, all of their
+/// members included. Files are decoded in the order given.
+/// </summary>
+static class LogDecoder
+{
+    private const string Unknown = "unknown";
+
+    public static async Task<int> Run(string[] paths)
+    {
+        var exitCode = 0;
+        await using var output = new BufferedStream(Console.OpenStandardOutput(), 64 * 1024);
+        foreach (var path in paths)
+        {
+            try
+            {
+                await using var input = Open(path);
+                if (!Decode(input, output))
+                {
+                    await Console.Error.WriteLineAsync($"Error: {path} ends in an incomplete record");
+                    exitCode = 1;
+                }
+            }
+            catch (Exception ex) when (ex is IOException or UnauthorizedAccessException or InvalidDataException)
+            {
+                await Console.Error.WriteLineAsync($"Error: cannot decode {path}: {ex.Message}");
+                exitCode = 1;
+            }
+        }
+        await output.FlushAsync();
+        return exitCode;
+    }
+
+    private static Stream Open(string path)
+    {
+        Stream file = new FileStream(path, FileMode.Open, FileAccess.Read, FileShare.ReadWrite, bufferSize: 64 * 1024);
+        if (path.EndsWith(".gz", StringComparison.Ordinal))
+        {
+            // GZipStream reads concatenated members, one per flush
+            return new GZipStream(file, CompressionMode.Decompress);
+        }
+        if (path.EndsWith(".br", StringComparison.Ordinal))
+        {
+            return new ConcatenatedBrotliStream(file);
+        }
+        return file;
+    }
+
+    /// <summary>Decodes one file; false when it ends in an incomplete record.</summary>
+    private static bool Decode(Stream input, Stream output)
+    {
+        var buffer = new byte[64 * 1024];
+        var count = ReadSome(input, buffer, 0);
+        if (count == 0) return true;
+        if (PcapngWriter.IsPcapng(buffer.AsSpan(0, count)))
+        {
+            throw new InvalidDataException("pcapng files are read with Wireshark or tshark");
+        }
+        if (buffer[0] == (byte)'{')
+        {
+            // Already NDJSON
+            output.Write(buffer, 0, count);
+            input.CopyTo(output);
+            return true;
+        }
+
+        // Indexes are per run of rawprox; a file a later run appended to declares them again
+        var connections = new Dictionary<uint, Connection>();
+        var filled = count;
+        while (true)
+        {
+            var position = 0;
+            int length;
+            while ((length = BinaryEventWriter.RecordLength(buffer.AsSpan(position, filled - position))) > 0)
+            {
+                WriteRecord(buffer.AsSpan(position, length), connections, output);
+                position += length;
+            }
+            // Keep the incomplete record at the start, growing the buffer for one that is larger
+            Buffer.BlockCopy(buffer, position, buffer, 0, filled - position);
+            filled -= position;
+            if (filled == buffer.Length)
+            {
+                Array.Resize(ref buffer, buffer.Length * 2);
+            }
+            count = ReadSome(input, buffer, filled);
+            if (count == 0) return filled == 0;
+            filled += count;
+        }
+    }
+
+    private static int ReadSome(Stream input, byte[] buffer, int offset)
+    {
+        return input.Read(buffer, offset, buffer.Length - offset);
+    }
+
+    private static void WriteRecord(ReadOnlySpan<byte> record, Dictionary<uint, Connection> connections, Stream output)
+    {
+        BinaryEventWriter.TryReadTime(record, out var time);
+        var body = record[(BinaryEventWriter.HeaderLength + 8)..];
+        LogLine line;
+        switch (record[0])
+        {
+            case BinaryEventWriter.OpenRecord:
+            case BinaryEventWriter.DeclareRecord:
+            {
+                var index = BinaryPrimitives.ReadUInt32LittleEndian(body);
+                var connection = ReadConnection(body);
+                connections[index] = connection;
+                // A declare record only restates the endpoints for this file
+                if (record[0] != BinaryEventWriter.OpenRecord) return;
+                line = EventWriter.Open(time, connection.ConnId, connection.Client, connection.Target, connection.Listener, connection.ListenPort);
+                break;
+            }
+            case BinaryEventWriter.DataRecord:
+            {
+                var connection = Find(connections, BinaryPrimitives.ReadUInt32LittleEndian(body));
+                var flags = body[4];
+                var truncatedFrom = -1;
+                var payload = body[5..];
+                if ((flags & BinaryEventWriter.Truncated) != 0)
+                {
+                    truncatedFrom = BinaryPrimitives.ReadInt32LittleEndian(payload);
+                    payload = payload[4..];
+                }
+                var chunks = 1;
+                var lastTime = default(DateTimeOffset);
+                if ((flags & BinaryEventWriter.Coalesced) != 0)
+                {
+                    chunks = BinaryPrimitives.ReadInt32LittleEndian(payload);
+                    lastTime = new DateTimeOffset(BinaryPrimitives.ReadInt64LittleEndian(payload[4..]), TimeSpan.Zero);
+                    payload = payload[12..];
+                }
+                var fromClient = (flags & BinaryEventWriter.FromClient) != 0;
+                line = EventWriter.Data(time, connection.ConnId, payload,
+                    fromClient ? connection.Client : connection.Target,
+                    fromClient ? connection.Target : connection.Client,
+                    connection.Listener, connection.ListenPort, truncatedFrom, DataEncoding.Url, chunks, lastTime);
+                break;
+            }
+            case BinaryEventWriter.CloseRecord:
+            {
+                var index = BinaryPrimitives.ReadUInt32LittleEndian(body);
+                var connection = Find(connections, index);
+                connections.Remove(index);
+                line = EventWriter.Close(time, connection.ConnId, connection.Target, connection.Client, connection.Listener,
+                    BinaryEventWriter.ReadTotals(body[4..]));
+                break;
+            }
+            case BinaryEventWriter.EventRecord:
+                output.Write(body);
+                output.WriteByte((byte)'\n');
+                return;
+            default:
+                // Record types a later version may add
+                return;
+        }
+        output.Write(line.Span);
+        line.Release();
+    }
+
+    private static Connection Find(Dictionary<uint, Connection> connections, uint index)
+    {
+        // The connection was dropped from the table before the file could declare it
+        return connections.TryGetValue(index, out var connection)
+            ? connection
+            : new Connection(Unknown, Unknown, Unknown, Unknown, 0);
+    }
+
+    private static Connection ReadConnection(ReadOnlySpan<byte> body)
+    {
+        var listenPort = BinaryPrimitives.ReadUInt16LittleEndian(body[4..]);
+        var rest = body[6..];
+        var values = new string[4];
+        for (int i = 0; i < values.Length; i++)
+        {
+            var length = BinaryPrimitives.ReadUInt16LittleEndian(rest);
+            values[i] = Encoding.UTF8.GetString(rest.Slice(2, length));
+            rest = rest[(2 + length)..];
+        }
+        return new Connection(values[0], values[1], values[2], values[3], listenPort);
+    }
+
+    private readonly record struct Connection(string ConnId, string Client, string Target, string Listener, int ListenPort);
+
+    /// <summary>
+    /// Reads Brotli streams written back to back, one per flush. BrotliStream stops at the
+    /// end of the first one.
+    /// </summary>
+    private sealed class ConcatenatedBrotliStream : Stream
+    {
+        private readonly Stream _inner;
+        private readonly byte[] _input = new byte[64 * 1024];
+        private BrotliDecoder _decoder;
+        private int _start;
+        private int _end;
+        private bool _innerDone;
+        private bool _inStream;
+
+        public ConcatenatedBrotliStream(Stream inner)
+        {
+            _inner = inner;
+        }
+
+        public override bool CanRead => true;
+        public override bool CanSeek => false;
+        public override bool CanWrite => false;
+        public override long Length => throw new NotSupportedException();
+        public override long Position
+        {
+            get => throw new NotSupportedException();
+            set => throw new NotSupportedException();
+        }
+
+        public override int Read(byte[] buffer, int offset, int count) => Read(buffer.AsSpan(offset, count));
+
+        public override int Read(Span<byte> buffer)
+        {
+            while (true)
+            {
+                if (_start == _end && !_innerDone)
+                {
+                    _start = 0;
+                    _end = _inner.Read(_input, 0, _input.Length);
+                    _innerDone = _end == 0;
+                }
+                if (_start == _end && _innerDone)
+                {
+                    if (_inStream) throw new InvalidDataException("Brotli stream ends early");
+                    return 0;
+                }
+
+                _inStream = true;
+                var status = _decoder.Decompress(_input.AsSpan(_start, _end - _start), buffer, out var consumed, out var written);
+                _start += consumed;
+                if (status == System.Buffers.OperationStatus.InvalidData)
+                {
+                    throw new InvalidDataException("Invalid Brotli data");
+                }
+                if (status == System.Buffers.OperationStatus.Done)
+                {
+                    // Next stream, if any, starts with a fresh decoder
+                    _decoder.Dispose();
+                    _decoder = default;
+                    _inStream = false;
+                }
+                if (written > 0) return written;
+            }
+        }
+
+        public override void Flush()
+        {
+        }
+
+        protected override void Dispose(bool disposing)
+        {
+            if (disposing)
+            {
+                _decoder.Dispose();
+                _inner.Dispose();
+            }
+            base.Dispose(disposing);
+        }
+
+        public override long Seek(long offset, SeekOrigin origin) => throw new NotSupportedException();
+        public override void SetLength(long value) => throw new NotSupportedException();
+        public override void Write(byte[] buffer, int offset, int count) => throw new NotSupportedException();
+    }
+}
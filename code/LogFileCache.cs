@@ -0,0 +1,163 @@
+using System;
+using System.Collections.Generic;
+using System.IO;
+using System.Text.Json;
+using System.Threading;
+using System.Threading.Tasks;
+using Microsoft.Win32.SafeHandles;
+
+/// <summary>
+/// Log files of one destination kept open between flushes (--keep-files-open), for
+/// filesystems where open and close cost metadata round trips. Writes go to a tracked
+/// offset with <see cref="RandomAccess"/>. Before each flush the path is checked to
+/// still hold the file that was written: if it was moved away, replaced or appended
+/// to by someone else, its length no longer matches and the file is reopened. Files
+/// are closed when the destination rotates to another file or after an idle timeout.
+/// </summary>
+sealed class LogFileCache : IDisposable
+{
+    private readonly string _directory;
+    private readonly long _idleMillis;
+    private readonly Dictionary<string, OpenFile> _files = new(StringComparer.Ordinal);
+    private long _opens;
+    private long _reopens;
+    private long _closes;
+
+    public LogFileCache(string directory, int idleMillis)
+    {
+        _directory = directory;
+        _idleMillis = idleMillis;
+    }
+
+    /// <summary>
+    /// A stream appending to <paramref name="filename"/> through the cached handle.
+    /// Disposing the stream leaves the file open.
+    /// </summary>
+    public Stream Open(string filename)
+    {
+        var path = Path.Combine(_directory, filename);
+        if (_files.TryGetValue(filename, out var file))
+        {
+            // One stat instead of open + close: is this still the file we wrote?
+            var info = new FileInfo(path);
+            if (info.Exists && info.Length == file.Offset)
+            {
+                file.LastUsed = Environment.TickCount64;
+                return new BufferedStream(new AppendStream(file), 64 * 1024);
+            }
+            file.Handle.Dispose();
+            _files.Remove(filename);
+            _reopens++;
+        }
+
+        var handle = File.OpenHandle(path, FileMode.OpenOrCreate, FileAccess.Write, FileShare.Read | FileShare.Delete);
+        file = new OpenFile(handle, RandomAccess.GetLength(handle));
+        _files.Add(filename, file);
+        _opens++;
+        return new BufferedStream(new AppendStream(file), 64 * 1024);
+    }
+
+    /// <summary>
+    /// Closes files that the last flush did not write: at once when it wrote another
+    /// file (the destination rotated), otherwise after the idle timeout.
+    /// </summary>
+    public void CloseUnused(ICollection<string> written)
+    {
+        var now = Environment.TickCount64;
+        List<string>? closing = null;
+        foreach (var (filename, file) in _files)
+        {
+            if (written.Contains(filename)) continue;
+            if (written.Count > 0 || now - file.LastUsed >= _idleMillis)
+            {
+                (closing ??= new List<string>()).Add(filename);
+            }
+        }
+        if (closing == null) return;
+        foreach (var filename in closing)
+        {
+            _files[filename].Handle.Dispose();
+            _files.Remove(filename);
+            _closes++;
+        }
+    }
+
+    public void WriteStats(Utf8JsonWriter writer)
+    {
+        writer.WriteStartObject();
+        writer.WriteNumber("open_files", Volatile.Read(ref _opens) - Volatile.Read(ref _reopens) - Volatile.Read(ref _closes));
+        writer.WriteNumber("opens", Volatile.Read(ref _opens));
+        writer.WriteNumber("reopens", Volatile.Read(ref _reopens));
+        writer.WriteNumber("closes", Volatile.Read(ref _closes));
+        writer.WriteEndObject();
+    }
+
+    public void Dispose()
+    {
+        foreach (var file in _files.Values)
+        {
+            file.Handle.Dispose();
+            _closes++;
+        }
+        _files.Clear();
+    }
+
+    private sealed class OpenFile
+    {
+        public readonly SafeFileHandle Handle;
+        public long Offset;
+        public long LastUsed = Environment.TickCount64;
+
+        public OpenFile(SafeFileHandle handle, long offset)
+        {
+            Handle = handle;
+            Offset = offset;
+        }
+    }
+
+    /// <summary>Write-only stream over a cached handle that advances its offset; never closes the handle.</summary>
+    private sealed class AppendStream : Stream
+    {
+        private readonly OpenFile _file;
+
+        public AppendStream(OpenFile file)
+        {
+            _file = file;
+        }
+
+        public override bool CanRead => false;
+        public override bool CanSeek => false;
+        public override bool CanWrite => true;
+        public override long Length => throw new NotSupportedException();
+        public override long Position
+        {
+            get => throw new NotSupportedException();
+            set => throw new NotSupportedException();
+        }
+
+        public override void Write(byte[] buffer, int offset, int count) => Write(buffer.AsSpan(offset, count));
+
+        public override void Write(ReadOnlySpan<byte> buffer)
+        {
+            RandomAccess.Write(_file.Handle, buffer, _file.Offset);
+            _file.Offset += buffer.Length;
+        }
+
+        public override async ValueTask WriteAsync(ReadOnlyMemory<byte> buffer, CancellationToken cancellationToken = default)
+        {
+            await RandomAccess.WriteAsync(_file.Handle, buffer, _file.Offset, cancellationToken);
+            _file.Offset += buffer.Length;
+        }
+
+        public override Task WriteAsync(byte[] buffer, int offset, int count, CancellationToken cancellationToken) =>
+            WriteAsync(buffer.AsMemory(offset, count), cancellationToken).AsTask();
+
+        public override void Flush()
+        {
+        }
+
+        public override int Read(byte[] buffer, int offset, int count) => throw new NotSupportedException();
+        public override long Seek(long offset, SeekOrigin origin) => throw new NotSupportedException();
+        public override void SetLength(long value) => throw new NotSupportedException();
+    }
+}
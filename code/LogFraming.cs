@@ -0,0 +1,61 @@
+using System;
+using System.Buffers.Binary;
+
+/// <summary>
+/// Record boundaries and timestamps of serialized events in either log format, for
+/// code that handles runs of events as bytes: spill draining, size rotation and the
+/// period routing of spilled events. NDJSON records end with a newline; binary
+/// records (see <see cref="BinaryEventWriter"/>) and pcapng blocks carry their length.
+/// </summary>
+static class LogFraming
+{
+    /// <summary>Bytes of the whole records <paramref name="bytes"/> starts with.</summary>
+    public static int WholeRecords(LogFormat format, ReadOnlySpan<byte> bytes)
+    {
+        if (format == LogFormat.Ndjson)
+        {
+            return bytes.LastIndexOf((byte)'\n') + 1;
+        }
+        var position = 0;
+        int length;
+        while ((length = RecordLength(format, bytes[position..])) > 0)
+        {
+            position += length;
+        }
+        return position;
+    }
+
+    /// <summary>Length of the first record, or 0 when <paramref name="bytes"/> does not hold all of it.</summary>
+    public static int FirstRecord(LogFormat format, ReadOnlySpan<byte> bytes)
+    {
+        return format == LogFormat.Ndjson
+            ? bytes.IndexOf((byte)'\n') + 1
+            : RecordLength(format, bytes);
+    }
+
+    /// <summary>
+    /// Bytes of the whole records that fit in <paramref name="room"/> bytes. Where
+    /// even the first record does not fit, 0.
+    /// </summary>
+    public static int RecordsWithin(LogFormat format, ReadOnlySpan<byte> bytes, long room)
+    {
+        if (room <= 0) return 0;
+        return WholeRecords(format, bytes[..(int)Math.Min(room, bytes.Length)]);
+    }
+
+    /// <summary>The time of the record <paramref name="record"/> starts with.</summary>
+    public static bool TryReadTime(LogFormat format, ReadOnlySpan<byte> record, out DateTimeOffset time)
+    {
+        return format switch
+        {
+            LogFormat.Binary => BinaryEventWriter.TryReadTime(record, out time),
+            LogFormat.Pcapng => PcapngWriter.TryReadTime(record, out time),
+            _ => EventWriter.TryReadTime(record, out time)
+        };
+    }
+
+    private static int RecordLength(LogFormat format, ReadOnlySpan<byte> bytes)
+    {
+        return format == LogFormat.Pcapng ? PcapngWriter.BlockLength(bytes) : BinaryEventWriter.RecordLength(bytes);
+    }
+}
@@ -0,0 +1,217 @@
+using System;
+
+/// <summary>What a log destination does with an event that would exceed its memory budget.</summary>
+enum OverflowPolicy
+{
+    /// <summary>Drop the incoming event.</summary>
+    DropNewest,
+    /// <summary>Drop the oldest queued events until the incoming one fits.</summary>
+    DropOldest,
+    /// <summary>Queue a data event with its payload cut short; drop it if even that does not fit.</summary>
+    Truncate,
+    /// <summary>Append events to segment files in the spill directory until the destination catches up.</summary>
+    Spill
+}
+
+/// <summary>How a destination serializes events.</summary>
+enum LogFormat
+{
+    /// <summary>One JSON object per line, payloads URL-encoded.</summary>
+    Ndjson,
+    /// <summary>Length-prefixed records with raw payloads; see <see cref="BinaryEventWriter"/>.</summary>
+    Binary,
+    /// <summary>Connection events as TCP packets for Wireshark; see <see cref="PcapngWriter"/>.</summary>
+    Pcapng
+}
+
+/// <summary>How NDJSON data events write their payload.</summary>
+enum DataEncoding
+{
+    /// <summary>URL-encoded text, no enc field.</summary>
+    Url,
+    Base64,
+    Hex,
+    /// <summary>URL-encoding or base64, whichever is shorter for each chunk.</summary>
+    Auto
+}
+
+/// <summary>Codec a directory destination compresses its files with.</summary>
+enum LogCompression
+{
+    None,
+    Gzip,
+    Brotli
+}
+
+/// <summary>
+/// Per-destination logging settings. Command-line flags set the defaults;
+/// start-logging arguments override them for a single destination.
+/// </summary>
+sealed record LogOptions
+{
+    /// <summary>Bytes of serialized events a destination may hold before flushing (0 = unlimited).</summary>
+    public long MaxBufferBytes { get; init; }
+
+    public OverflowPolicy OverflowPolicy { get; init; } = OverflowPolicy.DropNewest;
+
+    public LogFormat Format { get; init; } = LogFormat.Ndjson;
+
+    /// <summary>Payload encoding of NDJSON data events; binary and pcapng output carry raw bytes.</summary>
+    public DataEncoding DataEncoding { get; init; } = DataEncoding.Url;
+
+    /// <summary>Each flush appends one compressed member per file; the codec's extension is added to the filename.</summary>
+    public LogCompression Compression { get; init; } = LogCompression.None;
+
+    /// <summary>Keep log files open between flushes instead of open-write-close per flush.</summary>
+    public bool KeepFilesOpen { get; init; }
+
+    /// <summary>How long a kept-open file may go unwritten before it is closed.</summary>
+    public int FileIdleMillis { get; init; } = 10000;
+
+    /// <summary>Size a log file may reach before the period continues in a sequence-numbered file (0 = unlimited).</summary>
+    public long MaxFileBytes { get; init; }
+
+    /// <summary>Total size of the destination's log files to keep; the oldest are deleted beyond it (0 = unlimited).</summary>
+    public long RetainBytes { get; init; }
+
+    /// <summary>Age after its last write at which a log file is deleted (0 = unlimited).</summary>
+    public long RetainSeconds { get; init; }
+
+    /// <summary>Local scratch directory for the spill policy's segment files.</summary>
+    public string? SpillDirectory { get; init; }
+
+    /// <summary>Spilled bytes not yet written to the destination that may be kept on disk (0 = unlimited).</summary>
+    public long MaxSpillBytes { get; init; }
+
+    /// <summary>Rings events are queued in until the destination drains them (0 = one per processor).</summary>
+    public int LogRings { get; init; }
+
+    /// <summary>Events each ring holds, rounded up to a power of two.</summary>
+    public int LogRingSlots { get; init; } = 1024;
+
+    public static bool TryParsePolicy(string? value, out OverflowPolicy policy)
+    {
+        switch (value)
+        {
+            case "drop-newest":
+                policy = OverflowPolicy.DropNewest;
+                return true;
+            case "drop-oldest":
+                policy = OverflowPolicy.DropOldest;
+                return true;
+            case "truncate":
+                policy = OverflowPolicy.Truncate;
+                return true;
+            case "spill":
+                policy = OverflowPolicy.Spill;
+                return true;
+            default:
+                policy = default;
+                return false;
+        }
+    }
+
+    public static string PolicyName(OverflowPolicy policy) => policy switch
+    {
+        OverflowPolicy.DropOldest => "drop-oldest",
+        OverflowPolicy.Truncate => "truncate",
+        OverflowPolicy.Spill => "spill",
+        _ => "drop-newest"
+    };
+
+    public static bool TryParseFormat(string? value, out LogFormat format)
+    {
+        switch (value)
+        {
+            case "ndjson":
+                format = LogFormat.Ndjson;
+                return true;
+            case "binary":
+                format = LogFormat.Binary;
+                return true;
+            case "pcapng":
+                format = LogFormat.Pcapng;
+                return true;
+            default:
+                format = default;
+                return false;
+        }
+    }
+
+    public static bool TryParseDataEncoding(string? value, out DataEncoding encoding)
+    {
+        switch (value)
+        {
+            case "url":
+                encoding = DataEncoding.Url;
+                return true;
+            case "base64":
+                encoding = DataEncoding.Base64;
+                return true;
+            case "hex":
+                encoding = DataEncoding.Hex;
+                return true;
+            case "auto":
+                encoding = DataEncoding.Auto;
+                return true;
+            default:
+                encoding = default;
+                return false;
+        }
+    }
+
+    public static string DataEncodingName(DataEncoding encoding) => encoding switch
+    {
+        DataEncoding.Base64 => "base64",
+        DataEncoding.Hex => "hex",
+        DataEncoding.Auto => "auto",
+        _ => "url"
+    };
+
+    public static string FormatName(LogFormat format) => format switch
+    {
+        LogFormat.Binary => "binary",
+        LogFormat.Pcapng => "pcapng",
+        _ => "ndjson"
+    };
+
+    /// <summary>The filename format a destination uses: binary files end in .rpx and pcapng files in .pcapng instead of .ndjson.</summary>
+    public static string FilenameFormat(string filenameFormat, LogFormat format)
+    {
+        var extension = format switch
+        {
+            LogFormat.Binary => ".rpx",
+            LogFormat.Pcapng => ".pcapng",
+            _ => null
+        };
+        return extension != null && filenameFormat.EndsWith(".ndjson", StringComparison.Ordinal)
+            ? filenameFormat[..^".ndjson".Length] + extension
+            : filenameFormat;
+    }
+
+    public static bool TryParseCompression(string? value, out LogCompression compression)
+    {
+        switch (value)
+        {
+            case "none":
+                compression = LogCompression.None;
+                return true;
+            case "gzip":
+                compression = LogCompression.Gzip;
+                return true;
+            case "brotli":
+                compression = LogCompression.Brotli;
+                return true;
+            default:
+                compression = default;
+                return false;
+        }
+    }
+
+    public static string CompressionName(LogCompression compression) => compression switch
+    {
+        LogCompression.Gzip => "gzip",
+        LogCompression.Brotli => "brotli",
+        _ => "none"
+    };
+}
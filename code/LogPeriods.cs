@@ -0,0 +1,328 @@
+using System;
+using System.Collections.Generic;
+using System.Globalization;
+using System.IO;
+using System.Text;
+using System.Text.RegularExpressions;
+
+/// <summary>
+/// One buffer per rotation period of a log destination ($REQ_ROT_013). Events are
+/// routed when the destination drains its rings, by their own timestamp, so an event
+/// from 14:59:59 that is flushed at 15:00:01 still lands in the 14:00 file. The period
+/// boundaries and filename are computed once per period from the smallest time unit in
+/// the filename format; the buffer of a closed period is retired once it is empty.
+/// </summary>
+sealed class LogPeriods
+{
+    private enum Unit
+    {
+        None,
+        Year,
+        Month,
+        Day,
+        Hour,
+        Minute,
+        Second
+    }
+
+    private readonly string? _timeFormat;
+    private readonly Unit _unit;
+    private readonly Regex? _filePattern;
+    private readonly object _lock = new();
+    // Guarded by _lock, as are the periods' queues; ordered by period start
+    private readonly SortedList<DateTime, LogPeriod> _periods = new();
+    private volatile LogPeriod _current;
+
+    /// <param name="filenameFormat">Strftime-style filename pattern, or null for a destination without files.</param>
+    public LogPeriods(string? filenameFormat)
+    {
+        if (filenameFormat != null)
+        {
+            (_timeFormat, _unit) = ParseFormat(filenameFormat);
+            Extension = SequenceExtension(filenameFormat);
+            _filePattern = FilePattern(filenameFormat, Extension);
+        }
+        _current = Create(DateTime.UtcNow);
+    }
+
+    /// <summary>
+    /// The fixed extension of the filename format (".ndjson"), which size-rotated
+    /// files keep after their sequence number; empty when the format has none.
+    /// </summary>
+    public string Extension { get; } = "";
+
+    /// <summary>Whether <paramref name="filename"/> is a file this format produces, sequence numbers included.</summary>
+    public bool IsLogFile(string filename) => _filePattern?.IsMatch(filename) == true;
+
+    public int Count
+    {
+        get { lock (_lock) return _periods.Count; }
+    }
+
+    public bool IsEmpty
+    {
+        get
+        {
+            lock (_lock)
+            {
+                foreach (var period in _periods.Values)
+                {
+                    if (!period.IsEmpty) return false;
+                }
+                return true;
+            }
+        }
+    }
+
+    /// <summary>Queues a batch of lines, each in the buffer of its own period.</summary>
+    public void Enqueue(List<LogLine> lines)
+    {
+        lock (_lock)
+        {
+            foreach (var line in lines)
+            {
+                var period = _current;
+                var time = line.Time.UtcDateTime;
+                if (time < period.Start || time >= period.End)
+                {
+                    period = Get(time);
+                }
+                period.Queue.Enqueue(line);
+            }
+        }
+    }
+
+    /// <summary>The file an event with this timestamp belongs to.</summary>
+    public string FilenameFor(DateTimeOffset time)
+    {
+        var period = _current;
+        var utc = time.UtcDateTime;
+        return utc >= period.Start && utc < period.End ? period.Filename : Format(PeriodStart(utc));
+    }
+
+    /// <summary>Removes the oldest queued data line of any period; control lines are never removed.</summary>
+    public bool TryDequeueOldest(out LogLine line)
+    {
+        lock (_lock)
+        {
+            foreach (var period in _periods.Values)
+            {
+                while (period.Queue.TryDequeue(out line))
+                {
+                    if (line.ConnId != null) return true;
+                    period.Head.Add(line);
+                }
+            }
+        }
+        line = default;
+        return false;
+    }
+
+    /// <summary>Takes the buffered lines of every period that has any, oldest period first.</summary>
+    public List<(string Filename, List<LogLine> Lines)> Take()
+    {
+        lock (_lock)
+        {
+            var batches = new List<(string, List<LogLine>)>();
+            foreach (var period in _periods.Values)
+            {
+                if (!period.IsEmpty)
+                {
+                    var lines = new List<LogLine>(period.Head.Count + period.Queue.Count);
+                    lines.AddRange(period.Head);
+                    lines.AddRange(period.Queue);
+                    batches.Add((period.Filename, lines));
+                    period.Head.Clear();
+                    period.Queue.Clear();
+                }
+            }
+            return batches;
+        }
+    }
+
+    /// <summary>
+    /// Drops the buffers of periods that closed more than <paramref name="grace"/> ago and
+    /// are empty. The grace leaves room for events stamped just before a period ended
+    /// but queued after it.
+    /// </summary>
+    public void Retire(DateTime now, TimeSpan grace)
+    {
+        lock (_lock)
+        {
+            for (int i = _periods.Count - 1; i >= 0; i--)
+            {
+                var period = _periods.Values[i];
+                if (period != _current && period.End + grace <= now && period.IsEmpty)
+                {
+                    _periods.RemoveAt(i);
+                }
+            }
+        }
+    }
+
+    private LogPeriod Get(DateTime time)
+    {
+        var start = PeriodStart(time);
+        lock (_lock)
+        {
+            if (!_periods.TryGetValue(start, out var period))
+            {
+                period = Create(time);
+            }
+            if (period.Start > _current.Start)
+            {
+                _current = period;
+            }
+            return period;
+        }
+    }
+
+    private LogPeriod Create(DateTime time)
+    {
+        var start = PeriodStart(time);
+        var period = new LogPeriod(start, PeriodEnd(start), Format(start));
+        lock (_lock)
+        {
+            _periods[start] = period;
+        }
+        return period;
+    }
+
+    private string Format(DateTime start)
+    {
+        return _timeFormat == null ? "" : start.ToString(_timeFormat, CultureInfo.InvariantCulture); // $REQ_ROT_002
+    }
+
+    private DateTime PeriodStart(DateTime time) => _unit switch
+    {
+        Unit.Second => new DateTime(time.Ticks - time.Ticks % TimeSpan.TicksPerSecond, DateTimeKind.Utc),
+        Unit.Minute => new DateTime(time.Ticks - time.Ticks % TimeSpan.TicksPerMinute, DateTimeKind.Utc),
+        Unit.Hour => new DateTime(time.Ticks - time.Ticks % TimeSpan.TicksPerHour, DateTimeKind.Utc),
+        Unit.Day => time.Date,
+        Unit.Month => new DateTime(time.Year, time.Month, 1, 0, 0, 0, DateTimeKind.Utc),
+        Unit.Year => new DateTime(time.Year, 1, 1, 0, 0, 0, DateTimeKind.Utc),
+        _ => DateTime.MinValue
+    };
+
+    private DateTime PeriodEnd(DateTime start) => _unit switch
+    {
+        Unit.Second => start.AddSeconds(1),
+        Unit.Minute => start.AddMinutes(1),
+        Unit.Hour => start.AddHours(1),
+        Unit.Day => start.AddDays(1),
+        Unit.Month => start.AddMonths(1),
+        Unit.Year => start.AddYears(1),
+        _ => DateTime.MaxValue
+    };
+
+    /// <summary>
+    /// Converts the strftime-style pattern to a .NET custom format string and finds the
+    /// smallest time unit it contains, which is the length of a period.
+    /// </summary>
+    private static (string Format, Unit Unit) ParseFormat(string format)
+    {
+        var sb = new StringBuilder();
+        var literal = new StringBuilder();
+        var unit = Unit.None;
+
+        void FlushLiteral()
+        {
+            if (literal.Length == 0) return;
+            sb.Append('\'');
+            sb.Append(literal.ToString().Replace("'", "''"));
+            sb.Append('\'');
+            literal.Clear();
+        }
+
+        for (int i = 0; i < format.Length; i++)
+        {
+            if (format[i] == '%' && i + 1 < format.Length)
+            {
+                FlushLiteral();
+                i++;
+                var (token, tokenUnit) = format[i] switch
+                {
+                    'Y' => ("yyyy", Unit.Year),
+                    'm' => ("MM", Unit.Month),
+                    'd' => ("dd", Unit.Day),
+                    'H' => ("HH", Unit.Hour),
+                    'M' => ("mm", Unit.Minute),
+                    'S' => ("ss", Unit.Second),
+                    '%' => ("'%'", Unit.None),
+                    _ => ($"'{format[i]}'", Unit.None)
+                };
+                sb.Append(token);
+                if (tokenUnit > unit)
+                {
+                    unit = tokenUnit;
+                }
+            }
+            else
+            {
+                literal.Append(format[i]);
+            }
+        }
+
+        FlushLiteral();
+        return (sb.ToString(), unit);
+    }
+
+    private static string SequenceExtension(string format)
+    {
+        var extension = Path.GetExtension(format);
+        return extension.Contains('%') ? "" : extension;
+    }
+
+    /// <summary>
+    /// Matches every filename the format yields, with an optional <c>.N</c> sequence
+    /// before the extension and an optional compression suffix.
+    /// </summary>
+    private static Regex FilePattern(string format, string extension)
+    {
+        var stem = format[..^extension.Length];
+        var sb = new StringBuilder("^");
+        for (int i = 0; i < stem.Length; i++)
+        {
+            if (stem[i] == '%' && i + 1 < stem.Length)
+            {
+                i++;
+                sb.Append(stem[i] switch
+                {
+                    'Y' => @"\d{4}",
+                    'm' or 'd' or 'H' or 'M' or 'S' => @"\d{2}",
+                    _ => Regex.Escape(stem[i].ToString())
+                });
+            }
+            else
+            {
+                sb.Append(Regex.Escape(stem[i].ToString()));
+            }
+        }
+        sb.Append(@"(?:\.\d+)?");
+        sb.Append(Regex.Escape(extension));
+        // Compressed files of the destination, whichever codec wrote them
+        sb.Append(@"(?:\.gz|\.br)?$");
+        return new Regex(sb.ToString(), RegexOptions.CultureInvariant);
+    }
+}
+
+/// <summary>Buffered lines of one rotation period and the file they are written to.</summary>
+sealed class LogPeriod
+{
+    public DateTime Start { get; }
+    public DateTime End { get; }
+    public string Filename { get; }
+    /// <summary>Guarded by the lock of the <see cref="LogPeriods"/> it belongs to.</summary>
+    public Queue<LogLine> Queue { get; } = new();
+    /// <summary>Control lines drop-oldest took off the head of <see cref="Queue"/>; they come before it. Same lock.</summary>
+    public List<LogLine> Head { get; } = new();
+
+    public bool IsEmpty => Queue.Count == 0 && Head.Count == 0;
+
+    public LogPeriod(DateTime start, DateTime end, string filename)
+    {
+        Start = start;
+        End = end;
+        Filename = filename;
+    }
+}
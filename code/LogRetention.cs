@@ -0,0 +1,97 @@
+using System;
+using System.Collections.Generic;
+using System.IO;
+using System.Text.Json;
+using System.Threading;
+
+/// <summary>
+/// Retention limits of a log directory (--retain-bytes, --retain-seconds). Runs in the
+/// background after flushes: deletes this destination's files that were last written
+/// longer ago than the age limit, then the oldest ones until the rest fit in the size
+/// limit. Only files the destination's filename format could have produced are
+/// considered, and files written by the latest flush are never deleted.
+/// </summary>
+sealed class LogRetention
+{
+    private readonly string _directory;
+    private readonly Func<string, bool> _isLogFile;
+    private readonly long _retainBytes;
+    private readonly long _retainSeconds;
+    private long _deletedFiles;
+    private long _deletedBytes;
+    private long _retainedFiles;
+    private long _retainedBytes;
+    private long _failures;
+
+    public LogRetention(string directory, Func<string, bool> isLogFile, long retainBytes, long retainSeconds)
+    {
+        _directory = directory;
+        _isLogFile = isLogFile;
+        _retainBytes = retainBytes;
+        _retainSeconds = retainSeconds;
+    }
+
+    public void Enforce(ICollection<string> inUse)
+    {
+        var files = new List<FileInfo>();
+        foreach (var file in new DirectoryInfo(_directory).EnumerateFiles())
+        {
+            if (_isLogFile(file.Name))
+            {
+                files.Add(file);
+            }
+        }
+        // Oldest first
+        files.Sort((a, b) => a.LastWriteTimeUtc.CompareTo(b.LastWriteTimeUtc));
+
+        var total = 0L;
+        foreach (var file in files)
+        {
+            total += file.Length;
+        }
+
+        var cutoff = _retainSeconds > 0 ? DateTime.UtcNow.AddSeconds(-_retainSeconds) : DateTime.MinValue;
+        var kept = files.Count;
+        foreach (var file in files)
+        {
+            if (inUse.Contains(file.Name)) continue;
+            var expired = file.LastWriteTimeUtc < cutoff;
+            var overSize = _retainBytes > 0 && total > _retainBytes;
+            if (!expired && !overSize) continue;
+            // Read before deleting: Delete() drops the cached file info
+            var length = file.Length;
+            try
+            {
+                // $REQ_ROT_017: Delete expired files, then the oldest beyond the size limit
+                file.Delete();
+                total -= length;
+                kept--;
+                Interlocked.Increment(ref _deletedFiles);
+                Interlocked.Add(ref _deletedBytes, length);
+            }
+            catch (IOException)
+            {
+                Interlocked.Increment(ref _failures);
+            }
+            catch (UnauthorizedAccessException)
+            {
+                Interlocked.Increment(ref _failures);
+            }
+        }
+        Interlocked.Exchange(ref _retainedFiles, kept);
+        Interlocked.Exchange(ref _retainedBytes, total);
+    }
+
+    public void WriteStats(Utf8JsonWriter writer)
+    {
+        writer.WriteStartObject();
+        writer.WriteNumber("retain_bytes", _retainBytes);
+        writer.WriteNumber("retain_seconds", _retainSeconds);
+        writer.WriteNumber("files", Interlocked.Read(ref _retainedFiles));
+        writer.WriteNumber("bytes", Interlocked.Read(ref _retainedBytes));
+        writer.WriteNumber("deleted_files", Interlocked.Read(ref _deletedFiles));
+        writer.WriteNumber("deleted_bytes", Interlocked.Read(ref _deletedBytes));
+        writer.WriteNumber("delete_failures", Interlocked.Read(ref _failures));
+        writer.WriteEndObject();
+    }
+}
@@ -0,0 +1,225 @@
+using System;
+using System.Collections.Generic;
+using System.Diagnostics;
+using System.Numerics;
+using System.Runtime.InteropServices;
+using System.Threading;
+
+/// <summary>
+/// Queue between the threads that log events and a destination's writer. Each event
+/// goes to one of several bounded rings, picked by its ConnID, so capture tasks of
+/// different connections seldom touch the same ring and each connection's events stay
+/// in order. The rings are drained in batches by one consumer at a time, which merges
+/// them back into the order the events were queued.
+/// </summary>
+sealed class LogRings
+{
+    public const int MaxRings = 1024;
+    public const int MaxRingSlots = 1 << 20;
+
+    private readonly LogRing[] _rings;
+
+    /// <param name="ringCount">Rings; 0 for one per processor.</param>
+    /// <param name="ringSlots">Events each ring holds, rounded up to a power of two.</param>
+    public LogRings(int ringCount, int ringSlots)
+    {
+        RingSlots = (int)BitOperations.RoundUpToPowerOf2((uint)Math.Max(2, ringSlots));
+        _rings = new LogRing[ringCount > 0 ? ringCount : Environment.ProcessorCount];
+        for (int i = 0; i < _rings.Length; i++)
+        {
+            _rings[i] = new LogRing(RingSlots);
+        }
+    }
+
+    public int RingCount => _rings.Length;
+    public int RingSlots { get; }
+
+    public bool IsEmpty
+    {
+        get
+        {
+            foreach (var ring in _rings)
+            {
+                if (ring.Count > 0) return false;
+            }
+            return true;
+        }
+    }
+
+    /// <summary>
+    /// Queues <paramref name="line"/>; false when its ring is full. <paramref name="drainSoon"/>
+    /// is set for the first event to find its ring half full since the last drain.
+    /// </summary>
+    public bool TryEnqueue(LogLine line, out bool drainSoon)
+    {
+        // Control events share the first ring
+        var ring = _rings[line.ConnId == null ? 0 : (int)((uint)line.ConnId.GetHashCode() % (uint)_rings.Length)];
+        if (!ring.TryEnqueue(line, Stopwatch.GetTimestamp(), out var queued))
+        {
+            drainSoon = false;
+            return false;
+        }
+        drainSoon = queued >= RingSlots / 2 && ring.RequestDrain();
+        return true;
+    }
+
+    /// <summary>
+    /// Moves the queued lines to <paramref name="lines"/> in the order they were queued.
+    /// Callers serialize drains; lines queued while one runs may be left for the next.
+    /// </summary>
+    public void Drain(List<LogLine> lines)
+    {
+        var remaining = 0L;
+        foreach (var ring in _rings)
+        {
+            ring.ClearDrainRequest();
+            remaining += ring.Count;
+        }
+        while (remaining > 0)
+        {
+            // The ring whose head was queued first, and the earliest head of the others
+            LogRing? first = null;
+            var firstStamp = long.MaxValue;
+            var secondStamp = long.MaxValue;
+            foreach (var ring in _rings)
+            {
+                if (!ring.TryPeek(out var stamp)) continue;
+                if (stamp < firstStamp)
+                {
+                    secondStamp = firstStamp;
+                    firstStamp = stamp;
+                    first = ring;
+                }
+                else if (stamp < secondStamp)
+                {
+                    secondStamp = stamp;
+                }
+            }
+            if (first == null) return;
+
+            // Its lines queued before any other ring's head go in one run
+            long next;
+            do
+            {
+                lines.Add(first.Dequeue());
+                remaining--;
+            }
+            while (remaining > 0 && first.TryPeek(out next) && next <= secondStamp);
+        }
+    }
+}
+
+/// <summary>
+/// Bounded multi-producer, single-consumer ring of lines, after Dmitry Vyukov's bounded
+/// queue. A producer claims the next slot with one compare-exchange on the tail and
+/// publishes it by advancing the slot's sequence number; the consumer reads slots in
+/// order without interlocked operations.
+/// </summary>
+sealed class LogRing
+{
+    private struct Slot
+    {
+        public long Sequence;
+        public long Stamp;
+        public LogLine Line;
+    }
+
+    // Keeps the producers' and the consumer's position on separate cache lines
+    [StructLayout(LayoutKind.Explicit, Size = 128)]
+    private struct Position
+    {
+        [FieldOffset(64)] public long Value;
+    }
+
+    private readonly Slot[] _slots;
+    private readonly long _mask;
+    private Position _tail;
+    private Position _head;
+    private int _drainRequested;
+
+    /// <param name="capacity">A power of two.</param>
+    public LogRing(int capacity)
+    {
+        _slots = new Slot[capacity];
+        _mask = capacity - 1;
+        for (int i = 0; i < capacity; i++)
+        {
+            _slots[i].Sequence = i;
+        }
+    }
+
+    /// <summary>Lines queued and not yet dequeued, including ones still being written.</summary>
+    public long Count => Math.Max(0, Volatile.Read(ref _tail.Value) - Volatile.Read(ref _head.Value));
+
+    /// <param name="stamp">Orders the line against the other rings' lines when they are merged.</param>
+    /// <param name="queued">Lines in the ring after this one.</param>
+    public bool TryEnqueue(LogLine line, long stamp, out long queued)
+    {
+        var tail = Volatile.Read(ref _tail.Value);
+        while (true)
+        {
+            ref var slot = ref _slots[tail & _mask];
+            var sequence = Volatile.Read(ref slot.Sequence);
+            if (sequence == tail)
+            {
+                var seen = Interlocked.CompareExchange(ref _tail.Value, tail + 1, tail);
+                if (seen == tail)
+                {
+                    slot.Stamp = stamp;
+                    slot.Line = line;
+                    Volatile.Write(ref slot.Sequence, tail + 1);
+                    queued = tail + 1 - Volatile.Read(ref _head.Value);
+                    return true;
+                }
+                tail = seen;
+            }
+            else if (sequence < tail)
+            {
+                // The slot still holds the line of the previous lap
+                queued = _slots.Length;
+                return false;
+            }
+            else
+            {
+                tail = Volatile.Read(ref _tail.Value);
+            }
+        }
+    }
+
+    /// <summary>Whether the caller is the first to ask for a drain since the last one.</summary>
+    public bool RequestDrain()
+    {
+        return Volatile.Read(ref _drainRequested) == 0 && Interlocked.Exchange(ref _drainRequested, 1) == 0;
+    }
+
+    public void ClearDrainRequest()
+    {
+        Volatile.Write(ref _drainRequested, 0);
+    }
+
+    /// <summary>The stamp of the next line, or false when it is not published yet. Consumer only.</summary>
+    public bool TryPeek(out long stamp)
+    {
+        var head = _head.Value;
+        ref var slot = ref _slots[head & _mask];
+        if (Volatile.Read(ref slot.Sequence) != head + 1)
+        {
+            stamp = 0;
+            return false;
+        }
+        stamp = slot.Stamp;
+        return true;
+    }
+
+    /// <summary>Removes the line <see cref="TryPeek"/> found. Consumer only.</summary>
+    public LogLine Dequeue()
+    {
+        var head = _head.Value;
+        ref var slot = ref _slots[head & _mask];
+        var line = slot.Line;
+        slot.Line = default;
+        Volatile.Write(ref slot.Sequence, head + _slots.Length);
+        Volatile.Write(ref _head.Value, head + 1);
+        return line;
+    }
+}
@@ -0,0 +1,133 @@
+using System;
+using System.Collections.Generic;
+using System.Globalization;
+using System.IO;
+using System.Threading;
+
+/// <summary>
+/// Size-based rotation within a period (--max-file-bytes). When a period's file would
+/// grow past the limit, the destination continues in the same name with a sequence
+/// number before the extension: rawprox_2024-01-01-14.ndjson, then
+/// rawprox_2024-01-01-14.1.ndjson, .2.ndjson and so on. Files are only cut between
+/// events. The sequence and size a period left off at are read back from the directory
+/// the first time it is written, so a restart continues where the last run stopped.
+/// With compression the limit counts event bytes before compression, plus the size
+/// on disk of a file resumed after a restart. Used by the flush loop only.
+/// </summary>
+sealed class LogSizeRotation
+{
+    private readonly string _directory;
+    private readonly string _extension;
+    private readonly string _suffix;
+    private readonly LogFormat _format;
+    private readonly long _maxFileBytes;
+    // Keyed by the period's filename
+    private readonly Dictionary<string, Part> _parts = new(StringComparer.Ordinal);
+    private long _rotations;
+
+    /// <param name="suffix">Compression suffix of the files on disk, which the returned names leave out.</param>
+    public LogSizeRotation(string directory, string extension, string suffix, LogFormat format, long maxFileBytes)
+    {
+        _directory = directory;
+        _extension = extension;
+        _suffix = suffix;
+        _format = format;
+        _maxFileBytes = maxFileBytes;
+    }
+
+    /// <summary>
+    /// The file the next whole records of <paramref name="chunk"/> go to, and how many bytes
+    /// of it fit there. A single record longer than the limit gets a file of its own.
+    /// </summary>
+    public (string Filename, int Count) Take(string periodFile, ReadOnlySpan<byte> chunk)
+    {
+        if (!_parts.TryGetValue(periodFile, out var part))
+        {
+            part = Resume(periodFile);
+            _parts.Add(periodFile, part);
+        }
+        part.Used = true;
+
+        var count = Fit(part, chunk);
+        if (count == 0)
+        {
+            // $REQ_ROT_016: Continue in the next sequence file
+            part.Sequence++;
+            part.Filename = SequenceName(periodFile, part.Sequence);
+            part.Size = 0;
+            Interlocked.Increment(ref _rotations);
+            count = Fit(part, chunk);
+        }
+        part.Size += count;
+        return (part.Filename, count);
+    }
+
+    /// <summary>Forgets periods the last flush did not write, once it wrote another one.</summary>
+    public void EndFlush()
+    {
+        List<string>? stale = null;
+        var anyUsed = false;
+        foreach (var (periodFile, part) in _parts)
+        {
+            anyUsed |= part.Used;
+            if (!part.Used)
+            {
+                (stale ??= new List<string>()).Add(periodFile);
+            }
+            part.Used = false;
+        }
+        if (!anyUsed || stale == null) return;
+        foreach (var periodFile in stale)
+        {
+            _parts.Remove(periodFile);
+        }
+    }
+
+    public long Rotations => Interlocked.Read(ref _rotations);
+
+    private int Fit(Part part, ReadOnlySpan<byte> chunk)
+    {
+        var room = _maxFileBytes - part.Size;
+        if (chunk.Length <= room) return chunk.Length;
+        var cut = LogFraming.RecordsWithin(_format, chunk, room);
+        if (cut == 0 && part.Size == 0)
+        {
+            cut = LogFraming.FirstRecord(_format, chunk);
+            if (cut == 0) cut = chunk.Length;
+        }
+        return cut;
+    }
+
+    /// <summary>Finds the highest sequence file of a period already on disk, and its size.</summary>
+    private Part Resume(string periodFile)
+    {
+        var stem = periodFile[..^_extension.Length];
+        var sequence = 0;
+        foreach (var path in Directory.EnumerateFiles(_directory, stem + ".*" + _extension + _suffix))
+        {
+            var name = Path.GetFileName(path);
+            var digits = name.AsSpan(stem.Length + 1, name.Length - stem.Length - 1 - _extension.Length - _suffix.Length);
+            if (int.TryParse(digits, NumberStyles.None, CultureInfo.InvariantCulture, out var n) && n > sequence)
+            {
+                sequence = n;
+            }
+        }
+        var filename = SequenceName(periodFile, sequence);
+        var info = new FileInfo(Path.Combine(_directory, filename + _suffix));
+        return new Part { Filename = filename, Sequence = sequence, Size = info.Exists ? info.Length : 0 };
+    }
+
+    private string SequenceName(string periodFile, int sequence)
+    {
+        if (sequence == 0) return periodFile;
+        return string.Concat(periodFile.AsSpan(0, periodFile.Length - _extension.Length), ".", sequence.ToString(CultureInfo.InvariantCulture), _extension);
+    }
+
+    private sealed class Part
+    {
+        public string Filename = "";
+        public int Sequence;
+        public long Size;
+        public bool Used;
+    }
+}
@@ -0,0 +1,422 @@
+using System;
+using System.Collections.Concurrent;
+using System.Collections.Generic;
+using System.IO;
+using System.Text.Json;
+using System.Threading;
+using System.Threading.Tasks;
+using Microsoft.Win32.SafeHandles;
+
+/// <summary>
+/// Overflow queue on local disk for a log destination whose buffer budget is
+/// exhausted. While active, every event of the destination goes here instead of
+/// the in-memory buffer: <see cref="TryAppend"/> only queues a reference, and a
+/// background writer appends the bytes to segment files in the spill directory,
+/// so the network path never waits for disk. The destination's flushes read the
+/// segments back oldest first after its in-memory events, which keeps event order;
+/// once everything is drained the destination returns to memory buffering.
+/// </summary>
+sealed class LogSpill : IDisposable
+{
+    private const long SegmentBytes = 64L * 1024 * 1024;
+    private const int WriteIntervalMillis = 100;
+    private const int ReadChunkBytes = 1024 * 1024;
+    // Events queued for the spill writer but not yet on disk
+    private const long MaxPendingBytes = 16L * 1024 * 1024;
+
+    private static int _nextId;
+
+    private readonly string _directory;
+    private readonly string _prefix;
+    private readonly LogFormat _format;
+    private readonly long _maxBytes;
+    private readonly Action<LogLine> _onDrop;
+    private readonly CancellationTokenSource _cts = new();
+    private readonly SemaphoreSlim _signal = new(0);
+    private readonly SemaphoreSlim _writeLock = new(1, 1);
+    private readonly object _lock = new();
+
+    // Guarded by _lock
+    private readonly ConcurrentQueue<LogLine> _pending = new();
+    private readonly List<Segment> _segments = new();
+    private readonly Queue<(long End, DateTimeOffset Time)> _marks = new();
+    private bool _active;
+    private long _pendingBytes;
+    private long _spilledBytes;
+    private long _drainedBytes;
+    private int _nextSegment;
+
+    private FileStream? _writer;
+    private byte[]? _readBuffer;
+    private long _spills;
+    private long _writeFailures;
+    private double _drainBytesPerSec;
+    private long _lastDrainAt;
+
+    public string Directory => _directory;
+    public bool HasBacklog
+    {
+        get { lock (_lock) return _spilledBytes != _drainedBytes || _pendingBytes != 0; }
+    }
+
+    /// <param name="maxBytes">Spilled bytes not yet drained that may be kept on disk (0 = unlimited).</param>
+    /// <param name="onDrop">Called for an event the spill cannot take.</param>
+    public LogSpill(string directory, LogFormat format, long maxBytes, Action<LogLine> onDrop)
+    {
+        _directory = directory;
+        _format = format;
+        _maxBytes = maxBytes;
+        _onDrop = onDrop;
+        _prefix = $"rawprox-spill-{Environment.ProcessId}-{Interlocked.Increment(ref _nextId)}-";
+        System.IO.Directory.CreateDirectory(directory);
+        _ = Task.Run(() => WriteLoop(_cts.Token));
+    }
+
+    /// <summary>
+    /// Queues <paramref name="line"/> for the spill. Returns false, without taking the
+    /// line, when the spill is inactive and <paramref name="start"/> is false. Lines the
+    /// spill accepts but has no room for are passed to the drop callback.
+    /// </summary>
+    public bool TryAppend(LogLine line, bool start)
+    {
+        if (!start && !Volatile.Read(ref _active)) return false;
+        lock (_lock)
+        {
+            if (!_active)
+            {
+                if (!start) return false;
+                _active = true;
+                _spills++;
+            }
+
+            var backlog = _spilledBytes - _drainedBytes + _pendingBytes + line.Length;
+            if (_pendingBytes + line.Length > MaxPendingBytes || (_maxBytes > 0 && backlog > _maxBytes))
+            {
+                _onDrop(line);
+                return true;
+            }
+            line.AddRef();
+            _pending.Enqueue(line);
+            _pendingBytes += line.Length;
+        }
+        _signal.Release();
+        return true;
+    }
+
+    /// <summary>
+    /// Passes up to <paramref name="maxBytes"/> of the backlog, oldest first and in whole
+    /// records, to <paramref name="write"/>. Returns the bytes drained.
+    /// </summary>
+    public async Task<long> DrainAsync(Func<ReadOnlyMemory<byte>, Task> write, long maxBytes)
+    {
+        await WritePendingAsync();
+
+        var buffer = _readBuffer ??= new byte[ReadChunkBytes];
+        long drained = 0;
+        while (drained < maxBytes)
+        {
+            Segment? segment;
+            lock (_lock)
+            {
+                segment = _segments.Count > 0 ? _segments[0] : null;
+            }
+            if (segment == null) break;
+
+            var available = Interlocked.Read(ref segment.Written) - segment.Read;
+            if (available == 0)
+            {
+                if (!RetireSegment(segment)) break;
+                continue;
+            }
+
+            var count = RandomAccess.Read(segment.Reader, buffer.AsSpan(0, (int)Math.Min(buffer.Length, available)), segment.Read);
+            // Segments hold whole records, but a read chunk may end mid-record
+            var end = count == available ? count : LogFraming.WholeRecords(_format, buffer.AsSpan(0, count));
+            if (end == 0)
+            {
+                // A single record longer than the read buffer
+                _readBuffer = buffer = new byte[buffer.Length * 2];
+                continue;
+            }
+            await write(buffer.AsMemory(0, end));
+            segment.Read += end;
+            drained += end;
+            lock (_lock)
+            {
+                _drainedBytes += end;
+                while (_marks.Count > 0 && _marks.Peek().End <= _drainedBytes)
+                {
+                    _marks.Dequeue();
+                }
+            }
+        }
+
+        var now = Environment.TickCount64;
+        if (drained > 0 && _lastDrainAt != 0)
+        {
+            _drainBytesPerSec = drained * 1000.0 / Math.Max(1, now - _lastDrainAt);
+        }
+        _lastDrainAt = drained > 0 ? now : 0;
+        return drained;
+    }
+
+    /// <summary>
+    /// Ends spilling if everything spilled has been drained; later events go back to
+    /// the destination's memory buffer. Returns whether the spill is now inactive.
+    /// </summary>
+    public bool TryDeactivate()
+    {
+        lock (_lock)
+        {
+            if (_active && _pendingBytes == 0 && _spilledBytes == _drainedBytes)
+            {
+                _active = false;
+                _drainBytesPerSec = 0;
+                _lastDrainAt = 0;
+            }
+            return !_active;
+        }
+    }
+
+    public void WriteStats(Utf8JsonWriter writer)
+    {
+        lock (_lock)
+        {
+            writer.WriteStartObject();
+            writer.WriteString("directory", _directory);
+            writer.WriteBoolean("active", _active);
+            writer.WriteNumber("spills", _spills);
+            writer.WriteNumber("segments", _segments.Count);
+            writer.WriteNumber("backlog_bytes", _spilledBytes - _drainedBytes + _pendingBytes);
+            writer.WriteNumber("pending_bytes", _pendingBytes);
+            writer.WriteNumber("spilled_bytes", _spilledBytes);
+            writer.WriteNumber("drained_bytes", _drainedBytes);
+            writer.WriteNumber("drain_bytes_per_sec", Math.Round(_drainBytesPerSec));
+            writer.WriteNumber("backlog_age_millis", _marks.Count > 0 ? (long)(DateTimeOffset.UtcNow - _marks.Peek().Time).TotalMilliseconds : 0);
+            writer.WriteNumber("write_failures", Interlocked.Read(ref _writeFailures));
+            writer.WriteEndObject();
+        }
+    }
+
+    private async Task WriteLoop(CancellationToken ct)
+    {
+        try
+        {
+            while (!ct.IsCancellationRequested)
+            {
+                await _signal.WaitAsync(ct);
+                await Task.Delay(WriteIntervalMillis, ct);
+                await WritePendingAsync();
+            }
+        }
+        catch (OperationCanceledException)
+        {
+        }
+    }
+
+    /// <summary>Appends queued lines to the current segment, starting a new one when it is full.</summary>
+    private async Task WritePendingAsync()
+    {
+        await _writeLock.WaitAsync();
+        var batch = new List<LogLine>();
+        try
+        {
+            while (_pending.TryDequeue(out var line))
+            {
+                batch.Add(line);
+            }
+            if (batch.Count == 0) return;
+
+            // Lines become readable (Written) only once they have been flushed to the file
+            Segment? segment = null;
+            int uncommitted = 0;
+            long uncommittedBytes = 0;
+            for (int i = 0; i < batch.Count; i++)
+            {
+                var line = batch[i];
+                try
+                {
+                    if (segment == null || (segment.Written + uncommittedBytes > 0 && segment.Written + uncommittedBytes + line.Length > SegmentBytes))
+                    {
+                        if (segment != null)
+                        {
+                            await CommitAsync(segment, uncommittedBytes);
+                            uncommitted = 0;
+                            uncommittedBytes = 0;
+                        }
+                        segment = CurrentSegment(line.Length);
+                    }
+                    await _writer!.WriteAsync(line.Slab.Buffer.AsMemory(line.Offset, line.Length));
+                    uncommitted++;
+                    uncommittedBytes += line.Length;
+                }
+                catch (Exception)
+                {
+                    // Scratch disk full or gone: what was not committed is lost; start a fresh segment next time
+                    Interlocked.Add(ref _writeFailures, 1);
+                    if (segment != null)
+                    {
+                        segment.Sealed = true;
+                    }
+                    for (int j = i - uncommitted; j < batch.Count; j++)
+                    {
+                        lock (_lock)
+                        {
+                            _pendingBytes -= batch[j].Length;
+                        }
+                        _onDrop(batch[j]);
+                    }
+                    segment = null;
+                    uncommittedBytes = 0;
+                    break;
+                }
+            }
+            if (segment != null)
+            {
+                try
+                {
+                    await CommitAsync(segment, uncommittedBytes);
+                }
+                catch (Exception)
+                {
+                    Interlocked.Add(ref _writeFailures, 1);
+                    segment.Sealed = true;
+                    for (int j = batch.Count - uncommitted; j < batch.Count; j++)
+                    {
+                        lock (_lock)
+                        {
+                            _pendingBytes -= batch[j].Length;
+                        }
+                        _onDrop(batch[j]);
+                    }
+                }
+            }
+        }
+        finally
+        {
+            foreach (var line in batch)
+            {
+                line.Release();
+            }
+            _writeLock.Release();
+        }
+    }
+
+    private async Task CommitAsync(Segment segment, long bytes)
+    {
+        await _writer!.FlushAsync();
+        Interlocked.Add(ref segment.Written, bytes);
+        lock (_lock)
+        {
+            _pendingBytes -= bytes;
+            _spilledBytes += bytes;
+            _marks.Enqueue((_spilledBytes, DateTimeOffset.UtcNow));
+        }
+    }
+
+    /// <summary>The segment being written, or a new one when there is none or it cannot take <paramref name="length"/> more bytes.</summary>
+    private Segment CurrentSegment(int length)
+    {
+        lock (_lock)
+        {
+            var last = _segments.Count > 0 ? _segments[^1] : null;
+            if (last != null && !last.Sealed && _writer != null && (last.Written == 0 || last.Written + length <= SegmentBytes))
+            {
+                return last;
+            }
+            if (last != null)
+            {
+                last.Sealed = true;
+            }
+
+            var path = Path.Combine(_directory, $"{_prefix}{_nextSegment++:D6}.seg");
+            _writer?.Dispose();
+            _writer = null;
+            _writer = new FileStream(path, FileMode.Create, FileAccess.Write, FileShare.Read | FileShare.Delete, bufferSize: 64 * 1024);
+            var segment = new Segment(path, File.OpenHandle(path, FileMode.Open, FileAccess.Read, FileShare.ReadWrite | FileShare.Delete));
+            _segments.Add(segment);
+            return segment;
+        }
+    }
+
+    /// <summary>Deletes a fully drained segment; the segment being written is sealed first so a new one is started.</summary>
+    private bool RetireSegment(Segment segment)
+    {
+        if (!_writeLock.Wait(0)) return false;
+        try
+        {
+            lock (_lock)
+            {
+                if (Interlocked.Read(ref segment.Written) != segment.Read) return true;
+                _segments.Remove(segment);
+                if (_segments.Count == 0)
+                {
+                    _writer?.Dispose();
+                    _writer = null;
+                }
+            }
+            segment.Delete();
+            return true;
+        }
+        finally
+        {
+            _writeLock.Release();
+        }
+    }
+
+    public void Dispose()
+    {
+        _cts.Cancel();
+        _writeLock.Wait();
+        try
+        {
+            lock (_lock)
+            {
+                while (_pending.TryDequeue(out var line))
+                {
+                    _onDrop(line);
+                    line.Release();
+                }
+                _pendingBytes = 0;
+                _writer?.Dispose();
+                _writer = null;
+                foreach (var segment in _segments)
+                {
+                    segment.Delete();
+                }
+                _segments.Clear();
+            }
+        }
+        finally
+        {
+            _writeLock.Release();
+        }
+    }
+
+    private sealed class Segment
+    {
+        public readonly string Path;
+        public readonly SafeFileHandle Reader;
+        public long Written;
+        public long Read;
+        public bool Sealed;
+
+        public Segment(string path, SafeFileHandle reader)
+        {
+            Path = path;
+            Reader = reader;
+        }
+
+        public void Delete()
+        {
+            Reader.Dispose();
+            try
+            {
+                File.Delete(Path);
+            }
+            catch (IOException)
+            {
+            }
+        }
+    }
+}
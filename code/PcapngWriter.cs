@@ -0,0 +1,342 @@
+using System;
+using System.Buffers.Binary;
+using System.Collections.Generic;
+using System.Net;
+using System.Net.Sockets;
+using System.Text;
+
+/// <summary>
+/// Writes connection events as pcapng blocks (--log-format pcapng) into the
+/// <see cref="LogArena"/>, so captures open directly in Wireshark or tshark. Each
+/// chunk of forwarded data becomes Enhanced Packet Blocks holding a synthesized
+/// IPv4 or IPv6 and TCP header (link type RAW) followed by the payload; an open is a
+/// SYN handshake, a close a FIN exchange. Every file starts with its own Section
+/// Header and Interface Description blocks (<see cref="FileHeader"/>).
+/// </summary>
+/// <remarks>
+/// The packets show the client's connection to the listener, the addresses RawProx
+/// actually saw; the SYN carries a comment with the ConnID and target. Sequence
+/// numbers start at 0 in both directions and follow the bytes forwarded, so dropped
+/// events and traffic past the capture limit show up as missing segments. A truncated
+/// data event keeps the original length with fewer bytes captured. TCP checksums are
+/// left at 0.
+/// </remarks>
+static class PcapngWriter
+{
+    private const uint SectionHeaderBlock = 0x0A0D0D0A;
+    private const uint InterfaceDescriptionBlock = 1;
+    private const uint EnhancedPacketBlock = 6;
+    private const ushort LinkTypeRaw = 101;
+
+    // Type, total length, interface, timestamp (2), captured and original length
+    private const int PacketBlockHead = 28;
+    private const int TcpHeaderLength = 20;
+    // Payload per packet, so IPv4 total length and IPv6 payload length stay within 16 bits
+    private const int MaxSegment = 65000;
+
+    private const byte Fin = 0x01;
+    private const byte Syn = 0x02;
+    private const byte Psh = 0x08;
+    private const byte Ack = 0x10;
+
+    [ThreadStatic] private static byte[]? _scratch;
+
+    /// <summary>Section Header Block and Interface Description Block that start every file.</summary>
+    public static readonly byte[] FileHeader = CreateFileHeader();
+
+    public static LogLine Open(DateTimeOffset time, PcapngFlow flow, string connId)
+    {
+        var writer = new PacketWriter(flow);
+        writer.Packet(time, fromClient: true, Syn, seq: 0, ack: 0, ReadOnlySpan<byte>.Empty, 0, flow.Comment);
+        writer.Packet(time, fromClient: false, Syn | Ack, seq: 0, ack: 1, ReadOnlySpan<byte>.Empty, 0, null);
+        writer.Packet(time, fromClient: true, Ack, seq: 1, ack: 1, ReadOnlySpan<byte>.Empty, 0, null);
+        return writer.Finish(time, connId);
+    }
+
+    /// <param name="streamOffset">Bytes the sender forwarded before this chunk.</param>
+    /// <param name="peerOffset">Bytes the other side had forwarded when the chunk was read.</param>
+    /// <param name="length">Bytes forwarded; <paramref name="data"/> holds fewer when the event was cut short by the truncate overflow policy or the capture limit.</param>
+    public static LogLine Data(DateTimeOffset time, PcapngFlow flow, string connId, bool fromClient, long streamOffset, long peerOffset, ReadOnlySpan<byte> data, int length)
+    {
+        var seq = Sequence(streamOffset);
+        var ack = Sequence(peerOffset);
+        if (length <= MaxSegment)
+        {
+            // One packet: header and payload go into the arena back to back, copied once
+            var head = Scratch(PacketBlockHead + flow.HeaderLength);
+            var padding = Pad(data.Length) - data.Length;
+            var blockLength = PacketBlockHead + flow.HeaderLength + data.Length + padding + 4;
+            WritePacketHead(head, flow, time, fromClient, Psh | Ack, seq, ack, blockLength, data.Length, length);
+            Span<byte> tail = stackalloc byte[8];
+            tail[..padding].Clear();
+            BinaryPrimitives.WriteUInt32LittleEndian(tail[padding..], (uint)blockLength);
+            return LogArena.AppendRecord(head.AsSpan(0, PacketBlockHead + flow.HeaderLength), data, tail[..(padding + 4)], time, connId);
+        }
+
+        var writer = new PacketWriter(flow);
+        for (var offset = 0; offset < length; offset += MaxSegment)
+        {
+            var segment = Math.Min(MaxSegment, length - offset);
+            var captured = data.Length > offset ? data.Slice(offset, Math.Min(segment, data.Length - offset)) : ReadOnlySpan<byte>.Empty;
+            writer.Packet(time, fromClient, Psh | Ack, seq + (uint)offset, ack, captured, segment, null);
+        }
+        return writer.Finish(time, connId);
+    }
+
+    public static LogLine Close(DateTimeOffset time, PcapngFlow flow, string connId, ConnectionTotals totals)
+    {
+        var clientSeq = Sequence(totals.BytesFromClient);
+        var serverSeq = Sequence(totals.BytesFromTarget);
+        var writer = new PacketWriter(flow);
+        writer.Packet(time, fromClient: true, Fin | Ack, clientSeq, serverSeq, ReadOnlySpan<byte>.Empty, 0, null);
+        writer.Packet(time, fromClient: false, Fin | Ack, serverSeq, clientSeq + 1, ReadOnlySpan<byte>.Empty, 0, null);
+        writer.Packet(time, fromClient: true, Ack, clientSeq + 1, serverSeq + 1, ReadOnlySpan<byte>.Empty, 0, null);
+        return writer.Finish(time, connId);
+    }
+
+    /// <summary>Length of the block <paramref name="bytes"/> starts with, or 0 when it is incomplete.</summary>
+    public static int BlockLength(ReadOnlySpan<byte> bytes)
+    {
+        if (bytes.Length < 12) return 0;
+        var length = BinaryPrimitives.ReadUInt32LittleEndian(bytes[4..]);
+        return length <= bytes.Length ? (int)length : 0;
+    }
+
+    public static bool TryReadTime(ReadOnlySpan<byte> block, out DateTimeOffset time)
+    {
+        time = default;
+        if (block.Length < PacketBlockHead || BinaryPrimitives.ReadUInt32LittleEndian(block) != EnhancedPacketBlock) return false;
+        var micros = ((long)BinaryPrimitives.ReadUInt32LittleEndian(block[12..]) << 32) | BinaryPrimitives.ReadUInt32LittleEndian(block[16..]);
+        time = DateTimeOffset.UnixEpoch.AddTicks(micros * 10);
+        return true;
+    }
+
+    /// <summary>Whether <paramref name="bytes"/> starts with a Section Header Block.</summary>
+    public static bool IsPcapng(ReadOnlySpan<byte> bytes)
+    {
+        return bytes.Length >= 4 && BinaryPrimitives.ReadUInt32LittleEndian(bytes) == SectionHeaderBlock;
+    }
+
+    private static void WritePacketHead(Span<byte> head, PcapngFlow flow, DateTimeOffset time, bool fromClient, int flags, uint seq, uint ack, int blockLength, int captured, int payloadLength)
+    {
+        var packetLength = flow.HeaderLength + payloadLength;
+        var micros = (ulong)((time.UtcTicks - DateTimeOffset.UnixEpoch.UtcTicks) / 10);
+        BinaryPrimitives.WriteUInt32LittleEndian(head, EnhancedPacketBlock);
+        BinaryPrimitives.WriteUInt32LittleEndian(head[4..], (uint)blockLength);
+        BinaryPrimitives.WriteUInt32LittleEndian(head[8..], 0);
+        BinaryPrimitives.WriteUInt32LittleEndian(head[12..], (uint)(micros >> 32));
+        BinaryPrimitives.WriteUInt32LittleEndian(head[16..], (uint)micros);
+        BinaryPrimitives.WriteUInt32LittleEndian(head[20..], (uint)(flow.HeaderLength + captured));
+        BinaryPrimitives.WriteUInt32LittleEndian(head[24..], (uint)packetLength);
+        flow.WriteHeaders(head.Slice(PacketBlockHead, flow.HeaderLength), fromClient, (byte)flags, seq, ack, payloadLength);
+    }
+
+    private static int Pad(int length) => (length + 3) & ~3;
+
+    // The SYN takes sequence number 0; data starts at 1 and wraps like TCP's
+    private static uint Sequence(long offset) => unchecked(1 + (uint)offset);
+
+    private static byte[] CreateFileHeader()
+    {
+        var header = new byte[28 + 20];
+        var shb = header.AsSpan(0, 28);
+        BinaryPrimitives.WriteUInt32LittleEndian(shb, SectionHeaderBlock);
+        BinaryPrimitives.WriteUInt32LittleEndian(shb[4..], 28);
+        BinaryPrimitives.WriteUInt32LittleEndian(shb[8..], 0x1A2B3C4D);
+        BinaryPrimitives.WriteUInt16LittleEndian(shb[12..], 1);
+        BinaryPrimitives.WriteUInt16LittleEndian(shb[14..], 0);
+        // Section length unknown: the file is appended to
+        BinaryPrimitives.WriteInt64LittleEndian(shb[16..], -1);
+        BinaryPrimitives.WriteUInt32LittleEndian(shb[24..], 28);
+        var idb = header.AsSpan(28);
+        BinaryPrimitives.WriteUInt32LittleEndian(idb, InterfaceDescriptionBlock);
+        BinaryPrimitives.WriteUInt32LittleEndian(idb[4..], 20);
+        BinaryPrimitives.WriteUInt16LittleEndian(idb[8..], LinkTypeRaw);
+        BinaryPrimitives.WriteUInt16LittleEndian(idb[10..], 0);
+        BinaryPrimitives.WriteUInt32LittleEndian(idb[12..], 0);
+        BinaryPrimitives.WriteUInt32LittleEndian(idb[16..], 20);
+        return header;
+    }
+
+    private static byte[] Scratch(int length)
+    {
+        var scratch = _scratch ??= new byte[256];
+        return scratch.Length >= length ? scratch : _scratch = new byte[length];
+    }
+
+    /// <summary>Builds several packet blocks in the per-thread scratch buffer.</summary>
+    private ref struct PacketWriter
+    {
+        private readonly PcapngFlow _flow;
+        private byte[] _buffer;
+        private int _length;
+
+        public PacketWriter(PcapngFlow flow)
+        {
+            _flow = flow;
+            _buffer = Scratch(256);
+            _length = 0;
+        }
+
+        public void Packet(DateTimeOffset time, bool fromClient, int flags, uint seq, uint ack, ReadOnlySpan<byte> captured, int payloadLength, byte[]? comment)
+        {
+            var options = comment == null ? 0 : 4 + Pad(comment.Length) + 4;
+            var blockLength = PacketBlockHead + Pad(_flow.HeaderLength + captured.Length) + options + 4;
+            if (_buffer.Length < _length + blockLength)
+            {
+                var grown = new byte[Math.Max(_buffer.Length * 2, _length + blockLength)];
+                _buffer.AsSpan(0, _length).CopyTo(grown);
+                _scratch = _buffer = grown;
+            }
+            var block = _buffer.AsSpan(_length, blockLength);
+            block.Clear();
+            WritePacketHead(block, _flow, time, fromClient, flags, seq, ack, blockLength, captured.Length, payloadLength);
+            captured.CopyTo(block[(PacketBlockHead + _flow.HeaderLength)..]);
+            if (comment != null)
+            {
+                var option = block[(PacketBlockHead + Pad(_flow.HeaderLength + captured.Length))..];
+                // opt_comment, then opt_endofopt (already zero)
+                BinaryPrimitives.WriteUInt16LittleEndian(option, 1);
+                BinaryPrimitives.WriteUInt16LittleEndian(option[2..], (ushort)comment.Length);
+                comment.CopyTo(option[4..]);
+            }
+            BinaryPrimitives.WriteUInt32LittleEndian(block[^4..], (uint)blockLength);
+            _length += blockLength;
+        }
+
+        public LogLine Finish(DateTimeOffset time, string connId)
+        {
+            return LogArena.AppendRecord(_buffer.AsSpan(0, _length), ReadOnlySpan<byte>.Empty, time, connId);
+        }
+    }
+}
+
+/// <summary>
+/// The TCP flow a connection is shown as in pcapng output: the addresses and ports of
+/// the client and the listener it connected to. Sequence numbers come from the stream
+/// offsets the relay loops record on each segment.
+/// </summary>
+sealed class PcapngFlow
+{
+    private readonly byte[] _client;
+    private readonly byte[] _server;
+    private readonly ushort _clientPort;
+    private readonly ushort _serverPort;
+
+    public PcapngFlow(IPEndPoint client, IPEndPoint server, string comment)
+    {
+        var clientAddress = client.Address;
+        var serverAddress = server.Address;
+        // A dual-mode listener sees IPv4 clients as IPv4-mapped IPv6 addresses
+        if (clientAddress.IsIPv4MappedToIPv6 && (serverAddress.IsIPv4MappedToIPv6 || serverAddress.AddressFamily == AddressFamily.InterNetwork))
+        {
+            clientAddress = clientAddress.MapToIPv4();
+            serverAddress = serverAddress.MapToIPv4();
+        }
+        if (clientAddress.AddressFamily != serverAddress.AddressFamily)
+        {
+            clientAddress = clientAddress.MapToIPv6();
+            serverAddress = serverAddress.MapToIPv6();
+        }
+        _client = clientAddress.GetAddressBytes();
+        _server = serverAddress.GetAddressBytes();
+        _clientPort = (ushort)client.Port;
+        _serverPort = (ushort)server.Port;
+        Comment = Encoding.UTF8.GetBytes(comment);
+    }
+
+    /// <summary>A flow for the client socket, or null when its endpoints are not IP endpoints.</summary>
+    public static PcapngFlow? For(Socket socket, string comment)
+    {
+        return socket.RemoteEndPoint is IPEndPoint client && socket.LocalEndPoint is IPEndPoint server
+            ? new PcapngFlow(client, server, comment)
+            : null;
+    }
+
+    public byte[] Comment { get; }
+
+    /// <summary>IP and TCP header length of every packet.</summary>
+    public int HeaderLength => (_client.Length == 4 ? 20 : 40) + 20;
+
+    public void WriteHeaders(Span<byte> headers, bool fromClient, byte flags, uint seq, uint ack, int payloadLength)
+    {
+        var source = fromClient ? _client : _server;
+        var destination = fromClient ? _server : _client;
+        Span<byte> tcp;
+        if (source.Length == 4)
+        {
+            var ip = headers[..20];
+            ip[0] = 0x45;
+            ip[1] = 0;
+            BinaryPrimitives.WriteUInt16BigEndian(ip[2..], (ushort)(20 + 20 + payloadLength));
+            BinaryPrimitives.WriteUInt16BigEndian(ip[4..], 0);
+            BinaryPrimitives.WriteUInt16BigEndian(ip[6..], 0x4000);
+            ip[8] = 64;
+            ip[9] = 6;
+            BinaryPrimitives.WriteUInt16BigEndian(ip[10..], 0);
+            source.CopyTo(ip[12..]);
+            destination.CopyTo(ip[16..]);
+            BinaryPrimitives.WriteUInt16BigEndian(ip[10..], Checksum(ip));
+            tcp = headers[20..];
+        }
+        else
+        {
+            var ip = headers[..40];
+            BinaryPrimitives.WriteUInt32BigEndian(ip, 0x60000000);
+            BinaryPrimitives.WriteUInt16BigEndian(ip[4..], (ushort)(20 + payloadLength));
+            ip[6] = 6;
+            ip[7] = 64;
+            source.CopyTo(ip[8..]);
+            destination.CopyTo(ip[24..]);
+            tcp = headers[40..];
+        }
+        BinaryPrimitives.WriteUInt16BigEndian(tcp, fromClient ? _clientPort : _serverPort);
+        BinaryPrimitives.WriteUInt16BigEndian(tcp[2..], fromClient ? _serverPort : _clientPort);
+        BinaryPrimitives.WriteUInt32BigEndian(tcp[4..], seq);
+        BinaryPrimitives.WriteUInt32BigEndian(tcp[8..], ack);
+        tcp[12] = 0x50;
+        tcp[13] = flags;
+        BinaryPrimitives.WriteUInt16BigEndian(tcp[14..], 0xFFFF);
+        BinaryPrimitives.WriteUInt32BigEndian(tcp[16..], 0);
+    }
+
+    private static ushort Checksum(ReadOnlySpan<byte> header)
+    {
+        var sum = 0u;
+        for (int i = 0; i < header.Length; i += 2)
+        {
+            sum += BinaryPrimitives.ReadUInt16BigEndian(header[i..]);
+        }
+        while (sum > 0xFFFF)
+        {
+            sum = (sum & 0xFFFF) + (sum >> 16);
+        }
+        return (ushort)~sum;
+    }
+}
+
+/// <summary>
+/// The files a pcapng destination has started a section in, so the flush loop writes
+/// <see cref="PcapngWriter.FileHeader"/> once per file and run. A file is forgotten once
+/// a flush writes other files but not it; appending to it later starts a new section,
+/// which pcapng readers take in stride. Used by the flush loop only.
+/// </summary>
+sealed class PcapngSections
+{
+    private readonly HashSet<string> _started = new(StringComparer.Ordinal);
+    private readonly HashSet<string> _used = new(StringComparer.Ordinal);
+
+    /// <summary>Whether <paramref name="file"/> still needs its header.</summary>
+    public bool Begin(string file)
+    {
+        _used.Add(file);
+        return _started.Add(file);
+    }
+
+    public void EndFlush()
+    {
+        if (_used.Count == 0) return;
+        _started.IntersectWith(_used);
+        _used.Clear();
+    }
+}
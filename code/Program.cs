@@ -7,7 +7,6 @@ using System.Linq;
 using System.Net;
 using System.Net.Sockets;
 using System.Text;
-using System.Text.Encodings.Web;
 using System.Text.Json;
 using System.Text.Json.Serialization;
 using System.Threading;
@@ -15,23 +14,45 @@ using System.Threading.Tasks;
 
 [JsonSourceGenerationOptions(WriteIndented = false)]
 [JsonSerializable(typeof(JsonElement))]
-[JsonSerializable(typeof(Dictionary<string, object>))]
-[JsonSerializable(typeof(int))]
 internal partial class AppJsonContext : JsonSerializerContext { }
 
 class Program
 {
-    private static readonly ConcurrentDictionary<int, TcpListener> _listeners = new();
+    // Linux socket option numbers for SO_REUSEPORT (not exposed by SocketOptionName)
+    private const int SolSocket = 1;
+    private const int SoReusePort = 15;
+
+    private static readonly ConcurrentDictionary<int, TcpListener[]> _listeners = new();
+    private static readonly ConcurrentDictionary<int, UpstreamPool> _upstreamPools = new();
     private static readonly ConcurrentBag<LogDestination> _logDestinations = new();
     private static readonly CancellationTokenSource _cts = new();
-    private static readonly JsonSerializerOptions _jsonOptions = new()
-    {
-        Encoder = JavaScriptEncoder.UnsafeRelaxedJsonEscaping
-    };
     private static int _mcpPort = -1;
     private static int _flushMillis = 2000;
+    private static int _lingerMillis = 0;
+    private static int _dnsTtlMillis = 30000;
+    private static int _poolMin = 0;
+    private static int _poolMax = -1;
+    private static int _poolIdleMillis = 30000;
+    private static int _listenerCount = 1;
+    private static long _captureBytes = 0;
+    private static CaptureLevel _captureLevel = CaptureLevel.Full;
+    private static int _progressMillis = 10000;
+    private static long _coalesceMicros = 0;
+    private static int _coalesceBytes = CaptureRule.DefaultCoalesceBytes;
+    private static readonly ConcurrentDictionary<int, CaptureRule> _captureRules = new();
+    // Connections between accept and close, by ConnectionTable index, for progress events
+    private static readonly ConcurrentDictionary<uint, ConnectionCapture> _openConnections = new();
+    private static LogOptions _logOptions = new();
     private static string _filenameFormat = "rawprox_%Y-%m-%d-%H.ndjson";
     private static long _nextConnId = 0;
+    private static readonly object _connIdLock = new();
+    private static long _activeConnections = 0;
+    private static int _activeDestinations = 0;
+    // Active destinations per LogFormat, so events are only encoded in formats someone writes
+    private static readonly int[] _formatDestinations = new int[3];
+    private static bool _spliceEnabled = false;
+    private static readonly RelayBufferPool _relayBuffers = new(64 * 1024 * 1024);
+    private static DnsCache _dnsCache = null!;
     private static TcpListener? _mcpListener = null;
     private static int _exitCode = 0;
 
@@ -41,6 +62,17 @@ class Program
         string? logDirectory = null;
         var filenameFormatExplicit = false;
 
+        // $REQ_CMD_019: Convert log files back to NDJSON instead of proxying
+        if (args.Length > 0 && args[0] == "--decode")
+        {
+            if (args.Length == 1)
+            {
+                await Console.Error.WriteLineAsync("Error: --decode requires at least one FILE");
+                return 1;
+            }
+            return await LogDecoder.Run(args[1..]);
+        }
+
         // Parse arguments
         for (int i = 0; i < args.Length; i++)
         {
@@ -60,11 +92,238 @@ class Program
                     return 1;
                 }
             }
+            else if (args[i] == "--linger-millis" && i + 1 < args.Length)
+            {
+                if (!int.TryParse(args[++i], out _lingerMillis) || _lingerMillis < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --linger-millis requires a non-negative integer");
+                    return 1;
+                }
+            }
+            else if (args[i] == "--dns-ttl-millis" && i + 1 < args.Length)
+            {
+                if (!int.TryParse(args[++i], out _dnsTtlMillis) || _dnsTtlMillis < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --dns-ttl-millis requires a non-negative integer");
+                    return 1;
+                }
+            }
+            else if (args[i] == "--pool-min" && i + 1 < args.Length)
+            {
+                if (!int.TryParse(args[++i], out _poolMin) || _poolMin < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --pool-min requires a non-negative integer");
+                    return 1;
+                }
+            }
+            else if (args[i] == "--pool-max" && i + 1 < args.Length)
+            {
+                if (!int.TryParse(args[++i], out _poolMax) || _poolMax < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --pool-max requires a non-negative integer");
+                    return 1;
+                }
+            }
+            else if (args[i] == "--pool-idle-millis" && i + 1 < args.Length)
+            {
+                if (!int.TryParse(args[++i], out _poolIdleMillis) || _poolIdleMillis <= 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --pool-idle-millis requires a positive integer");
+                    return 1;
+                }
+            }
+            else if (args[i] == "--listeners" && i + 1 < args.Length)
+            {
+                if (!int.TryParse(args[++i], out _listenerCount) || _listenerCount < 1)
+                {
+                    await Console.Error.WriteLineAsync("Error: --listeners requires a positive integer");
+                    return 1;
+                }
+                if (_listenerCount > 1 && !OperatingSystem.IsLinux())
+                {
+                    await Console.Error.WriteLineAsync("Error: --listeners greater than 1 is only supported on Linux");
+                    return 1;
+                }
+            }
+            else if (args[i] == "--capture-bytes" && i + 1 < args.Length)
+            {
+                if (!long.TryParse(args[++i], out _captureBytes) || _captureBytes < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --capture-bytes requires a non-negative integer");
+                    return 1;
+                }
+            }
+            else if (args[i] == "--capture" && i + 1 < args.Length)
+            {
+                if (!CaptureRule.TryParseLevel(args[++i], out _captureLevel))
+                {
+                    await Console.Error.WriteLineAsync("Error: --capture must be full, metadata or off");
+                    return 1;
+                }
+            }
+            else if (args[i] == "--coalesce-micros" && i + 1 < args.Length)
+            {
+                if (!long.TryParse(args[++i], out _coalesceMicros) || _coalesceMicros < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --coalesce-micros requires a non-negative integer");
+                    return 1;
+                }
+            }
+            else if (args[i] == "--coalesce-bytes" && i + 1 < args.Length)
+            {
+                if (!int.TryParse(args[++i], out _coalesceBytes) || _coalesceBytes < 1 || _coalesceBytes > RelayBufferPool.MaxBufferSize)
+                {
+                    await Console.Error.WriteLineAsync($"Error: --coalesce-bytes requires an integer from 1 to {RelayBufferPool.MaxBufferSize}");
+                    return 1;
+                }
+            }
+            else if (args[i] == "--progress-millis" && i + 1 < args.Length)
+            {
+                if (!int.TryParse(args[++i], out _progressMillis) || _progressMillis < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --progress-millis requires a non-negative integer");
+                    return 1;
+                }
+            }
+            else if (args[i] == "--max-buffer-bytes" && i + 1 < args.Length)
+            {
+                if (!long.TryParse(args[++i], out var maxBufferBytes) || maxBufferBytes < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --max-buffer-bytes requires a non-negative integer");
+                    return 1;
+                }
+                _logOptions = _logOptions with { MaxBufferBytes = maxBufferBytes };
+            }
+            else if (args[i] == "--max-total-buffer-bytes" && i + 1 < args.Length)
+            {
+                if (!long.TryParse(args[++i], out var maxTotalBufferBytes) || maxTotalBufferBytes < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --max-total-buffer-bytes requires a non-negative integer");
+                    return 1;
+                }
+                LogDestination.MaxTotalBufferedBytes = maxTotalBufferBytes;
+            }
+            else if (args[i] == "--overflow-policy" && i + 1 < args.Length)
+            {
+                if (!LogOptions.TryParsePolicy(args[++i], out var overflowPolicy))
+                {
+                    await Console.Error.WriteLineAsync("Error: --overflow-policy must be drop-newest, drop-oldest, truncate or spill");
+                    return 1;
+                }
+                _logOptions = _logOptions with { OverflowPolicy = overflowPolicy };
+            }
+            else if (args[i] == "--keep-files-open")
+            {
+                _logOptions = _logOptions with { KeepFilesOpen = true };
+            }
+            else if (args[i] == "--file-idle-millis" && i + 1 < args.Length)
+            {
+                if (!int.TryParse(args[++i], out var fileIdleMillis) || fileIdleMillis <= 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --file-idle-millis requires a positive integer");
+                    return 1;
+                }
+                _logOptions = _logOptions with { FileIdleMillis = fileIdleMillis };
+            }
+            else if (args[i] == "--log-format" && i + 1 < args.Length)
+            {
+                if (!LogOptions.TryParseFormat(args[++i], out var format))
+                {
+                    await Console.Error.WriteLineAsync("Error: --log-format must be ndjson, binary or pcapng");
+                    return 1;
+                }
+                _logOptions = _logOptions with { Format = format };
+            }
+            else if (args[i] == "--data-encoding" && i + 1 < args.Length)
+            {
+                if (!LogOptions.TryParseDataEncoding(args[++i], out var encoding))
+                {
+                    await Console.Error.WriteLineAsync("Error: --data-encoding must be url, base64, hex or auto");
+                    return 1;
+                }
+                _logOptions = _logOptions with { DataEncoding = encoding };
+            }
+            else if (args[i] == "--compress" && i + 1 < args.Length)
+            {
+                if (!LogOptions.TryParseCompression(args[++i], out var compression))
+                {
+                    await Console.Error.WriteLineAsync("Error: --compress must be none, gzip or brotli");
+                    return 1;
+                }
+                _logOptions = _logOptions with { Compression = compression };
+            }
+            else if (args[i] == "--max-file-bytes" && i + 1 < args.Length)
+            {
+                if (!long.TryParse(args[++i], out var maxFileBytes) || maxFileBytes < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --max-file-bytes requires a non-negative integer");
+                    return 1;
+                }
+                _logOptions = _logOptions with { MaxFileBytes = maxFileBytes };
+            }
+            else if (args[i] == "--retain-bytes" && i + 1 < args.Length)
+            {
+                if (!long.TryParse(args[++i], out var retainBytes) || retainBytes < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --retain-bytes requires a non-negative integer");
+                    return 1;
+                }
+                _logOptions = _logOptions with { RetainBytes = retainBytes };
+            }
+            else if (args[i] == "--retain-seconds" && i + 1 < args.Length)
+            {
+                if (!long.TryParse(args[++i], out var retainSeconds) || retainSeconds < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --retain-seconds requires a non-negative integer");
+                    return 1;
+                }
+                _logOptions = _logOptions with { RetainSeconds = retainSeconds };
+            }
+            else if (args[i] == "--spill-dir" && i + 1 < args.Length)
+            {
+                _logOptions = _logOptions with { SpillDirectory = args[++i] };
+            }
+            else if (args[i] == "--max-spill-bytes" && i + 1 < args.Length)
+            {
+                if (!long.TryParse(args[++i], out var maxSpillBytes) || maxSpillBytes < 0)
+                {
+                    await Console.Error.WriteLineAsync("Error: --max-spill-bytes requires a non-negative integer");
+                    return 1;
+                }
+                _logOptions = _logOptions with { MaxSpillBytes = maxSpillBytes };
+            }
+            else if (args[i] == "--log-rings" && i + 1 < args.Length)
+            {
+                if (!int.TryParse(args[++i], out var logRings) || logRings < 0 || logRings > LogRings.MaxRings)
+                {
+                    await Console.Error.WriteLineAsync($"Error: --log-rings requires an integer from 0 to {LogRings.MaxRings}");
+                    return 1;
+                }
+                _logOptions = _logOptions with { LogRings = logRings };
+            }
+            else if (args[i] == "--log-ring-slots" && i + 1 < args.Length)
+            {
+                if (!int.TryParse(args[++i], out var ringSlots) || ringSlots < 1 || ringSlots > LogRings.MaxRingSlots)
+                {
+                    await Console.Error.WriteLineAsync($"Error: --log-ring-slots requires an integer from 1 to {LogRings.MaxRingSlots}");
+                    return 1;
+                }
+                _logOptions = _logOptions with { LogRingSlots = ringSlots };
+            }
             else if (args[i] == "--filename-format" && i + 1 < args.Length)
             {
                 _filenameFormat = args[++i];
                 filenameFormatExplicit = true;
             }
+            else if (args[i] == "--splice")
+            {
+                if (!OperatingSystem.IsLinux())
+                {
+                    await Console.Error.WriteLineAsync("Error: --splice is only supported on Linux");
+                    return 1;
+                }
+                _spliceEnabled = true;
+            }
             else if (args[i].StartsWith('@'))
             {
                 if (logDirectory != null)
@@ -84,12 +343,28 @@ class Program
             }
         }
 
+        if (_poolMax == -1)
+        {
+            _poolMax = _poolMin;
+        }
+        else if (_poolMax < _poolMin)
+        {
+            await Console.Error.WriteLineAsync("Error: --pool-max must not be less than --pool-min");
+            return 1;
+        }
+
         if (filenameFormatExplicit && logDirectory == null)
         {
             await Console.Error.WriteLineAsync("Error: --filename-format requires an @DIRECTORY destination"); // $REQ_ROT_015
             return 1;
         }
 
+        if (_logOptions.OverflowPolicy == OverflowPolicy.Spill && _logOptions.SpillDirectory == null)
+        {
+            await Console.Error.WriteLineAsync("Error: --overflow-policy spill requires --spill-dir"); // $REQ_CMD_018
+            return 1;
+        }
+
         // Validate arguments
         if (logDirectory != null && portRules.Count == 0 && _mcpPort == -1)
         {
@@ -103,19 +378,23 @@ class Program
             return 0;
         }
 
+        _dnsCache = new DnsCache(_dnsTtlMillis);
+
         // Initialize connection ID
         _nextConnId = DateTimeOffset.UtcNow.ToUnixTimeMilliseconds() * 1000;
 
         // Start logging if directory specified
         if (logDirectory != null)
         {
-            await StartLogging(logDirectory, _filenameFormat);
+            await StartLogging(logDirectory, _filenameFormat, _logOptions);
         }
         else
         {
             // Add STDOUT as default destination
-            var stdoutDest = new LogDestination(null, _filenameFormat, _flushMillis);
+            var stdoutDest = new LogDestination(null, _filenameFormat, _flushMillis, _logOptions);
             _logDestinations.Add(stdoutDest);
+            Interlocked.Increment(ref _activeDestinations);
+            Interlocked.Increment(ref _formatDestinations[(int)_logOptions.Format]);
             _ = Task.Run(() => stdoutDest.FlushLoop(_cts.Token));
         }
 
@@ -130,11 +409,7 @@ class Program
                 _mcpListener.Start();
                 var actualPort = ((IPEndPoint)_mcpListener.LocalEndpoint).Port;
 
-                LogEvent(new Dictionary<string, object> {
-                    ["time"] = GetTimestamp(),
-                    ["event"] = "mcp-ready",
-                    ["endpoint"] = $"http://127.0.0.1:{actualPort}/mcp"
-                }); // $REQ_MCP_003, $REQ_MCP_004
+                LogEvent(EventWriter.McpReady(EventClock.UtcNow, $"http://127.0.0.1:{actualPort}/mcp")); // $REQ_MCP_003, $REQ_MCP_004
                 _ = Task.Run(() => RunMcpServer(_mcpListener, _cts.Token));
             }
             catch (Exception ex)
@@ -144,10 +419,15 @@ class Program
             }
         }
 
+        if (_progressMillis > 0)
+        {
+            _ = Task.Run(() => ReportProgress(_cts.Token));
+        }
+
         // Start port rules
         foreach (var rule in portRules)
         {
-            await AddPortRule(rule.local, rule.target, rule.targetPort);
+            await AddPortRule(rule.local, rule.target, rule.targetPort, _poolMin, _poolMax, _poolIdleMillis, _listenerCount, new CaptureRule(_captureLevel, _captureBytes, _coalesceMicros, _coalesceBytes));
         }
 
         // Wait for cancellation
@@ -156,9 +436,13 @@ class Program
 
         // Cleanup
         _mcpListener?.Stop();
-        foreach (var listener in _listeners.Values)
+        foreach (var listeners in _listeners.Values)
+        {
+            StopListeners(listeners);
+        }
+        foreach (var pool in _upstreamPools.Values)
         {
-            listener.Stop();
+            pool.Dispose();
         }
 
         return _exitCode;
@@ -169,12 +453,44 @@ class Program
         await Console.Error.WriteLineAsync(@"RawProx - TCP Proxy with Traffic Capture
 
 Usage:
-  rawprox.exe [--mcp-port PORT] [--flush-millis MS] [--filename-format FORMAT] PORT_RULE... [@LOG_DIRECTORY]
+  rawprox.exe --decode FILE...
+  rawprox.exe [--mcp-port PORT] [--flush-millis MS] [--max-buffer-bytes N] [--max-total-buffer-bytes N] [--overflow-policy POLICY] [--spill-dir DIR] [--max-spill-bytes N] [--log-rings N] [--log-ring-slots N] [--log-format FORMAT] [--data-encoding ENCODING] [--compress CODEC] [--keep-files-open] [--file-idle-millis MS] [--max-file-bytes N] [--retain-bytes N] [--retain-seconds N] [--filename-format FORMAT] [--linger-millis MS] [--dns-ttl-millis MS] [--pool-min N] [--pool-max N] [--pool-idle-millis MS] [--listeners N] [--capture-bytes N] [--capture LEVEL] [--progress-millis MS] [--coalesce-micros US] [--coalesce-bytes N] [--splice] PORT_RULE... [@LOG_DIRECTORY]
 
 Arguments:
+  --decode FILE...        Write the events of log files to STDOUT as NDJSON and exit; must be the first argument
   --mcp-port PORT         Enable MCP server on specified port (0 for system-chosen)
   --flush-millis MS       Buffer flush interval in milliseconds (default: 2000)
+  --max-buffer-bytes N    Cap the bytes of events each log destination buffers between flushes (default: 0 = unlimited)
+  --max-total-buffer-bytes N
+                          Cap the bytes of events all log destinations buffer together (default: 1073741824, 0 = unlimited)
+  --overflow-policy POLICY
+                          What to do with events over a buffer budget: drop-newest, drop-oldest, truncate or spill (default: drop-newest)
+  --spill-dir DIR         Scratch directory for the spill overflow policy; required with --overflow-policy spill
+  --max-spill-bytes N     Cap the spilled backlog each destination keeps on disk (default: 0 = unlimited)
+  --log-rings N           Rings each destination queues events in (default: 0 = one per processor)
+  --log-ring-slots N      Events each ring holds, rounded up to a power of two (default: 1024)
+  --log-format FORMAT     Write events as ndjson, binary or pcapng (default: ndjson)
+  --data-encoding ENCODING
+                          Payload encoding of NDJSON data events: url, base64, hex or auto (default: url)
+  --compress CODEC        Compress log files with gzip or brotli (default: none)
+  --keep-files-open       Keep log files open between flushes instead of opening them for every flush
+  --file-idle-millis MS   With --keep-files-open, close a file not written for this long (default: 10000)
+  --max-file-bytes N      Continue in a sequence-numbered file once a log file would exceed N bytes (default: 0 = unlimited)
+  --retain-bytes N        Delete the oldest log files once a destination's files exceed N bytes (default: 0 = unlimited)
+  --retain-seconds N      Delete log files last written more than N seconds ago (default: 0 = keep forever)
   --filename-format FMT   Log filename pattern using strftime format (default: rawprox_%Y-%m-%d-%H.ndjson)
+  --linger-millis MS      Max time to keep relaying after one side half-closes (default: 0 = until both sides close)
+  --dns-ttl-millis MS     How long resolved target addresses are cached (default: 30000, 0 = no cache)
+  --pool-min N            Keep N pre-connected upstream sockets per port rule (default: 0 = no pool)
+  --pool-max N            Let the pool grow to N under load (default: same as --pool-min)
+  --pool-idle-millis MS   Close pooled sockets idle longer than this (default: 30000)
+  --listeners N           Linux only: accept on N SO_REUSEPORT sockets per port rule (default: 1)
+  --capture-bytes N       Log at most the first N bytes of each direction of a connection (default: 0 = no limit)
+  --capture LEVEL         How much traffic is logged: full, metadata or off (default: full)
+  --progress-millis MS    Interval of progress events for metadata connections (default: 10000, 0 = none)
+  --coalesce-micros US    Merge chunks of one direction arriving within US microseconds into one data event (default: 0 = off)
+  --coalesce-bytes N      Largest payload of a coalesced data event, from 1 to 262144 (default: 65536)
+  --splice                Linux only: relay uncaptured traffic in the kernel with splice(2)
   PORT_RULE               Port forwarding rule: LOCAL_PORT:TARGET_HOST:TARGET_PORT
   @LOG_DIRECTORY          Log to time-rotated files in directory
 
@@ -187,17 +503,46 @@ Documentation:
   See ./readme/*.md for detailed documentation");
     }
 
-    private static async Task AddPortRule(int localPort, string targetHost, int targetPort)
+    private static async Task AddPortRule(int localPort, string targetHost, int targetPort, int poolMin, int poolMax, int poolIdleMillis, int listenerCount, CaptureRule captureRule)
     {
+        var listeners = new TcpListener[listenerCount];
         try
         {
-            var listener = new TcpListener(IPAddress.Any, localPort);
-            listener.Start();
-            _listeners[localPort] = listener;
-            _ = Task.Run(() => AcceptConnections(listener, targetHost, targetPort, localPort, _cts.Token));
+            // SO_REUSEPORT would let the listeners bind a port this process already serves
+            if (_listeners.ContainsKey(localPort))
+            {
+                throw new SocketException((int)SocketError.AddressAlreadyInUse);
+            }
+
+            // With several listeners, each socket binds the same port with SO_REUSEPORT
+            // and the kernel spreads incoming connections across their accept loops
+            for (int i = 0; i < listenerCount; i++)
+            {
+                listeners[i] = new TcpListener(IPAddress.Any, localPort);
+                if (listenerCount > 1)
+                {
+                    listeners[i].Server.SetRawSocketOption(SolSocket, SoReusePort, BitConverter.GetBytes(1));
+                }
+                listeners[i].Start();
+            }
+            _listeners[localPort] = listeners;
+            _captureRules[localPort] = captureRule;
+
+            UpstreamPool? pool = null;
+            if (poolMax > 0)
+            {
+                pool = new UpstreamPool(poolMin, poolMax, poolIdleMillis, ct => ConnectToTarget(targetHost, targetPort, ct), _cts.Token);
+                _upstreamPools[localPort] = pool;
+            }
+            foreach (var listener in listeners)
+            {
+                _ = Task.Run(() => AcceptConnections(listener, targetHost, targetPort, localPort, pool, captureRule, _cts.Token));
+            }
         }
         catch (SocketException ex) when (ex.SocketErrorCode == SocketError.AddressAlreadyInUse)
         {
+            StopListeners(listeners);
+
             // $REQ_SIMPLE_004: Port Already in Use Error
             await Console.Error.WriteLineAsync($"Error: Port {localPort} is already in use");
             _exitCode = 1;
@@ -205,54 +550,97 @@ Documentation:
         }
     }
 
-    private static async Task AcceptConnections(TcpListener listener, string targetHost, int targetPort, int localPort, CancellationToken ct)
+    private static void StopListeners(TcpListener[] listeners)
+    {
+        foreach (var listener in listeners)
+        {
+            listener?.Stop();
+        }
+    }
+
+    private static async Task AcceptConnections(TcpListener listener, string targetHost, int targetPort, int localPort, UpstreamPool? pool, CaptureRule captureRule, CancellationToken ct)
     {
         while (!ct.IsCancellationRequested)
         {
             try
             {
                 var client = await listener.AcceptTcpClientAsync(ct);
-                var connId = GetNextConnId();
+                DateTimeOffset opened;
+                string connId;
+                // Accept loops of several port rules run in parallel: take the ID and the
+                // open time together so later IDs never carry earlier open times
+                lock (_connIdLock)
+                {
+                    opened = EventClock.UtcNow;
+                    connId = GetNextConnId();
+                }
                 var clientEp = client.Client.RemoteEndPoint?.ToString() ?? "unknown";
                 var listenerEp = client.Client.LocalEndPoint?.ToString() ?? $"0.0.0.0:{localPort}";
                 var serverEp = $"{targetHost}:{targetPort}";
+                // Endpoints kept for binary destinations, including ones started later
+                var connIndex = ConnectionTable.Register(opened, connId, clientEp, serverEp, listenerEp, localPort);
+                var flow = PcapngFlow.For(client.Client, $"ConnID {connId}: {clientEp} -> {serverEp} via {listenerEp}");
 
                 // $REQ_SIMPLE_011: Connection Open Event
                 // $REQ_SIMPLE_018: Don't block network forwarding on disk writes
                 // $REQ_SIMPLE_019: Fire-and-forget logging - network never waits for disk
-                LogEvent(new Dictionary<string, object> {
-                    ["time"] = GetTimestamp(),
-                    ["ConnID"] = connId,
-                    ["event"] = "open",
-                    ["from"] = clientEp,
-                    ["to"] = serverEp,
-                    ["listener"] = listenerEp,
-                    ["listen_port"] = localPort
-                });
-
-                _ = Task.Run(() => HandleConnection(client, targetHost, targetPort, localPort, connId, clientEp, listenerEp, serverEp, ct));
+                // The level is read once: the close event follows whether this open was logged
+                var openLogged = captureRule.Level != CaptureLevel.Off; // $REQ_SIMPLE_030
+                if (openLogged)
+                {
+                    LogEvent(EventWriter.Open(opened, connId, clientEp, serverEp, listenerEp, localPort),
+                        HasDestinations(LogFormat.Binary) ? BinaryEventWriter.Open(opened, connIndex, connId) : null,
+                        flow != null && HasDestinations(LogFormat.Pcapng) ? PcapngWriter.Open(opened, flow, connId) : null);
+                }
+
+                var capture = new ConnectionCapture(connId, connIndex, flow, opened, clientEp, serverEp, listenerEp, localPort, captureRule, openLogged, CaptureSegment);
+                _openConnections[connIndex] = capture;
+                _ = Task.Run(() => HandleConnection(client, targetHost, targetPort, pool, capture, ct));
             }
             catch when (ct.IsCancellationRequested) { break; }
             catch { }
         }
     }
 
-    private static async Task HandleConnection(TcpClient client, string targetHost, int targetPort, int localPort, string connId, string clientEp, string listenerEp, string serverEp, CancellationToken ct)
+    private static async Task HandleConnection(TcpClient client, string targetHost, int targetPort, UpstreamPool? pool, ConnectionCapture capture, CancellationToken ct)
     {
         TcpClient? server = null;
+        Task<bool>? task1 = null;
+        Task<bool>? task2 = null;
+        Interlocked.Increment(ref _activeConnections);
 
         try
         {
             // $REQ_SIMPLE_005: Establish outbound TCP connection before forwarding
-            server = await ConnectToTarget(targetHost, targetPort, ct);
+            // A warm pooled connection skips the handshake entirely
+            if (pool == null || !pool.TryTake(out server))
+            {
+                server = await ConnectToTarget(targetHost, targetPort, ct);
+            }
 
             var clientStream = client.GetStream();
             var serverStream = server.GetStream();
 
-            var task1 = ForwardData(clientStream, serverStream, connId, clientEp, serverEp, listenerEp, localPort, ct);
-            var task2 = ForwardData(serverStream, clientStream, connId, serverEp, clientEp, listenerEp, localPort, ct);
+            task1 = ForwardData(clientStream, serverStream, capture, fromClient: true, ct);
+            task2 = ForwardData(serverStream, clientStream, capture, fromClient: false, ct);
 
-            await Task.WhenAny(task1, task2);
+            // $REQ_SIMPLE_025: Half-close propagation
+            // One side finished sending and its FIN was passed on: keep the other
+            // direction pumping until it ends too (or the linger deadline passes).
+            // An error or reset in either direction tears both down at once.
+            var first = await Task.WhenAny(task1, task2);
+            if (await first)
+            {
+                var other = first == task1 ? task2 : task1;
+                if (_lingerMillis > 0) // $REQ_SIMPLE_026
+                {
+                    await Task.WhenAny(other, Task.Delay(_lingerMillis, ct));
+                }
+                else
+                {
+                    await other;
+                }
+            }
         }
         catch (Exception)
         {
@@ -260,115 +648,215 @@ Documentation:
         }
         finally
         {
+            var closeTime = EventClock.UtcNow;
+            client?.Close();
+            server?.Close();
+            Interlocked.Decrement(ref _activeConnections);
+
+            // Let both relay loops observe the closed sockets, then wait for the
+            // capture task so the close event follows every data event
+            await Task.WhenAll(task1 ?? Task.CompletedTask, task2 ?? Task.CompletedTask);
+            capture.Complete();
+            await capture.Completion;
+            closeTime = capture.EventTime(closeTime);
+
             // $REQ_SIMPLE_015: Connection Close Event
             // $REQ_SIMPLE_018: Don't block network forwarding on disk writes
             // $REQ_SIMPLE_019: Fire-and-forget logging - network never waits for disk
-            LogEvent(new Dictionary<string, object> {
-                ["time"] = GetTimestamp(),
-                ["ConnID"] = connId,
-                ["event"] = "close",
-                ["from"] = serverEp,
-                ["to"] = clientEp,
-                ["listener"] = listenerEp,
-            });
-
-            client?.Close();
-            server?.Close();
+            _openConnections.TryRemove(capture.ConnIndex, out _);
+            var totals = capture.Totals(closeTime);
+            if (capture.OpenLogged) // $REQ_SIMPLE_030
+            {
+                LogEvent(EventWriter.Close(closeTime, capture.ConnId, capture.ServerEndpoint, capture.ClientEndpoint, capture.ListenerEndpoint, totals),
+                HasDestinations(LogFormat.Binary) ? BinaryEventWriter.Close(closeTime, capture.ConnIndex, capture.ConnId, totals) : null,
+                capture.Flow != null && HasDestinations(LogFormat.Pcapng) ? PcapngWriter.Close(closeTime, capture.Flow, capture.ConnId, totals) : null);
+            }
+            ConnectionTable.Close(capture.ConnIndex);
         }
     }
 
-    private static async Task ForwardData(NetworkStream from, NetworkStream to, string connId, string fromEp, string toEp, string listenerEp, int localPort, CancellationToken ct)
+    /// <summary>
+    /// Relays one direction until the sender finishes. Returns true on a clean
+    /// end of stream, after half-closing the receiving side, and false on error.
+    /// </summary>
+    private static async Task<bool> ForwardData(NetworkStream from, NetworkStream to, ConnectionCapture capture, bool fromClient, CancellationToken ct)
     {
-        var buffer = new byte[8192];
+        var size = RelayBufferPool.MinBufferSize;
+        var rewaited = false;
+        SpliceRelay? splice = null;
         try
         {
             while (!ct.IsCancellationRequested)
             {
-                int read = await from.ReadAsync(buffer, 0, buffer.Length, ct);
-                if (read == 0) break;
+                // Zero-byte read: wait until data is ready without holding a buffer,
+                // so idle keep-alive connections cost no relay memory
+                await from.ReadAsync(Memory<byte>.Empty, ct);
+
+                // The read can wake with nothing to read while the stream is still open
+                // (a stale readiness notification); wait again rather than park a buffer
+                // in the read below. Only once in a row, so such wake-ups never spin.
+                if (!rewaited && from.Socket.Available == 0 && !from.Socket.Poll(0, SelectMode.SelectRead))
+                {
+                    rewaited = true;
+                    continue;
+                }
+                rewaited = false;
 
-                await to.WriteAsync(buffer, 0, read, ct);
+                // Nothing is capturing, or not this direction's data: move the bytes in the
+                // kernel. Checked per chunk so a start-logging or set-capture call switches
+                // back to the copy loop.
+                if (_spliceEnabled && (Volatile.Read(ref _activeDestinations) == 0 || !capture.Captures(fromClient)))
+                {
+                    splice ??= new SpliceRelay();
+                    var moved = await splice.RelayAsync(from.Socket, to.Socket, to, _relayBuffers, ct);
+                    if (moved == 0)
+                    {
+                        to.Socket.Shutdown(SocketShutdown.Send);
+                        return true;
+                    }
+                    if (moved > 0)
+                    {
+                        capture.Forwarded(fromClient, moved);
+                    }
+                    continue;
+                }
 
-                var data = EscapeData(buffer, read);
-                // $REQ_SIMPLE_013: Traffic Data Events
-                // $REQ_SIMPLE_018: Don't block network forwarding on disk writes
-                // $REQ_SIMPLE_019: Fire-and-forget logging - network never waits for disk
-                LogEvent(new Dictionary<string, object> {
-                    ["time"] = GetTimestamp(),
-                    ["ConnID"] = connId,
-                    ["data"] = data,
-                    ["from"] = fromEp,
-                    ["to"] = toEp,
-                    ["listener"] = listenerEp,
-                    ["listen_port"] = localPort
-                });
+                // Size the buffer by what is actually waiting, so a wake-up without
+                // data (end of stream or a spurious notification) ties up only the
+                // smallest buffer while the read waits
+                var segment = RelaySegment.Rent(_relayBuffers, Math.Min(size, from.Socket.Available), fromClient);
+                try
+                {
+                    int read = await from.ReadAsync(segment.Buffer, ct);
+                    if (read == 0)
+                    {
+                        // Propagate the FIN so the peer sees end of stream while it
+                        // can still send in the other direction
+                        to.Socket.Shutdown(SocketShutdown.Send);
+                        return true;
+                    }
+
+                    segment.Length = read;
+                    segment.Time = EventClock.UtcNow;
+
+                    // $REQ_SIMPLE_018: Don't block network forwarding on disk writes
+                    // Hand the chunk to the capture task first so escaping and
+                    // serialization run alongside the send instead of before the next read
+                    if (capture.Forwarded(segment) && Volatile.Read(ref _activeDestinations) > 0)
+                    {
+                        capture.Post(segment);
+                    }
+
+                    await to.WriteAsync(segment.Buffer.AsMemory(0, read), ct);
+
+                    size = RelayBufferPool.NextSize(size, read);
+                }
+                finally
+                {
+                    segment.Release();
+                }
             }
         }
         catch when (ct.IsCancellationRequested) { }
         catch { }
-    }
-
-    private static async Task<TcpClient> ConnectToTarget(string targetHost, int targetPort, CancellationToken ct)
-    {
-        var addresses = await Dns.GetHostAddressesAsync(targetHost);
-        if (addresses.Length == 0)
+        finally
         {
-            throw new SocketException((int)SocketError.HostNotFound);
+            splice?.Dispose();
         }
+        return false;
+    }
 
-        // Prefer IPv4 to match tests binding to IPv4 loopback
-        var ordered = addresses.OrderByDescending(a => a.AddressFamily == AddressFamily.InterNetwork ? 1 : 0).ToArray();
-
-        Exception? lastError = null;
-        foreach (var address in ordered)
-        {
-            if (ct.IsCancellationRequested)
-            {
-                throw new OperationCanceledException(ct);
-            }
+    // Encodings of one segment: NDJSON per concrete data encoding, then binary and pcapng
+    private const int SegmentEncodings = 5;
 
-            var client = new TcpClient(address.AddressFamily);
-            using var registration = ct.Register(() =>
-            {
-                try { client.Dispose(); } catch { }
-            });
+    // Lines built for the segment being captured, two slots per encoding (full, truncated).
+    // CaptureSegment runs synchronously on the capture task's thread.
+    [ThreadStatic] private static LogLine?[]? _segmentLines;
 
-            try
+    private static void CaptureSegment(ConnectionCapture capture, RelaySegment segment)
+    {
+        // Each encoding is written at most once, when the first destination using it needs it
+        var lines = _segmentLines ??= new LogLine?[SegmentEncodings * 2];
+        DataEncoding? auto = null;
+        try
+        {
+            foreach (var dest in _logDestinations)
             {
-                await client.ConnectAsync(address, targetPort);
-                return client;
+                if (dest.IsStopped) continue;
+                var format = dest.Options.Format;
+                if (format == LogFormat.Pcapng && capture.Flow == null) continue;
+                var encoding = dest.Options.DataEncoding;
+                if (encoding == DataEncoding.Auto)
+                {
+                    // $REQ_LOG_026: Chosen once per chunk for every auto destination
+                    auto ??= DataEscaper.PrefersBase64(segment.Captured) ? DataEncoding.Base64 : DataEncoding.Url;
+                    encoding = auto.Value;
+                }
+                var slot = (format switch
+                {
+                    LogFormat.Binary => 3,
+                    LogFormat.Pcapng => 4,
+                    _ => (int)encoding
+                }) * 2;
+                var line = lines[slot] ??= EncodeSegment(capture, segment, format, encoding, truncated: false);
+                // Truncate policy: a destination that cannot take the whole event gets a
+                // copy with the payload cut short, written once and shared like any line
+                if (dest.Options.OverflowPolicy == OverflowPolicy.Truncate
+                    && segment.CaptureLength > LogDestination.TruncatedDataBytes
+                    && dest.WouldOverflow(line.Length))
+                {
+                    _ = dest.Log(lines[slot + 1] ??= EncodeSegment(capture, segment, format, encoding, truncated: true), truncated: true);
+                }
+                else
+                {
+                    _ = dest.Log(line);
+                }
             }
-            catch (Exception ex)
+        }
+        finally
+        {
+            for (int i = 0; i < lines.Length; i++)
             {
-                lastError = ex;
-                try { client.Dispose(); } catch { }
+                lines[i]?.Release();
+                lines[i] = null;
             }
         }
-
-        throw lastError ?? new SocketException((int)SocketError.HostUnreachable);
     }
 
-    private static string EscapeData(byte[] bytes, int length)
+    private static LogLine EncodeSegment(ConnectionCapture capture, RelaySegment segment, LogFormat format, DataEncoding encoding, bool truncated)
     {
-        // $REQ_SIMPLE_014: URL-encode data for JSON embedding
-        // JSON serializer will handle JSON escaping, we only do URL encoding
-        var sb = new StringBuilder();
-        for (int i = 0; i < length; i++)
+        // Past the capture limit the chunk is cut short like a truncated one
+        var data = truncated ? segment.Captured[..LogDestination.TruncatedDataBytes] : segment.Captured;
+        var truncatedFrom = data.Length < segment.Length ? segment.Length : -1;
+        switch (format)
         {
-            var b = bytes[i];
-            // Percent sign must be encoded as %25
-            if (b == 0x25) sb.Append("%25");
-            // Preserve control chars that JSON encodes with standard escapes
-            else if (b == 0x09 || b == 0x0A || b == 0x0D) sb.Append((char)b); // $REQ_SIMPLE_014
-            // Printable ASCII (0x20-0x7E except %) as literal
-            else if (b >= 0x20 && b <= 0x7E) sb.Append((char)b);
-            // All other bytes as %XX
-            else sb.Append($"%{b:X2}");
+            case LogFormat.Binary:
+                return BinaryEventWriter.Data(segment.Time, capture.ConnIndex, capture.ConnId, segment.FromClient, data, truncatedFrom, segment.Chunks, segment.LastTime);
+            case LogFormat.Pcapng:
+                return PcapngWriter.Data(segment.Time, capture.Flow!, capture.ConnId, segment.FromClient, segment.StreamOffset, segment.PeerOffset, data, segment.Length);
+            default:
+                // $REQ_SIMPLE_013: Traffic Data Events
+                // $REQ_SIMPLE_014: Data is URL-encoded while the event is written
+                // $REQ_SIMPLE_019: Fire-and-forget logging - network never waits for disk
+                var fromEp = segment.FromClient ? capture.ClientEndpoint : capture.ServerEndpoint;
+                var toEp = segment.FromClient ? capture.ServerEndpoint : capture.ClientEndpoint;
+                return EventWriter.Data(segment.Time, capture.ConnId, data, fromEp, toEp,
+                    capture.ListenerEndpoint, capture.ListenPort, truncatedFrom, encoding, segment.Chunks, segment.LastTime);
         }
-        return sb.ToString();
     }
 
-    private static string GetNextConnId()
+    private static async Task<TcpClient> ConnectToTarget(string targetHost, int targetPort, CancellationToken ct)
+    {
+        var addresses = await _dnsCache.ResolveAsync(targetHost, ct);
+        if (addresses.Length == 0)
+        {
+            throw new SocketException((int)SocketError.HostNotFound);
+        }
+
+        return await HappyEyeballs.ConnectAsync(addresses, targetPort, ct);
+    }
+
+    private static string GetNextConnId()
     {
         // $REQ_SIMPLE_012: Get current ID, then increment for next connection
         long id = Interlocked.Add(ref _nextConnId, 1) - 1;
@@ -396,50 +884,75 @@ Documentation:
         return sb.Length > 0 ? sb.ToString() : "0";
     }
 
-    private static string GetTimestamp()
-    {
-        return DateTimeOffset.UtcNow.ToString("yyyy-MM-ddTHH:mm:ss.ffffffZ", CultureInfo.InvariantCulture);
-    }
+    private static bool HasDestinations(LogFormat format) => Volatile.Read(ref _formatDestinations[(int)format]) > 0;
 
-    private static void LogEvent(Dictionary<string, object> obj)
+    /// <summary>
+    /// Writes a progress event every --progress-millis for each open connection of a
+    /// metadata rule that forwarded anything since its last one.
+    /// </summary>
+    private static async Task ReportProgress(CancellationToken ct)
     {
-        var json = SerializeLogObject(obj);
-        foreach (var dest in _logDestinations)
+        using var timer = new PeriodicTimer(TimeSpan.FromMilliseconds(_progressMillis));
+        try
         {
-            // Fire-and-forget: Log() returns Task.CompletedTask immediately, no need to await
-            _ = dest.Log(json);
+            while (await timer.WaitForNextTickAsync(ct))
+            {
+                if (Volatile.Read(ref _activeDestinations) == 0) continue;
+                var now = EventClock.UtcNow;
+                foreach (var capture in _openConnections.Values)
+                {
+                    // $REQ_SIMPLE_031: Periodic byte counters for metadata rules
+                    if (capture.Level != CaptureLevel.Metadata) continue;
+                    var time = capture.EventTime(now);
+                    if (capture.TakeProgress(time, out var totals))
+                    {
+                        LogEvent(EventWriter.Progress(time, capture.ConnId, totals));
+                    }
+                }
+            }
         }
+        catch (OperationCanceledException) { }
     }
 
-    private static string SerializeLogObject(Dictionary<string, object> obj)
+    /// <param name="binary">The event as a binary record; when null, binary destinations get the NDJSON line in an event record.</param>
+    /// <param name="pcapng">The event as pcapng packets; when null, pcapng destinations skip it.</param>
+    private static void LogEvent(LogLine line, LogLine? binary = null, LogLine? pcapng = null)
     {
-        // Use relaxed escaping so quotes become \" instead of \\u0022 // $REQ_SIMPLE_014
-        var json = JsonSerializer.Serialize(obj, _jsonOptions);
-        if (json.IndexOf("\\u0022", StringComparison.Ordinal) >= 0)
+        // Serialized once per format; every destination queues a reference to the same bytes
+        foreach (var dest in _logDestinations)
         {
-            json = json.Replace("\\u0022", "\\\"", StringComparison.Ordinal);
+            // Fire-and-forget: Log() returns Task.CompletedTask immediately, no need to await
+            switch (dest.Options.Format)
+            {
+                case LogFormat.Binary:
+                    _ = dest.Log(binary ??= BinaryEventWriter.Event(line));
+                    break;
+                case LogFormat.Pcapng:
+                    if (pcapng != null)
+                    {
+                        _ = dest.Log(pcapng.Value);
+                    }
+                    break;
+                default:
+                    _ = dest.Log(line);
+                    break;
+            }
         }
-        return json;
+        line.Release();
+        binary?.Release();
+        pcapng?.Release();
     }
 
-    private static Task StartLogging(string? directory, string filenameFormat)
+    private static Task StartLogging(string? directory, string filenameFormat, LogOptions options)
     {
-        var dest = new LogDestination(directory, filenameFormat, _flushMillis);
+        filenameFormat = LogOptions.FilenameFormat(filenameFormat, options.Format);
+        var dest = new LogDestination(directory, filenameFormat, _flushMillis, options);
         _logDestinations.Add(dest);
+        Interlocked.Increment(ref _activeDestinations);
+        Interlocked.Increment(ref _formatDestinations[(int)options.Format]);
         _ = Task.Run(() => dest.FlushLoop(_cts.Token));
 
-        // $REQ_LOG_016: filename_format only in event for directory logging, not STDOUT
-        var logEvent = new Dictionary<string, object> {
-            ["time"] = GetTimestamp(),
-            ["event"] = "start-logging",
-            ["directory"] = directory!
-        };
-        if (directory != null)
-        {
-            logEvent["filename_format"] = filenameFormat;
-        }
-
-        LogEvent(logEvent);
+        LogEvent(EventWriter.StartLogging(EventClock.UtcNow, directory, filenameFormat));
         return Task.CompletedTask;
     }
 
@@ -463,12 +976,10 @@ Documentation:
 
         foreach (var dest in selected)
         {
-            LogEvent(new Dictionary<string, object> {
-                ["time"] = GetTimestamp(),
-                ["event"] = "stop-logging",
-                ["directory"] = dest.Directory!
-            }); // $REQ_LOG_002, $REQ_LOG_005, $REQ_LOG_006, $REQ_LOG_007
-            dest.Stop();
+            // A concurrent stop-logging call may have stopped it since the snapshot
+            if (!dest.Stop(() => LogEvent(EventWriter.StopLogging(EventClock.UtcNow, dest.Directory)))) continue; // $REQ_LOG_002, $REQ_LOG_005, $REQ_LOG_006, $REQ_LOG_007
+            Interlocked.Decrement(ref _activeDestinations);
+            Interlocked.Decrement(ref _formatDestinations[(int)dest.Options.Format]);
         }
         return Task.CompletedTask;
     }
@@ -589,11 +1100,11 @@ Documentation:
         headerBuilder.Append("Connection: close\r\n");
         headerBuilder.Append($"Content-Length: {encodedBody.Length}\r\n\r\n");
         var headerBytes = Encoding.UTF8.GetBytes(headerBuilder.ToString());
-        await stream.WriteAsync(headerBytes, 0, headerBytes.Length);
-        if (encodedBody.Length > 0)
-        {
-            await stream.WriteAsync(encodedBody, 0, encodedBody.Length);
-        }
+        // One write: a shutdown response must not lose its body to the process exiting in between
+        var response = new byte[headerBytes.Length + encodedBody.Length];
+        headerBytes.CopyTo(response, 0);
+        encodedBody.CopyTo(response, headerBytes.Length);
+        await stream.WriteAsync(response);
     }
 
     private static async Task<(int StatusCode, string Body)> HandleToolCall(JsonElement request, JsonElement id)
@@ -623,6 +1134,17 @@ Documentation:
         }
     }
 
+    private static long NonNegative(JsonElement args, string name, long defaultValue)
+    {
+        if (!args.TryGetProperty(name, out var prop)) return defaultValue;
+        var value = prop.GetInt64();
+        if (value < 0)
+        {
+            throw new Exception($"start-logging {name} must be non-negative");
+        }
+        return value;
+    }
+
     private static async Task<string> ExecuteTool(string name, JsonElement args)
     {
         switch (name)
@@ -631,7 +1153,66 @@ Documentation:
                 // $REQ_MCP_012: Start logging tool
                 var dir = args.TryGetProperty("directory", out var dirProp) && dirProp.ValueKind != JsonValueKind.Null ? dirProp.GetString() : null;
                 var fmt = args.TryGetProperty("filename_format", out var fmtProp) ? fmtProp.GetString()! : _filenameFormat;
-                await StartLogging(dir, fmt);
+                var options = _logOptions;
+                options = options with { MaxBufferBytes = NonNegative(args, "max_buffer_bytes", options.MaxBufferBytes) };
+                if (args.TryGetProperty("overflow_policy", out var policyProp))
+                {
+                    if (!LogOptions.TryParsePolicy(policyProp.GetString(), out var policy))
+                    {
+                        throw new Exception("start-logging overflow_policy must be drop-newest, drop-oldest, truncate or spill");
+                    }
+                    options = options with { OverflowPolicy = policy };
+                }
+                options = options with
+                {
+                    MaxFileBytes = NonNegative(args, "max_file_bytes", options.MaxFileBytes),
+                    RetainBytes = NonNegative(args, "retain_bytes", options.RetainBytes),
+                    RetainSeconds = NonNegative(args, "retain_seconds", options.RetainSeconds)
+                };
+                if (args.TryGetProperty("compression", out var compressionProp))
+                {
+                    if (!LogOptions.TryParseCompression(compressionProp.GetString(), out var compression))
+                    {
+                        throw new Exception("start-logging compression must be none, gzip or brotli");
+                    }
+                    options = options with { Compression = compression };
+                }
+                if (args.TryGetProperty("log_format", out var formatProp))
+                {
+                    if (!LogOptions.TryParseFormat(formatProp.GetString(), out var format))
+                    {
+                        throw new Exception("start-logging log_format must be ndjson, binary or pcapng");
+                    }
+                    options = options with { Format = format };
+                }
+                if (args.TryGetProperty("data_encoding", out var encodingProp))
+                {
+                    if (!LogOptions.TryParseDataEncoding(encodingProp.GetString(), out var encoding))
+                    {
+                        throw new Exception("start-logging data_encoding must be url, base64, hex or auto");
+                    }
+                    options = options with { DataEncoding = encoding };
+                }
+                if (args.TryGetProperty("keep_files_open", out var keepOpenProp))
+                {
+                    options = options with { KeepFilesOpen = keepOpenProp.GetBoolean() };
+                }
+                var logRings = NonNegative(args, "log_rings", options.LogRings);
+                var ringSlots = NonNegative(args, "log_ring_slots", options.LogRingSlots);
+                if (logRings > LogRings.MaxRings || ringSlots < 1 || ringSlots > LogRings.MaxRingSlots)
+                {
+                    throw new Exception($"start-logging log_rings must be at most {LogRings.MaxRings} and log_ring_slots from 1 to {LogRings.MaxRingSlots}");
+                }
+                options = options with { LogRings = (int)logRings, LogRingSlots = (int)ringSlots };
+                if (args.TryGetProperty("spill_dir", out var spillDirProp))
+                {
+                    options = options with { SpillDirectory = spillDirProp.GetString() };
+                }
+                if (options.OverflowPolicy == OverflowPolicy.Spill && string.IsNullOrEmpty(options.SpillDirectory))
+                {
+                    throw new Exception("start-logging overflow_policy spill requires spill_dir or --spill-dir");
+                }
+                await StartLogging(dir, fmt, options);
                 return $"Started logging to {dir ?? "STDOUT"}";
 
             case "stop-logging":
@@ -661,19 +1242,71 @@ Documentation:
                 var local = args.GetProperty("local_port").GetInt32(); // $REQ_MCP_031
                 var target = args.GetProperty("target_host").GetString()!;
                 var targetPort = args.GetProperty("target_port").GetInt32();
-                await AddPortRule(local, target, targetPort);
+                var poolMin = args.TryGetProperty("pool_min", out var poolMinProp) ? poolMinProp.GetInt32() : 0;
+                var poolMax = args.TryGetProperty("pool_max", out var poolMaxProp) ? poolMaxProp.GetInt32() : poolMin;
+                var poolIdleMillis = args.TryGetProperty("pool_idle_millis", out var poolIdleProp) ? poolIdleProp.GetInt32() : 30000;
+                if (poolMin < 0 || poolMax < poolMin || poolIdleMillis <= 0)
+                {
+                    throw new Exception("add-port-rule requires 0 <= pool_min <= pool_max and a positive pool_idle_millis");
+                }
+                var listenerCount = args.TryGetProperty("listeners", out var listenersProp) ? listenersProp.GetInt32() : 1;
+                if (listenerCount < 1 || (listenerCount > 1 && !OperatingSystem.IsLinux()))
+                {
+                    throw new Exception("add-port-rule listeners must be 1, or greater than 1 on Linux");
+                }
+                var captureBytes = args.TryGetProperty("capture_bytes", out var captureBytesProp) ? captureBytesProp.GetInt64() : 0;
+                if (captureBytes < 0)
+                {
+                    throw new Exception("add-port-rule capture_bytes must be non-negative");
+                }
+                var captureLevel = CaptureLevel.Full;
+                if (args.TryGetProperty("capture", out var captureProp) && !CaptureRule.TryParseLevel(captureProp.GetString(), out captureLevel))
+                {
+                    throw new Exception("add-port-rule capture must be full, metadata or off");
+                }
+                var coalesceMicros = args.TryGetProperty("coalesce_micros", out var coalesceMicrosProp) ? coalesceMicrosProp.GetInt64() : 0;
+                var coalesceBytes = args.TryGetProperty("coalesce_bytes", out var coalesceBytesProp) ? coalesceBytesProp.GetInt32() : CaptureRule.DefaultCoalesceBytes;
+                if (coalesceMicros < 0 || coalesceBytes < 1 || coalesceBytes > RelayBufferPool.MaxBufferSize)
+                {
+                    throw new Exception($"add-port-rule requires a non-negative coalesce_micros and coalesce_bytes from 1 to {RelayBufferPool.MaxBufferSize}");
+                }
+                await AddPortRule(local, target, targetPort, poolMin, poolMax, poolIdleMillis, listenerCount,
+                    new CaptureRule(captureLevel, captureBytes, coalesceMicros, coalesceBytes));
                 return $"Added port rule {local}:{target}:{targetPort}";
 
             case "remove-port-rule":
                 // $REQ_MCP_015: Remove port rule tool
                 var removePort = args.GetProperty("local_port").GetInt32(); // $REQ_MCP_032
-                if (_listeners.TryRemove(removePort, out var listener))
+                if (_listeners.TryRemove(removePort, out var removedListeners))
                 {
-                    listener.Stop();
+                    StopListeners(removedListeners);
+                    _captureRules.TryRemove(removePort, out _);
+                    if (_upstreamPools.TryRemove(removePort, out var removedPool))
+                    {
+                        removedPool.Dispose();
+                    }
                     return $"Removed port rule for port {removePort}";
                 }
                 throw new Exception($"Port {removePort} not found");
 
+            case "set-capture":
+                // $REQ_MCP_041: Change a port rule's capture level at runtime
+                var capturePort = args.GetProperty("local_port").GetInt32();
+                if (!CaptureRule.TryParseLevel(args.GetProperty("capture").GetString(), out var level))
+                {
+                    throw new Exception("set-capture capture must be full, metadata or off");
+                }
+                if (!_captureRules.TryGetValue(capturePort, out var captureRule))
+                {
+                    throw new Exception($"Port {capturePort} not found");
+                }
+                captureRule.Level = level;
+                return $"Capture for port {capturePort} set to {CaptureRule.LevelName(level)}";
+
+            case "get-stats":
+                // $REQ_MCP_040: Runtime statistics tool
+                return GetStats();
+
             case "shutdown":
                 // $REQ_MCP_016: Shutdown tool
                 _cts.Cancel(); // $REQ_MCP_020, $REQ_MCP_033
@@ -684,6 +1317,66 @@ Documentation:
         }
     }
 
+    private static string GetStats()
+    {
+        using var stream = new MemoryStream();
+        using (var writer = new Utf8JsonWriter(stream))
+        {
+            writer.WriteStartObject();
+            writer.WriteNumber("active_connections", Interlocked.Read(ref _activeConnections));
+            writer.WritePropertyName("relay_buffers");
+            _relayBuffers.WriteStats(writer);
+            writer.WritePropertyName("log_arena");
+            LogArena.WriteStats(writer);
+            writer.WritePropertyName("log_buffers");
+            writer.WriteStartObject();
+            writer.WriteNumber("buffered_bytes", LogDestination.TotalBufferedBytes);
+            writer.WriteNumber("max_total_bytes", LogDestination.MaxTotalBufferedBytes);
+            writer.WritePropertyName("destinations");
+            writer.WriteStartArray();
+            foreach (var dest in _logDestinations.Where(d => !d.IsStopped))
+            {
+                dest.WriteStats(writer);
+            }
+            writer.WriteEndArray();
+            writer.WriteEndObject();
+            writer.WritePropertyName("dns");
+            _dnsCache.WriteStats(writer);
+            writer.WritePropertyName("connect");
+            HappyEyeballs.WriteStats(writer);
+            writer.WritePropertyName("upstream_pools");
+            writer.WriteStartObject();
+            foreach (var (port, pool) in _upstreamPools)
+            {
+                writer.WritePropertyName(port.ToString());
+                pool.WriteStats(writer);
+            }
+            writer.WriteEndObject();
+            writer.WritePropertyName("capture");
+            writer.WriteStartObject();
+            foreach (var (port, rule) in _captureRules)
+            {
+                writer.WritePropertyName(port.ToString());
+                writer.WriteStartObject();
+                writer.WriteString("level", CaptureRule.LevelName(rule.Level));
+                writer.WriteNumber("capture_bytes", rule.CaptureBytes);
+                writer.WriteNumber("coalesce_micros", rule.CoalesceMicros);
+                writer.WriteNumber("coalesce_bytes", rule.CoalesceBytes);
+                writer.WriteEndObject();
+            }
+            writer.WriteEndObject();
+            writer.WritePropertyName("splice");
+            writer.WriteStartObject();
+            writer.WriteBoolean("enabled", _spliceEnabled);
+            writer.WriteNumber("bytes", SpliceRelay.SplicedBytes);
+            writer.WriteNumber("copied_bytes", SpliceRelay.CopiedBytes);
+            writer.WriteEndObject();
+            writer.WriteEndObject();
+            writer.Flush();
+        }
+        return Encoding.UTF8.GetString(stream.ToArray());
+    }
+
     private static (int StatusCode, string Body) JsonRpcSuccess(JsonElement id, Action<Utf8JsonWriter> writeResult)
     {
         using var stream = new MemoryStream();
@@ -769,6 +1462,75 @@ Documentation:
             schemaWriter.WritePropertyName("type");
             schemaWriter.WriteStringValue("string");
             schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("max_buffer_bytes");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("integer");
+            schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("overflow_policy");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("string");
+            schemaWriter.WritePropertyName("enum");
+            schemaWriter.WriteStartArray();
+            schemaWriter.WriteStringValue("drop-newest");
+            schemaWriter.WriteStringValue("drop-oldest");
+            schemaWriter.WriteStringValue("truncate");
+            schemaWriter.WriteStringValue("spill");
+            schemaWriter.WriteEndArray();
+            schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("spill_dir");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("string");
+            schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("keep_files_open");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("boolean");
+            schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("compression");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("string");
+            schemaWriter.WritePropertyName("enum");
+            schemaWriter.WriteStartArray();
+            schemaWriter.WriteStringValue("none");
+            schemaWriter.WriteStringValue("gzip");
+            schemaWriter.WriteStringValue("brotli");
+            schemaWriter.WriteEndArray();
+            schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("log_format");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("string");
+            schemaWriter.WritePropertyName("enum");
+            schemaWriter.WriteStartArray();
+            schemaWriter.WriteStringValue("ndjson");
+            schemaWriter.WriteStringValue("binary");
+            schemaWriter.WriteStringValue("pcapng");
+            schemaWriter.WriteEndArray();
+            schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("data_encoding");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("string");
+            schemaWriter.WritePropertyName("enum");
+            schemaWriter.WriteStartArray();
+            schemaWriter.WriteStringValue("url");
+            schemaWriter.WriteStringValue("base64");
+            schemaWriter.WriteStringValue("hex");
+            schemaWriter.WriteStringValue("auto");
+            schemaWriter.WriteEndArray();
+            schemaWriter.WriteEndObject();
+            foreach (var limit in new[] { "max_file_bytes", "retain_bytes", "retain_seconds", "log_rings", "log_ring_slots" })
+            {
+                schemaWriter.WritePropertyName(limit);
+                schemaWriter.WriteStartObject();
+                schemaWriter.WritePropertyName("type");
+                schemaWriter.WriteStringValue("integer");
+                schemaWriter.WriteEndObject();
+            }
             schemaWriter.WriteEndObject();
         }); // $REQ_MCP_034
 
@@ -810,6 +1572,42 @@ Documentation:
             schemaWriter.WritePropertyName("type");
             schemaWriter.WriteStringValue("integer");
             schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("pool_min");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("integer");
+            schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("pool_max");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("integer");
+            schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("pool_idle_millis");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("integer");
+            schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("listeners");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("integer");
+            schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("capture_bytes");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("integer");
+            schemaWriter.WriteEndObject();
+            WriteCaptureLevelSchema(schemaWriter);
+            schemaWriter.WritePropertyName("coalesce_micros");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("integer");
+            schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("coalesce_bytes");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("integer");
+            schemaWriter.WriteEndObject();
             schemaWriter.WriteEndObject();
             schemaWriter.WritePropertyName("required");
             schemaWriter.WriteStartArray();
@@ -837,6 +1635,35 @@ Documentation:
             schemaWriter.WriteEndArray();
         }); // $REQ_MCP_037
 
+        WriteToolDescriptor(writer, "set-capture", "Change how much of a port rule's traffic is logged", schemaWriter =>
+        {
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("object");
+            schemaWriter.WritePropertyName("properties");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("local_port");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("integer");
+            schemaWriter.WriteEndObject();
+            WriteCaptureLevelSchema(schemaWriter);
+            schemaWriter.WriteEndObject();
+            schemaWriter.WritePropertyName("required");
+            schemaWriter.WriteStartArray();
+            schemaWriter.WriteStringValue("local_port");
+            schemaWriter.WriteStringValue("capture");
+            schemaWriter.WriteEndArray();
+        }); // $REQ_MCP_041
+
+        WriteToolDescriptor(writer, "get-stats", "Get runtime statistics", schemaWriter =>
+        {
+            schemaWriter.WritePropertyName("type");
+            schemaWriter.WriteStringValue("object");
+            schemaWriter.WritePropertyName("properties");
+            schemaWriter.WriteStartObject();
+            schemaWriter.WriteEndObject();
+        }); // $REQ_MCP_040
+
         WriteToolDescriptor(writer, "shutdown", "Shutdown RawProx", schemaWriter =>
         {
             schemaWriter.WritePropertyName("type");
@@ -850,6 +1677,21 @@ Documentation:
         writer.WriteEndObject();
     }
 
+    private static void WriteCaptureLevelSchema(Utf8JsonWriter schemaWriter)
+    {
+        schemaWriter.WritePropertyName("capture");
+        schemaWriter.WriteStartObject();
+        schemaWriter.WritePropertyName("type");
+        schemaWriter.WriteStringValue("string");
+        schemaWriter.WritePropertyName("enum");
+        schemaWriter.WriteStartArray();
+        schemaWriter.WriteStringValue("full");
+        schemaWriter.WriteStringValue("metadata");
+        schemaWriter.WriteStringValue("off");
+        schemaWriter.WriteEndArray();
+        schemaWriter.WriteEndObject();
+    }
+
     private static void WriteToolDescriptor(Utf8JsonWriter writer, string name, string description, Action<Utf8JsonWriter> writeSchema)
     {
         writer.WriteStartObject();
@@ -865,44 +1707,350 @@ Documentation:
 
 class LogDestination
 {
-    private readonly ConcurrentQueue<string> _buffer = new();
+    /// <summary>Payload bytes kept in a data event cut short by the truncate policy.</summary>
+    public const int TruncatedDataBytes = 256;
+
+    // Connections listed individually in a capture-gap event; drops beyond this only count in the totals
+    private const int MaxGapConnections = 1000;
+    // Spilled bytes written back per flush, so a large backlog drains over several flushes
+    private const long SpillDrainBytes = 16L * 1024 * 1024;
+    // Retention scans the directory at most this often
+    private const int MinRetentionIntervalMillis = 1000;
+
+    private static readonly Stream _stdout = new BufferedStream(Console.OpenStandardOutput(), 64 * 1024);
+    private static readonly SemaphoreSlim _stdoutLock = new(1, 1);
+    private static long _totalBufferedBytes;
+
+    private readonly LogPeriods _periods;
+    private readonly LogRings _rings;
+    // Serializes drains of _rings into _periods; _drained is the batch being moved
+    private readonly object _drainLock = new();
+    private readonly List<LogLine> _drained = new();
+    // Released by an event that finds its ring half full
+    private readonly SemaphoreSlim _drainSignal = new(0);
     private readonly string? _directory;
-    private readonly string _filenameFormat;
     private readonly int _flushIntervalMs;
+    private readonly LogOptions _options;
+    private readonly LogSpill? _spill;
+    private readonly LogFileCache? _files;
+    private readonly LogSizeRotation? _rotation;
+    private readonly LogCompressor? _compressor;
+    private readonly LogRetention? _retention;
+    private readonly ConnectionDeclarations? _declarations;
+    private readonly PcapngSections? _sections;
+    private Task _retentionTask = Task.CompletedTask;
+    private long _lastRetention;
+    // Files the latest flush wrote; retention leaves them alone
+    private string[] _lastWritten = Array.Empty<string>();
     private DateTimeOffset _lastFlushTime;
     private bool _stopped;
+    // Set by the one Stop call that stops the destination
+    private int _stopping;
+    private long _bufferedBytes;
+
+    // Drops since the last capture-gap event, guarded by _gapLock
+    private readonly object _gapLock = new();
+    private readonly Dictionary<string, (long Events, long Bytes)> _gapConnections = new(StringComparer.Ordinal);
+    private DateTimeOffset _gapSince;
+    private long _gapEvents;
+    private long _gapBytes;
+
+    // Lifetime totals for get-stats
+    private long _droppedEvents;
+    private long _droppedBytes;
+    private long _truncatedEvents;
+    private long _ringFullEvents;
+
+    /// <summary>Bytes all destinations together may hold before flushing (0 = unlimited).</summary>
+    public static long MaxTotalBufferedBytes { get; set; } = 1L << 30;
+    public static long TotalBufferedBytes => Interlocked.Read(ref _totalBufferedBytes);
 
     public string? Directory => _directory;
     public bool IsStopped => _stopped;
+    public LogOptions Options => _options;
 
-    public LogDestination(string? directory, string filenameFormat, int flushIntervalMs)
+    public LogDestination(string? directory, string filenameFormat, int flushIntervalMs, LogOptions options)
     {
         _directory = directory;
-        _filenameFormat = filenameFormat;
+        _periods = new LogPeriods(directory != null ? filenameFormat : null);
+        _rings = new LogRings(options.LogRings, options.LogRingSlots);
         _flushIntervalMs = Math.Max(1, flushIntervalMs);
+        _options = options;
         _lastFlushTime = DateTimeOffset.UtcNow;
         if (directory != null)
         {
             System.IO.Directory.CreateDirectory(directory);
         }
+        if (directory != null && options.KeepFilesOpen)
+        {
+            _files = new LogFileCache(directory, options.FileIdleMillis);
+        }
+        if (directory != null && options.Compression != LogCompression.None)
+        {
+            _compressor = new LogCompressor(options.Compression);
+        }
+        if (directory != null && options.MaxFileBytes > 0)
+        {
+            _rotation = new LogSizeRotation(directory, _periods.Extension, _compressor?.Suffix ?? "", options.Format, options.MaxFileBytes);
+        }
+        if (directory != null && (options.RetainBytes > 0 || options.RetainSeconds > 0))
+        {
+            _retention = new LogRetention(directory, _periods.IsLogFile, options.RetainBytes, options.RetainSeconds);
+        }
+        if (options.OverflowPolicy == OverflowPolicy.Spill)
+        {
+            _spill = new LogSpill(options.SpillDirectory!, options.Format, options.MaxSpillBytes, RecordDrop);
+        }
+        if (options.Format == LogFormat.Binary)
+        {
+            _declarations = new ConnectionDeclarations();
+        }
+        if (options.Format == LogFormat.Pcapng)
+        {
+            _sections = new PcapngSections();
+        }
     }
 
-    public Task Log(string json)
+    /// <param name="truncated">The line is a data event already cut short by the truncate policy.</param>
+    public Task Log(LogLine line, bool truncated = false)
     {
         if (_stopped) return Task.CompletedTask;
-        _buffer.Enqueue(json);
+        // $REQ_LOG_021: While a spill is active every event goes through it, keeping order
+        if (_spill != null && _spill.TryAppend(line, start: false)) return Task.CompletedTask;
+        if (!Reserve(line))
+        {
+            if (_spill != null && _spill.TryAppend(line, start: true)) return Task.CompletedTask;
+            // $REQ_LOG_020: Over budget - record the drop for the next capture-gap event
+            RecordDrop(line);
+            return Task.CompletedTask;
+        }
+        line.AddRef();
+        if (!Enqueue(line))
+        {
+            line.Release();
+            Unreserve(line.Length);
+            if (_spill != null && _spill.TryAppend(line, start: true)) return Task.CompletedTask;
+            RecordDrop(line);
+            return Task.CompletedTask;
+        }
+        if (truncated)
+        {
+            Interlocked.Increment(ref _truncatedEvents);
+        }
         return Task.CompletedTask;
     }
 
-    public void Stop()
+    // $REQ_LOG_027: Events are queued in rings drained in batches by one thread at a time
+    private bool Enqueue(LogLine line)
+    {
+        if (_rings.TryEnqueue(line, out var drainSoon))
+        {
+            if (drainSoon)
+            {
+                _drainSignal.Release();
+            }
+            return true;
+        }
+        // The drain loop fell behind: drain here and try again. A data event gives up
+        // when other threads filled the ring first; control events are never lost.
+        Interlocked.Increment(ref _ringFullEvents);
+        do
+        {
+            Drain();
+            if (_rings.TryEnqueue(line, out _)) return true;
+        }
+        while (line.ConnId == null);
+        return false;
+    }
+
+    /// <summary>Moves the lines queued in the rings to their periods' buffers, in the order they were queued.</summary>
+    private void Drain()
+    {
+        lock (_drainLock)
+        {
+            _rings.Drain(_drained);
+            if (_drained.Count == 0) return;
+            _periods.Enqueue(_drained);
+            _drained.Clear();
+        }
+    }
+
+    private async Task DrainLoop(CancellationToken ct)
+    {
+        try
+        {
+            while (true)
+            {
+                await _drainSignal.WaitAsync(ct);
+                Drain();
+            }
+        }
+        catch (OperationCanceledException) { }
+    }
+
+    /// <summary>Whether queueing <paramref name="length"/> more bytes would exceed this destination's or the global budget.</summary>
+    public bool WouldOverflow(int length)
     {
+        var max = _options.MaxBufferBytes;
+        var maxTotal = MaxTotalBufferedBytes;
+        return (max > 0 && Interlocked.Read(ref _bufferedBytes) + length > max)
+            || (maxTotal > 0 && Interlocked.Read(ref _totalBufferedBytes) + length > maxTotal);
+    }
+
+    private bool Reserve(LogLine line)
+    {
+        // Control events (no ConnID) are tiny and rare; they always get through so
+        // start/stop markers and capture-gap context are never lost
+        if (line.ConnId != null)
+        {
+            if (_options.OverflowPolicy == OverflowPolicy.DropOldest)
+            {
+                // The oldest lines may still be in the rings
+                if (WouldOverflow(line.Length))
+                {
+                    Drain();
+                }
+                while (WouldOverflow(line.Length) && _periods.TryDequeueOldest(out var oldest))
+                {
+                    Unreserve(oldest.Length);
+                    RecordDrop(oldest);
+                    oldest.Release();
+                }
+            }
+            if (WouldOverflow(line.Length))
+            {
+                return false;
+            }
+        }
+        Interlocked.Add(ref _bufferedBytes, line.Length);
+        Interlocked.Add(ref _totalBufferedBytes, line.Length);
+        return true;
+    }
+
+    private void Unreserve(long length)
+    {
+        Interlocked.Add(ref _bufferedBytes, -length);
+        Interlocked.Add(ref _totalBufferedBytes, -length);
+    }
+
+    private void RecordDrop(LogLine line)
+    {
+        Interlocked.Increment(ref _droppedEvents);
+        Interlocked.Add(ref _droppedBytes, line.Length);
+        lock (_gapLock)
+        {
+            if (_gapEvents == 0)
+            {
+                _gapSince = DateTimeOffset.UtcNow;
+            }
+            _gapEvents++;
+            _gapBytes += line.Length;
+            // Control events have no connection to attribute the drop to
+            var connId = line.ConnId;
+            if (connId == null) return;
+            if (_gapConnections.TryGetValue(connId, out var counts))
+            {
+                _gapConnections[connId] = (counts.Events + 1, counts.Bytes + line.Length);
+            }
+            else if (_gapConnections.Count < MaxGapConnections)
+            {
+                _gapConnections[connId] = (1, line.Length);
+            }
+        }
+    }
+
+    /// <summary>Builds the capture-gap event for drops since the last one, or returns null when nothing was lost.</summary>
+    private LogLine? TakeCaptureGap()
+    {
+        lock (_gapLock)
+        {
+            if (_gapEvents == 0) return null;
+            var gap = EventWriter.CaptureGap(EventClock.UtcNow, _gapSince, _gapEvents, _gapBytes,
+                _gapConnections.Select(c => (c.Key, c.Value.Events, c.Value.Bytes)));
+            _gapConnections.Clear();
+            _gapEvents = 0;
+            _gapBytes = 0;
+            switch (_options.Format)
+            {
+                case LogFormat.Binary:
+                    var record = BinaryEventWriter.Event(gap);
+                    gap.Release();
+                    return record;
+                case LogFormat.Pcapng:
+                    // Nothing to show as packets: the drops are missing segments
+                    gap.Release();
+                    return null;
+                default:
+                    return gap;
+            }
+        }
+    }
+
+    public void WriteStats(Utf8JsonWriter writer)
+    {
+        writer.WriteStartObject();
+        writer.WriteString("directory", _directory);
+        writer.WriteString("format", LogOptions.FormatName(_options.Format));
+        if (_options.Format == LogFormat.Ndjson)
+        {
+            writer.WriteString("data_encoding", LogOptions.DataEncodingName(_options.DataEncoding));
+        }
+        writer.WriteNumber("buffered_bytes", Interlocked.Read(ref _bufferedBytes));
+        writer.WriteNumber("periods", _periods.Count);
+        writer.WriteNumber("max_buffer_bytes", _options.MaxBufferBytes);
+        writer.WriteString("overflow_policy", LogOptions.PolicyName(_options.OverflowPolicy));
+        writer.WriteNumber("dropped_events", Interlocked.Read(ref _droppedEvents));
+        writer.WriteNumber("dropped_bytes", Interlocked.Read(ref _droppedBytes));
+        writer.WriteNumber("truncated_events", Interlocked.Read(ref _truncatedEvents));
+        writer.WriteNumber("log_rings", _rings.RingCount);
+        writer.WriteNumber("log_ring_slots", _rings.RingSlots);
+        writer.WriteNumber("ring_full_events", Interlocked.Read(ref _ringFullEvents));
+        if (_spill != null)
+        {
+            writer.WritePropertyName("spill");
+            _spill.WriteStats(writer);
+        }
+        if (_files != null)
+        {
+            writer.WritePropertyName("open_files");
+            _files.WriteStats(writer);
+        }
+        if (_compressor != null)
+        {
+            writer.WritePropertyName("compression");
+            _compressor.WriteStats(writer);
+        }
+        if (_rotation != null)
+        {
+            writer.WriteNumber("max_file_bytes", _options.MaxFileBytes);
+            writer.WriteNumber("size_rotations", _rotation.Rotations);
+        }
+        if (_retention != null)
+        {
+            writer.WritePropertyName("retention");
+            _retention.WriteStats(writer);
+        }
+        writer.WriteEndObject();
+    }
+
+    /// <summary>
+    /// Logs the destination's last event through <paramref name="lastEvent"/>, then stops it.
+    /// False, without logging, when another call stopped it first.
+    /// </summary>
+    public bool Stop(Action lastEvent)
+    {
+        if (Interlocked.Exchange(ref _stopping, 1) != 0) return false;
+        lastEvent();
         _stopped = true;
+        return true;
     }
 
     public async Task FlushLoop(CancellationToken ct)
     {
         var interval = TimeSpan.FromMilliseconds(_flushIntervalMs);
         using var timer = new PeriodicTimer(interval);
+        using var drainCts = CancellationTokenSource.CreateLinkedTokenSource(ct);
+        var drainLoop = DrainLoop(drainCts.Token);
         try
         {
             while (await timer.WaitForNextTickAsync(ct))
@@ -913,6 +2061,7 @@ class LogDestination
                 }
 
                 await Flush(force: false, ct);
+                StartRetention();
             }
         }
         catch (OperationCanceledException)
@@ -921,13 +2070,44 @@ class LogDestination
         }
         finally
         {
+            drainCts.Cancel();
+            await drainLoop;
             await Flush(force: true, CancellationToken.None);
+            _spill?.Dispose();
+            _files?.Dispose();
+            await _retentionTask;
         }
     }
 
+    /// <summary>Runs retention in the background unless it ran recently or is still running.</summary>
+    private void StartRetention()
+    {
+        if (_retention == null || !_retentionTask.IsCompleted) return;
+        var now = Environment.TickCount64;
+        if (_lastRetention != 0 && now - _lastRetention < Math.Max(_flushIntervalMs, MinRetentionIntervalMillis)) return;
+        _lastRetention = now;
+        var inUse = _lastWritten;
+        _retentionTask = Task.Run(() =>
+        {
+            try
+            {
+                _retention.Enforce(inUse);
+            }
+            catch (Exception ex)
+            {
+                Console.Error.WriteLine($"Log retention in {_directory} failed: {ex.Message}");
+            }
+        });
+    }
+
     private async Task Flush(bool force, CancellationToken ct)
     {
-        if (_buffer.IsEmpty) return;
+        if (_rings.IsEmpty && _periods.IsEmpty && !HasCaptureGap && _spill?.HasBacklog != true)
+        {
+            _periods.Retire(DateTime.UtcNow, RetireGrace);
+            _files?.CloseUnused(Array.Empty<string>());
+            return;
+        }
 
         if (!force)
         {
@@ -950,72 +2130,229 @@ class LogDestination
             }
         }
 
-        var lines = new List<string>();
-        while (_buffer.TryDequeue(out var line))
+        // $REQ_ROT_013: One batch per period, each written to its own file
+        Drain();
+        var batches = _periods.Take();
+        var queuedBytes = 0L;
+        foreach (var (_, lines) in batches)
         {
-            lines.Add(line);
+            foreach (var line in lines)
+            {
+                queuedBytes += line.Length;
+            }
         }
 
-        if (lines.Count == 0) return;
+        var gap = TakeCaptureGap();
+        if (batches.Count == 0 && gap == null && _spill?.HasBacklog != true) return;
 
-        var text = string.Join("\n", lines) + "\n";
+        var files = new Dictionary<string, Stream>(StringComparer.Ordinal);
+        Stream StreamFor(string filename)
+        {
+            if (_directory == null) return _stdout;
+            if (_compressor != null)
+            {
+                filename += _compressor.Suffix;
+            }
+            if (!files.TryGetValue(filename, out var file))
+            {
+                // $REQ_LOG_014: Open-write-close per flush, unless files are kept open
+                file = _files != null
+                    ? _files.Open(filename)
+                    : new FileStream(Path.Combine(_directory, filename), FileMode.Append, FileAccess.Write, FileShare.Read, bufferSize: 64 * 1024, useAsync: true);
+                // $REQ_LOG_023: One compressed member per file and flush, ended when the flush disposes it
+                if (_compressor != null)
+                {
+                    file = _compressor.Wrap(file);
+                }
+                files.Add(filename, file);
+            }
+            return file;
+        }
 
-        if (_directory == null)
+        // $REQ_ROT_016: Chunks are whole records; with a size limit they may be split across sequence files
+        async Task Write(string filename, ReadOnlyMemory<byte> chunk)
         {
-            await Console.Out.WriteAsync(text);
-            await Console.Out.FlushAsync();
+            if (_rotation == null || _directory == null)
+            {
+                await WriteRecords(filename, chunk);
+                return;
+            }
+            while (chunk.Length > 0)
+            {
+                var (file, count) = _rotation.Take(filename, chunk.Span);
+                await WriteRecords(file, chunk[..count]);
+                chunk = chunk[count..];
+            }
         }
-        else
+
+        // $REQ_LOG_024: A binary file declares each connection before its first data or close record there
+        async Task WriteRecords(string file, ReadOnlyMemory<byte> chunk)
         {
-            var filename = FormatFilename(_filenameFormat);
-            var path = Path.Combine(_directory, filename);
-            await File.AppendAllTextAsync(path, text);
+            // $REQ_LOG_025: Every pcapng file starts a section before its first packets
+            if (_sections?.Begin(file) == true)
+            {
+                await StreamFor(file).WriteAsync(PcapngWriter.FileHeader);
+            }
+            if (_declarations == null)
+            {
+                await StreamFor(file).WriteAsync(chunk);
+                return;
+            }
+            while (true)
+            {
+                var (end, declare) = _declarations.Scan(file, chunk.Span);
+                await StreamFor(file).WriteAsync(chunk[..end]);
+                if (declare == null) break;
+                await StreamFor(file).WriteAsync(declare);
+                chunk = chunk[end..];
+            }
         }
 
+        try
+        {
+            if (_directory == null)
+            {
+                await _stdoutLock.WaitAsync(CancellationToken.None);
+                try
+                {
+                    await WriteBatch(Write, batches, gap, force);
+                    await _stdout.FlushAsync();
+                }
+                finally
+                {
+                    _stdoutLock.Release();
+                }
+            }
+            else
+            {
+                await WriteBatch(Write, batches, gap, force);
+            }
+        }
+        finally
+        {
+            foreach (var file in files.Values)
+            {
+                await file.DisposeAsync();
+            }
+            _files?.CloseUnused(files.Keys);
+            _rotation?.EndFlush();
+            _declarations?.EndFlush();
+            _sections?.EndFlush();
+            if (_directory != null)
+            {
+                _lastWritten = files.Keys.ToArray();
+            }
+            // Queued bytes count against the budget until written, since that is when their slabs can be reused
+            Unreserve(queuedBytes);
+            foreach (var (_, lines) in batches)
+            {
+                foreach (var line in lines)
+                {
+                    line.Release();
+                }
+            }
+            gap?.Release();
+        }
+
+        _periods.Retire(DateTime.UtcNow, RetireGrace);
         _lastFlushTime = DateTimeOffset.UtcNow;
     }
 
-    private static string FormatFilename(string format)
+    private TimeSpan RetireGrace => TimeSpan.FromMilliseconds(Math.Max(5000, 2 * _flushIntervalMs));
+
+    private bool HasCaptureGap
     {
-        var sb = new StringBuilder();
-        var literal = new StringBuilder();
+        get
+        {
+            lock (_gapLock)
+            {
+                return _gapEvents != 0;
+            }
+        }
+    }
+
+    /// <summary>
+    /// Writes queued events, then any spilled backlog, with the capture-gap event where
+    /// the drops happened: drop-oldest discarded events older than everything written
+    /// here, the other policies newer ones.
+    /// </summary>
+    private async Task WriteBatch(Func<string, ReadOnlyMemory<byte>, Task> write, List<(string Filename, List<LogLine> Lines)> batches, LogLine? gap, bool force)
+    {
+        // $REQ_LOG_020: Report what was lost where it was lost
+        var gapFirst = _options.OverflowPolicy == OverflowPolicy.DropOldest;
+        if (gap != null && gapFirst)
+        {
+            await WriteLines(write, _periods.FilenameFor(gap.Value.Time), new List<LogLine> { gap.Value });
+        }
+        foreach (var (filename, lines) in batches)
+        {
+            await WriteLines(write, filename, lines);
+        }
+        if (_spill != null)
+        {
+            // $REQ_LOG_021: Spilled events are newer than anything that was in memory;
+            // a final flush drains the whole backlog
+            await _spill.DrainAsync(chunk => WriteSpilled(write, chunk), force ? long.MaxValue : SpillDrainBytes);
+            _spill.TryDeactivate();
+        }
+        if (gap != null && !gapFirst)
+        {
+            await WriteLines(write, _periods.FilenameFor(gap.Value.Time), new List<LogLine> { gap.Value });
+        }
+    }
 
-        void FlushLiteral()
+    /// <summary>Writes whole spilled records, each run of records to the file of its period.</summary>
+    private async Task WriteSpilled(Func<string, ReadOnlyMemory<byte>, Task> write, ReadOnlyMemory<byte> chunk)
+    {
+        if (_directory == null)
         {
-            if (literal.Length == 0) return;
-            sb.Append('\'');
-            sb.Append(literal.ToString().Replace("'", "''"));
-            sb.Append('\'');
-            literal.Clear();
+            await write("", chunk);
+            return;
         }
 
-        for (int i = 0; i < format.Length; i++)
+        string? runFile = null;
+        int runStart = 0;
+        int position = 0;
+        while (position < chunk.Length)
         {
-            if (format[i] == '%' && i + 1 < format.Length)
+            var recordLength = LogFraming.FirstRecord(_options.Format, chunk.Span[position..]);
+            if (recordLength == 0)
             {
-                FlushLiteral();
-                i++;
-                sb.Append(format[i] switch
-                {
-                    'Y' => "yyyy",
-                    'm' => "MM",
-                    'd' => "dd",
-                    'H' => "HH",
-                    'M' => "mm",
-                    'S' => "ss",
-                    '%' => "'%'",
-                    _ => $"'{format[i]}'"
-                });
+                recordLength = chunk.Length - position;
             }
-            else
+            var filename = _periods.FilenameFor(LogFraming.TryReadTime(_options.Format, chunk.Span.Slice(position, recordLength), out var time) ? time : DateTimeOffset.UtcNow);
+            if (runFile != null && filename != runFile)
             {
-                literal.Append(format[i]);
+                await write(runFile, chunk[runStart..position]);
+                runStart = position;
             }
+            runFile = filename;
+            position += recordLength;
         }
+        if (runFile != null)
+        {
+            await write(runFile, chunk[runStart..position]);
+        }
+    }
 
-        FlushLiteral();
-
-        var now = DateTimeOffset.UtcNow;
-        return now.ToString(sb.ToString(), CultureInfo.InvariantCulture); // $REQ_ROT_002
+    private static async Task WriteLines(Func<string, ReadOnlyMemory<byte>, Task> write, string filename, List<LogLine> lines)
+    {
+        // Lines are already UTF-8 with their newline; write them straight from the
+        // arena, merging lines that sit back to back in the same slab
+        var start = lines[0];
+        var end = start.Offset + start.Length;
+        for (int i = 1; i < lines.Count; i++)
+        {
+            var line = lines[i];
+            if (line.Slab == start.Slab && line.Offset == end)
+            {
+                end += line.Length;
+                continue;
+            }
+            await write(filename, start.Slab.Buffer.AsMemory(start.Offset, end - start.Offset));
+            start = line;
+            end = line.Offset + line.Length;
+        }
+        await write(filename, start.Slab.Buffer.AsMemory(start.Offset, end - start.Offset));
     }
 }
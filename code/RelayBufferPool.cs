@@ -0,0 +1,120 @@
+using System;
+using System.Collections.Concurrent;
+using System.Numerics;
+using System.Text.Json;
+using System.Threading;
+
+/// <summary>
+/// Pool of relay buffers in power-of-two size classes (8 KB .. 256 KB).
+/// Connections rent a buffer only once data is ready to be read and return it
+/// right after the chunk has been forwarded and captured, so idle connections
+/// hold no buffer memory at all.
+/// </summary>
+class RelayBufferPool
+{
+    public const int MinBufferSize = 8 * 1024;
+    public const int MaxBufferSize = 256 * 1024;
+
+    private static readonly int _classCount = BitOperations.Log2(MaxBufferSize / MinBufferSize) + 1;
+
+    private readonly ConcurrentQueue<byte[]>[] _classes;
+    private readonly int[] _pooledCounts;
+    private readonly long _maxPooledBytes;
+    private long _pooledBytes;
+    private long _rents;
+    private long _hits;
+    private long _misses;
+    private long _discards;
+    private long _outstanding;
+    private long _outstandingBytes;
+
+    public RelayBufferPool(long maxPooledBytes)
+    {
+        _maxPooledBytes = maxPooledBytes;
+        _classes = new ConcurrentQueue<byte[]>[_classCount];
+        _pooledCounts = new int[_classCount];
+        for (int i = 0; i < _classCount; i++)
+        {
+            _classes[i] = new ConcurrentQueue<byte[]>();
+        }
+    }
+
+    public byte[] Rent(int size)
+    {
+        var index = ClassIndex(size);
+        Interlocked.Increment(ref _rents);
+
+        byte[]? buffer;
+        if (_classes[index].TryDequeue(out buffer))
+        {
+            Interlocked.Decrement(ref _pooledCounts[index]);
+            Interlocked.Add(ref _pooledBytes, -buffer.Length);
+            Interlocked.Increment(ref _hits);
+        }
+        else
+        {
+            buffer = GC.AllocateUninitializedArray<byte>(MinBufferSize << index);
+            Interlocked.Increment(ref _misses);
+        }
+
+        Interlocked.Increment(ref _outstanding);
+        Interlocked.Add(ref _outstandingBytes, buffer.Length);
+        return buffer;
+    }
+
+    public void Return(byte[] buffer)
+    {
+        Interlocked.Decrement(ref _outstanding);
+        Interlocked.Add(ref _outstandingBytes, -buffer.Length);
+
+        // Keep at most _maxPooledBytes of idle buffers; the rest go to the GC
+        if (Interlocked.Add(ref _pooledBytes, buffer.Length) > _maxPooledBytes)
+        {
+            Interlocked.Add(ref _pooledBytes, -buffer.Length);
+            Interlocked.Increment(ref _discards);
+            return;
+        }
+
+        var index = ClassIndex(buffer.Length);
+        Interlocked.Increment(ref _pooledCounts[index]);
+        _classes[index].Enqueue(buffer);
+    }
+
+    /// <summary>
+    /// Adaptive sizing: a read that filled the buffer means the peer is streaming
+    /// bulk data, so the next rent doubles; a read using a quarter or less halves it.
+    /// </summary>
+    public static int NextSize(int size, int read)
+    {
+        if (read == size && size < MaxBufferSize) return size * 2;
+        if (read <= size / 4 && size > MinBufferSize) return size / 2;
+        return size;
+    }
+
+    public void WriteStats(Utf8JsonWriter writer)
+    {
+        writer.WriteStartObject();
+        writer.WriteNumber("rents", Interlocked.Read(ref _rents));
+        writer.WriteNumber("hits", Interlocked.Read(ref _hits));
+        writer.WriteNumber("misses", Interlocked.Read(ref _misses));
+        writer.WriteNumber("discards", Interlocked.Read(ref _discards));
+        writer.WriteNumber("outstanding_buffers", Interlocked.Read(ref _outstanding));
+        writer.WriteNumber("outstanding_bytes", Interlocked.Read(ref _outstandingBytes));
+        writer.WriteNumber("pooled_bytes", Interlocked.Read(ref _pooledBytes));
+        writer.WritePropertyName("pooled_buffers");
+        writer.WriteStartObject();
+        for (int i = 0; i < _classCount; i++)
+        {
+            writer.WriteNumber(((MinBufferSize << i) / 1024).ToString() + "k", Volatile.Read(ref _pooledCounts[i]));
+        }
+        writer.WriteEndObject();
+        writer.WriteEndObject();
+    }
+
+    private static int ClassIndex(int size)
+    {
+        if (size <= MinBufferSize) return 0;
+        var index = BitOperations.Log2((uint)(size - 1) / MinBufferSize) + 1;
+        return Math.Min(index, _classCount - 1);
+    }
+}
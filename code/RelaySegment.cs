@@ -0,0 +1,106 @@
+using System;
+using System.Collections.Concurrent;
+using System.Threading;
+
+/// <summary>
+/// One chunk read from a connection, backed by a pooled relay buffer.
+/// Forwarding and capture each hold a reference; the buffer goes back to the
+/// pool when the last one is released, so capture never copies the bytes.
+/// </summary>
+sealed class RelaySegment
+{
+    private const int MaxFreeSegments = 4096;
+
+    private static readonly ConcurrentQueue<RelaySegment> _free = new();
+    private static int _freeCount;
+
+    private RelayBufferPool _pool = null!;
+    private int _refCount;
+
+    public byte[] Buffer { get; private set; } = Array.Empty<byte>();
+    public int Length { get; set; }
+    public DateTimeOffset Time { get; set; }
+    public bool FromClient { get; private set; }
+    /// <summary>Bytes of this direction forwarded before the segment.</summary>
+    public long StreamOffset { get; set; }
+    /// <summary>Bytes of the other direction forwarded when the segment was read.</summary>
+    public long PeerOffset { get; set; }
+    /// <summary>Bytes of the segment to capture, fewer than <see cref="Length"/> past the capture limit.</summary>
+    public int CaptureLength { get; set; }
+    /// <summary>Chunks merged into the segment by coalescing; 1 for a single read.</summary>
+    public int Chunks { get; private set; }
+    /// <summary>Time of the last merged chunk; <see cref="Time"/> is the first one's.</summary>
+    public DateTimeOffset LastTime { get; set; }
+
+    public ReadOnlySpan<byte> Captured => Buffer.AsSpan(0, CaptureLength);
+
+    public static RelaySegment Rent(RelayBufferPool pool, int size, bool fromClient)
+    {
+        if (_free.TryDequeue(out var segment))
+        {
+            Interlocked.Decrement(ref _freeCount);
+        }
+        else
+        {
+            segment = new RelaySegment();
+        }
+
+        segment._pool = pool;
+        segment._refCount = 1;
+        segment.Buffer = pool.Rent(size);
+        segment.Length = 0;
+        segment.FromClient = fromClient;
+        segment.Chunks = 1;
+        return segment;
+    }
+
+    /// <summary>
+    /// Appends the next chunk of the same direction for coalescing and returns the segment
+    /// holding both. The first append moves the bytes into a buffer of at least
+    /// <paramref name="capacity"/> bytes owned by the capture side, since the relay loop may
+    /// still be sending from the original one, and releases this segment.
+    /// </summary>
+    public RelaySegment Append(RelaySegment next, int capacity)
+    {
+        var merged = this;
+        if (Chunks == 1)
+        {
+            merged = Rent(_pool, capacity, FromClient);
+            Captured.CopyTo(merged.Buffer);
+            merged.Length = Length;
+            merged.CaptureLength = CaptureLength;
+            merged.Time = Time;
+            merged.StreamOffset = StreamOffset;
+            merged.PeerOffset = PeerOffset;
+            merged.Chunks = Chunks;
+            Release();
+        }
+        next.Captured.CopyTo(merged.Buffer.AsSpan(merged.CaptureLength));
+        merged.Length += next.Length;
+        merged.CaptureLength += next.CaptureLength;
+        merged.Chunks += next.Chunks;
+        merged.LastTime = next.Time;
+        return merged;
+    }
+
+    public void AddRef()
+    {
+        Interlocked.Increment(ref _refCount);
+    }
+
+    public void Release()
+    {
+        if (Interlocked.Decrement(ref _refCount) != 0) return;
+
+        _pool.Return(Buffer);
+        Buffer = Array.Empty<byte>();
+        if (Interlocked.Increment(ref _freeCount) <= MaxFreeSegments)
+        {
+            _free.Enqueue(this);
+        }
+        else
+        {
+            Interlocked.Decrement(ref _freeCount);
+        }
+    }
+}
@@ -0,0 +1,132 @@
+using System;
+using System.Net.Sockets;
+using System.Runtime.InteropServices;
+using System.Threading;
+using System.Threading.Tasks;
+
+/// <summary>
+/// Zero-copy relay for one direction of a connection on Linux: bytes move
+/// socket -> pipe -> socket with splice(2) and never enter managed memory.
+/// Used only while nothing needs to capture the traffic.
+/// </summary>
+sealed class SpliceRelay : IDisposable
+{
+    private const int MaxChunk = 256 * 1024;
+    private const uint SPLICE_F_MOVE = 1;
+    private const uint SPLICE_F_NONBLOCK = 2;
+    private const int O_NONBLOCK = 0x800;
+    private const int O_CLOEXEC = 0x80000;
+    private const int EAGAIN = 11;
+    private const int EINTR = 4;
+
+    private static long _splicedBytes;
+    private static long _copiedBytes;
+
+    private readonly int _pipeRead;
+    private readonly int _pipeWrite;
+
+    public static long SplicedBytes => Interlocked.Read(ref _splicedBytes);
+    public static long CopiedBytes => Interlocked.Read(ref _copiedBytes);
+
+    public SpliceRelay()
+    {
+        var fds = new int[2];
+        if (pipe2(fds, O_NONBLOCK | O_CLOEXEC) != 0)
+        {
+            throw new SocketException(Marshal.GetLastWin32Error());
+        }
+        _pipeRead = fds[0];
+        _pipeWrite = fds[1];
+    }
+
+    /// <summary>
+    /// Moves whatever the source socket has ready to the destination.
+    /// Returns the byte count, 0 at end of stream, or -1 if nothing was ready.
+    /// </summary>
+    public async ValueTask<long> RelayAsync(Socket from, Socket to, NetworkStream toStream, RelayBufferPool pool, CancellationToken ct)
+    {
+        long moved = splice((int)from.SafeHandle.DangerousGetHandle(), IntPtr.Zero, _pipeWrite, IntPtr.Zero, MaxChunk, SPLICE_F_MOVE | SPLICE_F_NONBLOCK);
+        if (moved < 0)
+        {
+            var errno = Marshal.GetLastWin32Error();
+            if (errno == EAGAIN || errno == EINTR) return -1;
+            throw new SocketException(errno);
+        }
+        if (moved == 0) return 0;
+
+        var remaining = moved;
+        // Bytes the second splice wrote; the rest are counted as copied
+        var spliced = 0L;
+        while (remaining > 0)
+        {
+            long written = splice(_pipeRead, IntPtr.Zero, (int)to.SafeHandle.DangerousGetHandle(), IntPtr.Zero, (nuint)remaining, SPLICE_F_MOVE | SPLICE_F_NONBLOCK);
+            if (written > 0)
+            {
+                remaining -= written;
+                spliced += written;
+                continue;
+            }
+
+            var errno = Marshal.GetLastWin32Error();
+            if (written < 0 && errno == EINTR) continue;
+            if (written < 0 && errno != EAGAIN) throw new SocketException(errno);
+
+            // Destination send buffer is full: drain the pipe through a pooled
+            // buffer and let the async socket write wait for the peer
+            await CopyOutAsync(toStream, remaining, pool, ct);
+            remaining = 0;
+        }
+
+        Interlocked.Add(ref _splicedBytes, spliced);
+        return moved;
+    }
+
+    private async ValueTask CopyOutAsync(NetworkStream toStream, long remaining, RelayBufferPool pool, CancellationToken ct)
+    {
+        var buffer = pool.Rent(RelayBufferPool.MaxBufferSize);
+        try
+        {
+            while (remaining > 0)
+            {
+                var count = ReadPipe(buffer, (int)Math.Min(remaining, buffer.Length));
+                await toStream.WriteAsync(buffer.AsMemory(0, count), ct);
+                remaining -= count;
+                Interlocked.Add(ref _copiedBytes, count);
+            }
+        }
+        finally
+        {
+            pool.Return(buffer);
+        }
+    }
+
+    private int ReadPipe(byte[] buffer, int count)
+    {
+        while (true)
+        {
+            var n = read(_pipeRead, buffer, (nuint)count);
+            if (n > 0) return (int)n;
+            var errno = Marshal.GetLastWin32Error();
+            if (n < 0 && errno == EINTR) continue;
+            throw new SocketException(errno);
+        }
+    }
+
+    public void Dispose()
+    {
+        close(_pipeRead);
+        close(_pipeWrite);
+    }
+
+    [DllImport("libc", SetLastError = true)]
+    private static extern nint splice(int fdIn, IntPtr offIn, int fdOut, IntPtr offOut, nuint len, uint flags);
+
+    [DllImport("libc", SetLastError = true)]
+    private static extern int pipe2(int[] fds, int flags);
+
+    [DllImport("libc", SetLastError = true)]
+    private static extern nint read(int fd, byte[] buf, nuint count);
+
+    [DllImport("libc", SetLastError = true)]
+    private static extern int close(int fd);
+}
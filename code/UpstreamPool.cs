@@ -0,0 +1,188 @@
+using System;
+using System.Collections.Concurrent;
+using System.Net.Sockets;
+using System.Text.Json;
+using System.Threading;
+using System.Threading.Tasks;
+
+/// <summary>
+/// Pre-connected upstream sockets for one port rule, so an accepted client can be
+/// paired without waiting for a handshake. The pool keeps at least <c>min</c> idle
+/// connections, grows toward <c>max</c> after misses, and shrinks back as idle
+/// connections age out. A connection is checked for liveness before it is handed out.
+/// </summary>
+sealed class UpstreamPool : IDisposable
+{
+    private const int RetryDelayMillis = 1000;
+    private const int SweepMillis = 1000;
+
+    private readonly ConcurrentQueue<(TcpClient Client, long ConnectedAt)> _idle = new();
+    private readonly Func<CancellationToken, Task<TcpClient>> _connect;
+    private readonly CancellationTokenSource _cts;
+    private readonly SemaphoreSlim _refill = new(0);
+    private int _idleCount;
+    private int _warmTarget;
+    private long _hits;
+    private long _misses;
+    private long _expired;
+    private long _dead;
+    private long _connectFailures;
+
+    public int Min { get; }
+    public int Max { get; }
+    public int MaxIdleMillis { get; }
+
+    public UpstreamPool(int min, int max, int maxIdleMillis, Func<CancellationToken, Task<TcpClient>> connect, CancellationToken ct)
+    {
+        Min = min;
+        Max = max;
+        MaxIdleMillis = maxIdleMillis;
+        _warmTarget = min;
+        _connect = connect;
+        _cts = CancellationTokenSource.CreateLinkedTokenSource(ct);
+        _ = Task.Run(RefillLoop);
+    }
+
+    public bool TryTake(out TcpClient client)
+    {
+        var now = Environment.TickCount64;
+        while (_idle.TryDequeue(out var entry))
+        {
+            Interlocked.Decrement(ref _idleCount);
+            if (now - entry.ConnectedAt > MaxIdleMillis)
+            {
+                Interlocked.Increment(ref _expired);
+                entry.Client.Dispose();
+                continue;
+            }
+            if (!IsAlive(entry.Client.Client))
+            {
+                Interlocked.Increment(ref _dead);
+                entry.Client.Dispose();
+                continue;
+            }
+
+            Interlocked.Increment(ref _hits);
+            _refill.Release();
+            client = entry.Client;
+            return true;
+        }
+
+        // Demand outran the pool: keep more connections warm, up to max
+        Interlocked.Increment(ref _misses);
+        int target;
+        while ((target = Volatile.Read(ref _warmTarget)) < Max &&
+               Interlocked.CompareExchange(ref _warmTarget, target + 1, target) != target)
+        {
+        }
+        _refill.Release();
+        client = null!;
+        return false;
+    }
+
+    public void WriteStats(Utf8JsonWriter writer)
+    {
+        writer.WriteStartObject();
+        writer.WriteNumber("min", Min);
+        writer.WriteNumber("max", Max);
+        writer.WriteNumber("max_idle_millis", MaxIdleMillis);
+        writer.WriteNumber("warm_target", Volatile.Read(ref _warmTarget));
+        writer.WriteNumber("idle", Volatile.Read(ref _idleCount));
+        writer.WriteNumber("hits", Interlocked.Read(ref _hits));
+        writer.WriteNumber("misses", Interlocked.Read(ref _misses));
+        writer.WriteNumber("expired", Interlocked.Read(ref _expired));
+        writer.WriteNumber("dead", Interlocked.Read(ref _dead));
+        writer.WriteNumber("connect_failures", Interlocked.Read(ref _connectFailures));
+        writer.WriteEndObject();
+    }
+
+    public void Dispose()
+    {
+        _cts.Cancel();
+        while (_idle.TryDequeue(out var entry))
+        {
+            Interlocked.Decrement(ref _idleCount);
+            entry.Client.Dispose();
+        }
+    }
+
+    private static bool IsAlive(Socket socket)
+    {
+        // Readable with nothing to read means the upstream closed or reset the idle connection
+        try
+        {
+            return !(socket.Poll(0, SelectMode.SelectRead) && socket.Available == 0);
+        }
+        catch
+        {
+            return false;
+        }
+    }
+
+    private async Task RefillLoop()
+    {
+        var ct = _cts.Token;
+        while (!ct.IsCancellationRequested)
+        {
+            try
+            {
+                Sweep();
+                while (Volatile.Read(ref _idleCount) < Volatile.Read(ref _warmTarget) && !ct.IsCancellationRequested)
+                {
+                    TcpClient client;
+                    try
+                    {
+                        client = await _connect(ct);
+                    }
+                    catch when (!ct.IsCancellationRequested)
+                    {
+                        Interlocked.Increment(ref _connectFailures);
+                        await Task.Delay(RetryDelayMillis, ct);
+                        continue;
+                    }
+
+                    _idle.Enqueue((client, Environment.TickCount64));
+                    Interlocked.Increment(ref _idleCount);
+                }
+
+                await _refill.WaitAsync(SweepMillis, ct);
+            }
+            catch when (ct.IsCancellationRequested)
+            {
+                break;
+            }
+        }
+
+        Dispose();
+    }
+
+    private void Sweep()
+    {
+        // Close connections that sat idle too long or died, and let the warm target decay toward min
+        var now = Environment.TickCount64;
+        for (int i = Volatile.Read(ref _idleCount); i > 0 && _idle.TryDequeue(out var entry); i--)
+        {
+            Interlocked.Decrement(ref _idleCount);
+            if (now - entry.ConnectedAt > MaxIdleMillis)
+            {
+                Interlocked.Increment(ref _expired);
+                entry.Client.Dispose();
+                int target;
+                while ((target = Volatile.Read(ref _warmTarget)) > Min &&
+                       Interlocked.CompareExchange(ref _warmTarget, target - 1, target) != target)
+                {
+                }
+            }
+            else if (!IsAlive(entry.Client.Client))
+            {
+                Interlocked.Increment(ref _dead);
+                entry.Client.Dispose();
+            }
+            else
+            {
+                _idle.Enqueue(entry);
+                Interlocked.Increment(ref _idleCount);
+            }
+        }
+    }
+}
@@ -150,6 +150,47 @@ def main():
         process.wait(timeout=5)
         processes.remove(process)
 
+        # $REQ_CMD_017: --listeners option (SO_REUSEPORT, Linux only)
+        if sys.platform.startswith('linux'):
+            local_port = find_free_port()
+            process = subprocess.Popen(['./release/rawprox.exe',
+                                       '--listeners', '4',
+                                       f'{local_port}:example.com:80'],
+                                       stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       text=True, encoding='utf-8')
+            processes.append(process)
+            time.sleep(2)
+            assert process.poll() is None, "Process should accept --listeners"  # $REQ_CMD_017
+            for _ in range(8):
+                with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+                    assert sock.connect_ex(('127.0.0.1', local_port)) == 0, "Sharded listeners should accept connections"  # $REQ_CMD_017
+            print(f"✓ $REQ_CMD_017: --listeners option accepted, connections accepted on all shards")
+
+            process.kill()
+            process.wait(timeout=5)
+            processes.remove(process)
+
+            # A second rule on the same port is rejected even though SO_REUSEPORT would bind it
+            local_port = find_free_port()
+            result = subprocess.run(['./release/rawprox.exe',
+                                     '--listeners', '4',
+                                     f'{local_port}:example.com:80',
+                                     f'{local_port}:example.com:81'],
+                                    capture_output=True, text=True, encoding='utf-8', timeout=10)
+            assert result.returncode != 0, "A duplicate port rule with --listeners should fail"  # $REQ_CMD_017
+            assert 'already in use' in result.stderr, "Error should report the port as in use"  # $REQ_CMD_017
+            print("✓ $REQ_CMD_017: Duplicate port rule with --listeners shows port in use error")
+
+        # $REQ_CMD_018: spill overflow policy requires --spill-dir
+        local_port = find_free_port()
+        result = subprocess.run(['./release/rawprox.exe',
+                                 '--overflow-policy', 'spill',
+                                 f'{local_port}:example.com:80'],
+                                capture_output=True, text=True, encoding='utf-8', timeout=5)
+        assert result.returncode != 0, "--overflow-policy spill without --spill-dir should fail"  # $REQ_CMD_018
+        assert '--spill-dir' in result.stderr, "Error should name the missing --spill-dir"  # $REQ_CMD_018
+        print("✓ $REQ_CMD_018: --overflow-policy spill without --spill-dir shows error on STDERR")
+
         # $REQ_CMD_016: --filename-format requires @DIRECTORY
         local_port = find_free_port()
         result = subprocess.run(['./release/rawprox.exe',
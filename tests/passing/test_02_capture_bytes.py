@@ -0,0 +1,233 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#   "requests",
+# ]
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import urllib.parse
+import requests
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def exchange(client, message):
+    client.sendall(message)
+    received = b''
+    while len(received) < len(message):
+        received += client.recv(65536)
+    time.sleep(0.05)
+
+def call_tool(endpoint, name, arguments=None):
+    response = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments or {}}
+    }, timeout=10)
+    result = response.json()
+    assert 'error' not in result, f"{name} failed: {result.get('error')}"
+    return result['result']
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait(timeout=5)
+
+def read_events(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def run_connection(local_port, messages):
+    client = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+    for message in messages:
+        exchange(client, message)
+    client.close()
+
+def captured(events, opened, from_client):
+    """Data events of one direction: the bytes they hold and the events themselves."""
+    data = [e for e in events if e.get('ConnID') == opened['ConnID'] and 'data' in e
+            and (e['from'] == opened['from']) == from_client]
+    return b''.join(urllib.parse.unquote_to_bytes(e['data']) for e in data), data
+
+def connection(events, local_port):
+    opened = [e for e in events if e.get('event') == 'open' and e['listen_port'] == local_port]
+    assert len(opened) == 1, f"Expected one connection on {local_port}"
+    conn_id = opened[0]['ConnID']
+    close = [e for e in events if e.get('ConnID') == conn_id and e.get('event') == 'close']
+    assert len(close) == 1, "Expected one close event"
+    return opened[0], close[0]
+
+def main():
+    """Test the per-rule capture_bytes limit and the totals on close events."""
+
+    processes = []
+    log_dir = os.path.abspath("./tmp/test_capture_bytes")
+    target = start_echo_target()
+    target_port = target.getsockname()[1]
+
+    try:
+        if os.path.exists(log_dir):
+            shutil.rmtree(log_dir)
+
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', '--mcp-port', '0', '--flush-millis', '200'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        processes.append(process)
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+
+        capped_port = find_free_port()
+        plain_port = find_free_port()
+        call_tool(endpoint, 'add-port-rule', {
+            'local_port': capped_port, 'target_host': '127.0.0.1', 'target_port': target_port, 'capture_bytes': 1000
+        })
+        call_tool(endpoint, 'add-port-rule', {
+            'local_port': plain_port, 'target_host': '127.0.0.1', 'target_port': target_port
+        })
+        result = requests.post(endpoint, json={
+            'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+            'params': {'name': 'add-port-rule', 'arguments': {
+                'local_port': find_free_port(), 'target_host': '127.0.0.1', 'target_port': target_port, 'capture_bytes': -1}}
+        }, timeout=10).json()
+        assert 'error' in result or result['result'].get('isError'), "A negative capture_bytes should be rejected"  # $REQ_SIMPLE_028
+        call_tool(endpoint, 'start-logging', {'directory': os.path.join(log_dir, 'ndjson'), 'filename_format': 'rawprox.ndjson'})
+        call_tool(endpoint, 'start-logging', {'directory': os.path.join(log_dir, 'binary'), 'filename_format': 'rawprox.rpx', 'log_format': 'binary'})
+
+        messages = [b'a' * 600, b'b' * 600, os.urandom(3000)]
+        sent = b''.join(messages)
+        run_connection(capped_port, messages)
+        run_connection(plain_port, messages)
+        time.sleep(0.6)
+        stop(process)
+
+        events = read_events(os.path.join(log_dir, 'ndjson', 'rawprox.ndjson'))
+        opened, close = connection(events, capped_port)
+        for from_client in (True, False):
+            data, data_events = captured(events, opened, from_client)
+            assert data == sent[:1000], f"Each direction should capture exactly its first 1000 bytes, got {len(data)}"  # $REQ_SIMPLE_028
+            assert 'truncated' in data_events[-1], "The event crossing the limit should be marked truncated"  # $REQ_SIMPLE_028
+            assert all('truncated' not in e for e in data_events[:-1]), "Events within the limit are whole"  # $REQ_SIMPLE_028
+        print("✓ $REQ_SIMPLE_028: capture_bytes stops data events after the first N bytes of each direction")
+
+        assert close['bytes_from_client'] == len(sent) and close['bytes_from_target'] == len(sent), \
+            f"Totals should count uncaptured traffic, got {close}"  # $REQ_SIMPLE_029
+        assert close['chunks_from_client'] >= 3 and close['chunks_from_target'] >= 3, "Chunks should be counted"  # $REQ_SIMPLE_029
+        assert 0 <= close['duration_ms'] < 10000, "Duration should be in milliseconds"  # $REQ_SIMPLE_029
+        keys = list(close.keys())
+        assert keys[:7] == ['time', 'ConnID', 'event', 'from', 'to', 'listener', 'bytes_from_client'], f"Totals should follow the endpoints, got {keys}"  # $REQ_SIMPLE_029
+
+        opened, close = connection(events, plain_port)
+        for from_client, total, chunks in ((True, 'bytes_from_client', 'chunks_from_client'), (False, 'bytes_from_target', 'chunks_from_target')):
+            data, data_events = captured(events, opened, from_client)
+            assert data == sent, "A rule without capture_bytes should capture everything"  # $REQ_SIMPLE_028
+            assert close[total] == len(sent) and close[chunks] == len(data_events), \
+                f"Uncapped totals should match the data events, got {close}"  # $REQ_SIMPLE_029
+        print("✓ $REQ_SIMPLE_029: close events carry bytes, chunks and duration per connection")
+
+        decoded = subprocess.run(['./release/rawprox.exe', '--decode', os.path.join(log_dir, 'binary', 'rawprox.rpx')],
+                                 capture_output=True, text=True, encoding='utf-8', timeout=30)
+        assert decoded.returncode == 0, f"--decode failed: {decoded.stderr}"
+        binary_closes = [json.loads(line) for line in decoded.stdout.splitlines() if '"close"' in line]
+        ndjson_closes = [e for e in events if e.get('event') == 'close']
+        assert binary_closes == ndjson_closes, "Binary close records should decode to the same totals"  # $REQ_SIMPLE_029
+        print("✓ $REQ_SIMPLE_029: binary close records keep the totals")
+
+        # Command-line default for the rules given there
+        cli_dir = os.path.join(log_dir, 'cli')
+        local_port = find_free_port()
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', f'{local_port}:127.0.0.1:{target_port}', f'@{cli_dir}',
+             '--filename-format', 'rawprox.ndjson', '--flush-millis', '200', '--capture-bytes', '10'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        processes.append(process)
+        time.sleep(0.5)
+        run_connection(local_port, [b'0123456789abcdef', b'ghijkl'])
+        time.sleep(0.6)
+        stop(process)
+        events = read_events(os.path.join(cli_dir, 'rawprox.ndjson'))
+        opened, close = connection(events, local_port)
+        data, data_events = captured(events, opened, True)
+        assert data == b'0123456789' and data_events[0]['truncated'] == 16, "--capture-bytes should apply to command-line rules"  # $REQ_SIMPLE_028
+        assert close['bytes_from_client'] == 22, "The close event should count past the limit"  # $REQ_SIMPLE_029
+
+        result = subprocess.run(['./release/rawprox.exe', '--capture-bytes', '-1', '8080:example.com:80'],
+                                capture_output=True, text=True, timeout=10)
+        assert result.returncode != 0 and 'capture-bytes' in result.stderr, "A negative limit should be an error"  # $REQ_SIMPLE_028
+        print("✓ $REQ_SIMPLE_028: --capture-bytes sets the limit for command-line rules")
+
+        print("\n✓ All capture byte limit tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait(timeout=5)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#   "requests",
+# ]
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import urllib.parse
+import requests
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def exchange(client, message):
+    client.sendall(message)
+    received = b''
+    while len(received) < len(message):
+        received += client.recv(65536)
+    time.sleep(0.05)
+
+def call_tool(endpoint, name, arguments=None):
+    response = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments or {}}
+    }, timeout=10)
+    result = response.json()
+    assert 'error' not in result, f"{name} failed: {result.get('error')}"
+    return result['result']
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait(timeout=5)
+
+def read_events(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def run_connection(local_port, messages):
+    client = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+    for message in messages:
+        exchange(client, message)
+    client.close()
+
+def tool_error(endpoint, name, arguments):
+    result = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments}
+    }, timeout=10).json()
+    return 'error' in result or result['result'].get('isError', False)
+
+def by_port(events, local_port):
+    """Events of the connections to one port rule, found by their open events."""
+    conn_ids = {e['ConnID'] for e in events if e.get('event') == 'open' and e['listen_port'] == local_port}
+    return [e for e in events if e.get('ConnID') in conn_ids]
+
+def main():
+    """Test per-rule capture levels, set-capture and progress events."""
+
+    processes = []
+    log_dir = os.path.abspath("./tmp/test_capture_levels")
+    target = start_echo_target()
+    target_port = target.getsockname()[1]
+
+    try:
+        if os.path.exists(log_dir):
+            shutil.rmtree(log_dir)
+
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', '--mcp-port', '0', '--flush-millis', '200', '--progress-millis', '200'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        processes.append(process)
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+
+        full_port, metadata_port, off_port, switch_port = find_free_port(), find_free_port(), find_free_port(), find_free_port()
+        for port, capture in ((full_port, None), (metadata_port, 'metadata'), (off_port, 'off'), (switch_port, None)):
+            arguments = {'local_port': port, 'target_host': '127.0.0.1', 'target_port': target_port}
+            if capture:
+                arguments['capture'] = capture
+            call_tool(endpoint, 'add-port-rule', arguments)
+        assert tool_error(endpoint, 'add-port-rule', {
+            'local_port': find_free_port(), 'target_host': '127.0.0.1', 'target_port': target_port, 'capture': 'some'
+        }), "An unknown capture level should be rejected"  # $REQ_SIMPLE_030
+        call_tool(endpoint, 'start-logging', {'directory': log_dir, 'filename_format': 'rawprox.ndjson'})
+
+        # Metadata: counters over time, no payloads
+        client = socket.create_connection(('127.0.0.1', metadata_port), timeout=5)
+        exchange(client, b'x' * 1000)
+        time.sleep(0.5)
+        exchange(client, b'y' * 3000)
+        time.sleep(0.5)
+        client.close()
+
+        run_connection(off_port, [b'hidden'])
+
+        # Full, switched to metadata and back while the connection is open
+        client = socket.create_connection(('127.0.0.1', full_port), timeout=5)
+        exchange(client, b'first')
+        call_tool(endpoint, 'set-capture', {'local_port': full_port, 'capture': 'metadata'})
+        exchange(client, b'second')
+        call_tool(endpoint, 'set-capture', {'local_port': full_port, 'capture': 'full'})
+        exchange(client, b'third')
+        client.close()
+
+        # Accepted while off, switched to full: stays unlogged, close included
+        client = socket.create_connection(('127.0.0.1', off_port), timeout=5)
+        exchange(client, b'opened-while-off')
+        call_tool(endpoint, 'set-capture', {'local_port': off_port, 'capture': 'full'})
+        exchange(client, b'sent-after-full')
+        client.close()
+        time.sleep(0.3)
+        call_tool(endpoint, 'set-capture', {'local_port': off_port, 'capture': 'off'})
+
+        # Accepted while full, switched to off: its open still gets a close
+        client = socket.create_connection(('127.0.0.1', switch_port), timeout=5)
+        exchange(client, b'opened-while-full')
+        call_tool(endpoint, 'set-capture', {'local_port': switch_port, 'capture': 'off'})
+        exchange(client, b'sent-after-off')
+        client.close()
+        time.sleep(0.6)
+
+        assert tool_error(endpoint, 'set-capture', {'local_port': find_free_port(), 'capture': 'off'}), \
+            "set-capture on an unknown port should fail"  # $REQ_MCP_041
+        assert tool_error(endpoint, 'set-capture', {'local_port': full_port, 'capture': 'everything'}), \
+            "set-capture with an unknown level should fail"  # $REQ_MCP_041
+        stats = json.loads(call_tool(endpoint, 'get-stats')['content'][0]['text'])
+        assert stats['capture'][str(metadata_port)]['level'] == 'metadata', "Stats should report capture levels"  # $REQ_MCP_041
+        assert stats['capture'][str(off_port)]['level'] == 'off', "Stats should report capture levels"  # $REQ_MCP_041
+        stop(process)
+
+        events = read_events(os.path.join(log_dir, 'rawprox.ndjson'))
+        metadata = by_port(events, metadata_port)
+        kinds = [e.get('event', 'data') for e in metadata]
+        assert kinds[0] == 'open' and kinds[-1] == 'close', f"Metadata rules keep open and close events, got {kinds}"  # $REQ_SIMPLE_030
+        assert 'data' not in kinds, "Metadata rules should log no payloads"  # $REQ_SIMPLE_030
+        assert all('hidden' not in json.dumps(e) for e in events), "Off rules should log nothing"  # $REQ_SIMPLE_030
+        assert not any(e.get('event') == 'open' and e['listen_port'] == off_port for e in events), "Off rules should have no open events"  # $REQ_SIMPLE_030
+        print("✓ $REQ_SIMPLE_030: metadata rules log open and close only, off rules log nothing")
+
+        progress = [e for e in metadata if e.get('event') == 'progress']
+        assert len(progress) >= 2, f"Expected progress events while the connection was active, got {len(progress)}"  # $REQ_SIMPLE_031
+        # A tick may see the client's bytes before their echo: the pair, not each side, changes
+        counts = [(e['bytes_from_client'], e['bytes_from_target']) for e in progress]
+        assert counts == sorted(counts) and len(set(counts)) == len(counts), f"Progress events should only follow new traffic, got {counts}"  # $REQ_SIMPLE_031
+        assert progress[0]['bytes_from_client'] == 1000 and progress[-1]['bytes_from_target'] == 4000, \
+            f"Progress should count the bytes so far, got {progress}"  # $REQ_SIMPLE_031
+        assert list(progress[0].keys())[:4] == ['time', 'ConnID', 'event', 'bytes_from_client'], "Progress events carry the counters"  # $REQ_SIMPLE_031
+        close = metadata[-1]
+        assert close['bytes_from_client'] == 4000 and close['bytes_from_target'] == 4000, "Close totals should cover metadata connections"  # $REQ_SIMPLE_029
+        print("✓ $REQ_SIMPLE_031: metadata connections get progress events with their counters")
+
+        full = by_port(events, full_port)
+        data = [urllib.parse.unquote_to_bytes(e['data']) for e in full if 'data' in e]
+        assert data == [b'first', b'first', b'third', b'third'], f"set-capture should apply from the next chunk, got {data}"  # $REQ_MCP_041
+        assert not any(e.get('event') == 'progress' for e in full), "Full rules get no progress events"  # $REQ_SIMPLE_031
+        assert full[-1]['bytes_from_client'] == 16, "Totals should count chunks of every level"  # $REQ_SIMPLE_029
+        print("✓ $REQ_MCP_041: set-capture changes the level of open connections")
+
+        opened = {e['ConnID'] for e in events if e.get('event') == 'open'}
+        orphans = [e for e in events if 'ConnID' in e and e['ConnID'] not in opened]
+        assert not orphans, f"No events without an open event for their ConnID, got {orphans}"  # $REQ_MCP_041
+        assert all('sent-after-full' not in json.dumps(e) for e in events), "Connections accepted while off should stay unlogged"  # $REQ_MCP_041
+        kinds = [e.get('event', 'data') for e in by_port(events, switch_port)]
+        assert kinds == ['open', 'data', 'data', 'close'], f"A logged open should always get its close, got {kinds}"  # $REQ_MCP_041
+        print("✓ $REQ_MCP_041: set-capture never leaves a close without an open, or an open without a close")
+
+        # Command-line default for the rules given there
+        cli_dir = os.path.join(log_dir, 'cli')
+        local_port = find_free_port()
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', f'{local_port}:127.0.0.1:{target_port}', f'@{cli_dir}',
+             '--filename-format', 'rawprox.ndjson', '--flush-millis', '200', '--capture', 'metadata'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        processes.append(process)
+        time.sleep(0.5)
+        run_connection(local_port, [b'payload'])
+        time.sleep(0.6)
+        stop(process)
+        kinds = [e.get('event', 'data') for e in by_port(read_events(os.path.join(cli_dir, 'rawprox.ndjson')), local_port)]
+        assert kinds == ['open', 'close'], f"--capture metadata should apply to command-line rules, got {kinds}"  # $REQ_SIMPLE_030
+
+        result = subprocess.run(['./release/rawprox.exe', '--capture', 'some', '8080:example.com:80'],
+                                capture_output=True, text=True, timeout=10)
+        assert result.returncode != 0 and '--capture' in result.stderr, "An unknown level should be an error"  # $REQ_SIMPLE_030
+        print("✓ $REQ_SIMPLE_030: --capture sets the level for command-line rules")
+
+        print("\n✓ All capture level tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait(timeout=5)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,172 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = []
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import urllib.parse
+
+CONNECTIONS = 4
+PAYLOAD_BYTES = 1024 * 1024
+CHUNK_BYTES = 16 * 1024
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def transfer(local_port, payload, results, index):
+    """Send payload in chunks while reading the echo back, then close."""
+    client = socket.create_connection(('127.0.0.1', local_port), timeout=10)
+
+    def send():
+        for offset in range(0, len(payload), CHUNK_BYTES):
+            client.sendall(payload[offset:offset + CHUNK_BYTES])
+
+    sender = threading.Thread(target=send, daemon=True)
+    sender.start()
+    received = bytearray()
+    while len(received) < len(payload):
+        chunk = client.recv(65536)
+        if not chunk:
+            break
+        received += chunk
+    sender.join(timeout=10)
+    client.close()
+    results[index] = bytes(received)
+
+def read_events(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.endswith('\n')]
+
+def main():
+    """Test that capture running beside forwarding logs every byte in order, before the close event."""
+
+    process = None
+    log_dir = os.path.abspath("./tmp/test_capture_order")
+    log_file = os.path.join(log_dir, 'rawprox.ndjson')
+    target = start_echo_target()
+    target_port = target.getsockname()[1]
+
+    try:
+        if os.path.exists(log_dir):
+            shutil.rmtree(log_dir)
+
+        local_port = find_free_port()
+        # Frequent small flushes keep the destination busy while the relays run ahead
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', f'{local_port}:127.0.0.1:{target_port}', f'@{log_dir}',
+             '--filename-format', 'rawprox.ndjson', '--flush-millis', '20'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        time.sleep(0.5)
+        assert process.poll() is None, "Process failed to start"
+
+        payloads = [bytes((i * 7 + n) % 256 for n in range(PAYLOAD_BYTES)) for i in range(CONNECTIONS)]
+        results = [None] * CONNECTIONS
+        threads = [threading.Thread(target=transfer, args=(local_port, payloads[i], results, i)) for i in range(CONNECTIONS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=30)
+        for i in range(CONNECTIONS):
+            assert results[i] == payloads[i], f"Connection {i} should get its payload back unchanged"  # $REQ_SIMPLE_036
+
+        deadline = time.monotonic() + 15
+        events = []
+        while time.monotonic() < deadline:
+            events = read_events(log_file)
+            if sum(1 for e in events if e.get('event') == 'close') == CONNECTIONS:
+                break
+            time.sleep(0.2)
+        process.terminate()
+        process.wait(timeout=5)
+
+        opens = [e for e in events if e.get('event') == 'open']
+        assert len(opens) == CONNECTIONS, f"Expected {CONNECTIONS} open events, got {len(opens)}"
+        logged = set()
+        for open_event in opens:
+            conn_id = open_event['ConnID']
+            client = open_event['from']
+            positions = [i for i, e in enumerate(events) if e.get('ConnID') == conn_id]
+            conn_events = [events[i] for i in positions]
+            kinds = [e.get('event', 'data') for e in conn_events]
+            assert kinds[0] == 'open' and kinds.count('close') == 1 and kinds[-1] == 'close', \
+                f"ConnID {conn_id}: close should come after its last data event"  # $REQ_SIMPLE_036
+            from_client = b''.join(urllib.parse.unquote_to_bytes(e['data']) for e in conn_events if 'data' in e and e['from'] == client)
+            from_target = b''.join(urllib.parse.unquote_to_bytes(e['data']) for e in conn_events if 'data' in e and e['to'] == client)
+            assert from_client == from_target, f"ConnID {conn_id}: both directions should log the echoed bytes in order"  # $REQ_SIMPLE_036
+            assert from_client in payloads, f"ConnID {conn_id}: every byte should be logged in the order it was sent"  # $REQ_SIMPLE_036
+            logged.add(from_client)
+            chunks = sum(1 for e in conn_events if 'data' in e)
+            assert chunks > 2, f"ConnID {conn_id}: expected a multi-chunk transfer, got {chunks} data events"
+        assert len(logged) == CONNECTIONS, "Each connection's payload should be logged under its own ConnID"  # $REQ_SIMPLE_036
+        print(f"✓ $REQ_SIMPLE_036: {CONNECTIONS} concurrent {PAYLOAD_BYTES}-byte transfers logged byte for byte, in order, before their close events")
+
+        print("\n✓ All capture order tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        if process and process.poll() is None:
+            process.kill()
+            process.wait(timeout=5)
+
+if __name__ == '__main__':
+    sys.exit(main())
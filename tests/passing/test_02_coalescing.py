@@ -0,0 +1,256 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#   "requests",
+# ]
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import urllib.parse
+import requests
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def start_sink_target():
+    """Start a TCP server on localhost that reads and discards everything."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def drain(conn):
+        try:
+            while conn.recv(65536):
+                pass
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=drain, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def exchange(client, message):
+    client.sendall(message)
+    received = b''
+    while len(received) < len(message):
+        received += client.recv(65536)
+    time.sleep(0.05)
+
+def call_tool(endpoint, name, arguments=None):
+    response = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments or {}}
+    }, timeout=10)
+    result = response.json()
+    assert 'error' not in result, f"{name} failed: {result.get('error')}"
+    return result['result']
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait(timeout=5)
+
+def read_events(path):
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+def run_connection(local_port, messages):
+    client = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+    for message in messages:
+        exchange(client, message)
+    client.close()
+
+def tool_error(endpoint, name, arguments):
+    result = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments}
+    }, timeout=10).json()
+    return 'error' in result or result['result'].get('isError', False)
+
+def by_port(events, local_port):
+    """Events of the connections to one port rule, found by their open events."""
+    conn_ids = {e['ConnID'] for e in events if e.get('event') == 'open' and e['listen_port'] == local_port}
+    return [e for e in events if e.get('ConnID') in conn_ids]
+
+def direction(event, opened):
+    return 'client' if event['from'] == opened['from'] else 'target'
+
+def main():
+    """Test coalescing of same-direction chunks into one data event."""
+
+    processes = []
+    log_dir = os.path.abspath("./tmp/test_coalescing")
+    target = start_echo_target()
+    target_port = target.getsockname()[1]
+    sink = start_sink_target()
+
+    try:
+        if os.path.exists(log_dir):
+            shutil.rmtree(log_dir)
+
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', '--mcp-port', '0', '--flush-millis', '200'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        processes.append(process)
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+
+        local_port = find_free_port()
+        echo_port = find_free_port()
+        for port, target_port_of_rule in ((local_port, sink.getsockname()[1]), (echo_port, target_port)):
+            call_tool(endpoint, 'add-port-rule', {
+                'local_port': port, 'target_host': '127.0.0.1', 'target_port': target_port_of_rule,
+                'coalesce_micros': 300000, 'coalesce_bytes': 1000
+            })
+        assert tool_error(endpoint, 'add-port-rule', {
+            'local_port': find_free_port(), 'target_host': '127.0.0.1', 'target_port': target_port, 'coalesce_bytes': 0
+        }), "coalesce_bytes must be positive"  # $REQ_SIMPLE_032
+        call_tool(endpoint, 'start-logging', {'directory': os.path.join(log_dir, 'ndjson'), 'filename_format': 'rawprox.ndjson'})
+        call_tool(endpoint, 'start-logging', {'directory': os.path.join(log_dir, 'binary'), 'filename_format': 'rawprox.rpx', 'log_format': 'binary'})
+
+        # Small writes in a row become one event, more than coalesce_bytes in a row is split
+        client = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+        client.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        burst = [b'chunk%02d;' % i for i in range(10)]
+        large = [os.urandom(300) for _ in range(10)]
+        for part in burst:
+            client.sendall(part)
+            time.sleep(0.005)
+        time.sleep(0.4)
+        for part in large:
+            client.sendall(part)
+            time.sleep(0.005)
+        time.sleep(0.4)
+        # The close flushes without waiting for the window
+        client.sendall(b'last')
+        time.sleep(0.05)
+        client.close()
+
+        # Forwarding is not held back by the window, and a direction change ends it
+        client = socket.create_connection(('127.0.0.1', echo_port), timeout=5)
+        started = time.monotonic()
+        exchange(client, b'question')
+        assert time.monotonic() - started < 0.25, "Bytes should be forwarded without waiting for the window"  # $REQ_SIMPLE_032
+        exchange(client, b'answer')
+        client.close()
+        time.sleep(0.6)
+        stop(process)
+
+        all_events = read_events(os.path.join(log_dir, 'ndjson', 'rawprox.ndjson'))
+        events = by_port(all_events, local_port)
+        data = [e for e in events if 'data' in e]
+        sent = b''.join(burst) + b''.join(large) + b'last'
+        assert b''.join(urllib.parse.unquote_to_bytes(e['data']) for e in data) == sent, "Coalesced events should hold every byte in order"  # $REQ_SIMPLE_032
+        burst_events = [e for e in data if b'chunk' in urllib.parse.unquote_to_bytes(e['data'])]
+        assert len(burst_events) < len(burst) and max(e.get('chunks', 1) for e in burst_events) > 1, \
+            f"Small chunks in a row should be merged, got {[e.get('chunks', 1) for e in burst_events]}"  # $REQ_SIMPLE_032
+        merged = next(e for e in burst_events if e.get('chunks', 1) > 1)
+        assert merged['last_time'] > merged['time'], "Coalesced events carry the first and last chunk times"  # $REQ_SIMPLE_032
+        keys = list(merged.keys())
+        assert keys[:5] == ['time', 'ConnID', 'data', 'chunks', 'last_time'], f"chunks and last_time follow data, got {keys}"  # $REQ_SIMPLE_032
+        assert all(len(urllib.parse.unquote_to_bytes(e['data'])) <= 1000 for e in data), "Events should stay within coalesce_bytes"  # $REQ_SIMPLE_032
+        assert all(('chunks' in e) == ('last_time' in e) for e in data), "chunks and last_time come together"  # $REQ_SIMPLE_032
+        print("✓ $REQ_SIMPLE_032: consecutive chunks of one direction are merged within the window and byte limit")
+
+        assert urllib.parse.unquote_to_bytes(data[-1]['data']).endswith(b'last') and events[-1]['event'] == 'close', \
+            "The close should flush the pending event ahead of the close event"  # $REQ_SIMPLE_032
+        echo = by_port(all_events, echo_port)
+        opened = echo[0]
+        order = [(direction(e, opened), urllib.parse.unquote_to_bytes(e['data'])) for e in echo if 'data' in e]
+        assert order == [('client', b'question'), ('target', b'question'), ('client', b'answer'), ('target', b'answer')], \
+            f"A direction change should end the window, got {order}"  # $REQ_SIMPLE_032
+        print("✓ $REQ_SIMPLE_032: direction changes and the close flush pending chunks")
+
+        decoded = subprocess.run(['./release/rawprox.exe', '--decode', os.path.join(log_dir, 'binary', 'rawprox.rpx')],
+                                 capture_output=True, text=True, encoding='utf-8', timeout=30)
+        assert decoded.returncode == 0, f"--decode failed: {decoded.stderr}"
+        binary = by_port([json.loads(line) for line in decoded.stdout.splitlines()], local_port)
+        assert [e for e in binary if 'data' in e] == data, "Binary records should decode to the same coalesced events"  # $REQ_SIMPLE_032
+        print("✓ $REQ_SIMPLE_032: binary records keep chunk counts and last times")
+
+        result = subprocess.run(['./release/rawprox.exe', '--coalesce-bytes', '0', '8080:example.com:80'],
+                                capture_output=True, text=True, timeout=10)
+        assert result.returncode != 0 and 'coalesce-bytes' in result.stderr, "A zero byte limit should be an error"  # $REQ_SIMPLE_032
+
+        print("\n✓ All coalescing tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        sink.close()
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait(timeout=5)
+
+if __name__ == '__main__':
+    sys.exit(main())
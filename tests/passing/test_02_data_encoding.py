@@ -0,0 +1,204 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#   "requests",
+# ]
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import base64
+import urllib.parse
+import requests
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def exchange(client, message):
+    client.sendall(message)
+    received = b''
+    while len(received) < len(message):
+        received += client.recv(65536)
+    time.sleep(0.05)
+
+def call_tool(endpoint, name, arguments=None):
+    response = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments or {}}
+    }, timeout=10)
+    result = response.json()
+    assert 'error' not in result, f"{name} failed: {result.get('error')}"
+    return result['result']['content'][0]['text']
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait(timeout=5)
+
+def payload(event):
+    """Raw bytes of a data event, by its enc field."""
+    enc = event.get('enc', 'url')
+    if enc == 'base64':
+        return base64.b64decode(event['data'])
+    if enc == 'hex':
+        return bytes.fromhex(event['data'])
+    assert enc == 'url', f"Unknown enc {enc}"
+    return urllib.parse.unquote_to_bytes(event['data'])
+
+def data_events(path):
+    with open(path, encoding='utf-8') as f:
+        events = [json.loads(line) for line in f]
+    return [e for e in events if 'data' in e]
+
+def main():
+    """Test the data_encoding option."""
+
+    processes = []
+    log_dir = os.path.abspath("./tmp/test_data_encoding")
+    target = start_echo_target()
+
+    try:
+        if os.path.exists(log_dir):
+            shutil.rmtree(log_dir)
+
+        local_port = find_free_port()
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', '--mcp-port', '0', '--flush-millis', '200',
+             f'{local_port}:127.0.0.1:{target.getsockname()[1]}'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        processes.append(process)
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+        encodings = ['url', 'base64', 'hex', 'auto']
+        for encoding in encodings:
+            call_tool(endpoint, 'start-logging', {
+                'directory': os.path.join(log_dir, encoding), 'filename_format': 'rawprox.ndjson', 'data_encoding': encoding
+            })
+
+        text = b'GET /index.html HTTP/1.1\r\nHost: example.test\r\nAccept: "text/html"; q=100%\r\n\r\n'
+        binary = os.urandom(4096)
+        client = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+        exchange(client, text)
+        exchange(client, binary)
+        client.close()
+        time.sleep(0.6)
+
+        stats = json.loads(call_tool(endpoint, 'get-stats'))
+        reported = {d['directory']: d['data_encoding'] for d in stats['log_buffers']['destinations']}
+        assert reported[os.path.join(log_dir, 'hex')] == 'hex', "Stats should report the data encoding"  # $REQ_LOG_026
+        stop(process)
+
+        events = {e: data_events(os.path.join(log_dir, e, 'rawprox.ndjson')) for e in encodings}
+        for encoding in encodings:
+            assert [payload(e) for e in events[encoding]] == [text, text, binary, binary], f"{encoding} should decode to the payloads"  # $REQ_LOG_026
+        assert all('enc' not in e for e in events['url']), "The default encoding should have no enc field"  # $REQ_LOG_026
+        assert all(e['enc'] == 'base64' for e in events['base64']), "Base64 events should say so"  # $REQ_LOG_026
+        assert all(e['enc'] == 'hex' for e in events['hex']), "Hex events should say so"  # $REQ_LOG_026
+        keys = list(events['base64'][0].keys())
+        assert keys[:4] == ['time', 'ConnID', 'data', 'enc'], f"enc should follow data, got {keys}"  # $REQ_LOG_026
+        print("✓ $REQ_LOG_026: url, base64 and hex data decode to the forwarded bytes")
+
+        auto = [e.get('enc', 'url') for e in events['auto']]
+        assert auto == ['url', 'url', 'base64', 'base64'], f"auto should pick per chunk, got {auto}"  # $REQ_LOG_026
+        url_size = len(events['url'][2]['data'])
+        base64_size = len(events['base64'][2]['data'])
+        assert base64_size < url_size * 0.7, "Base64 should be much smaller than URL-encoding for binary data"  # $REQ_LOG_026
+        print("✓ $REQ_LOG_026: auto keeps text URL-encoded and switches binary chunks to base64")
+
+        # Command-line option
+        cli_dir = os.path.join(log_dir, 'cli')
+        local_port = find_free_port()
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', f'{local_port}:127.0.0.1:{target.getsockname()[1]}', f'@{cli_dir}',
+             '--filename-format', 'rawprox.ndjson', '--flush-millis', '200', '--data-encoding', 'hex'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        processes.append(process)
+        time.sleep(0.5)
+        client = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+        exchange(client, b'\x00\x01hello')
+        client.close()
+        time.sleep(0.6)
+        stop(process)
+        events = data_events(os.path.join(cli_dir, 'rawprox.ndjson'))
+        assert events and events[0]['data'] == '000168656c6c6f' and events[0]['enc'] == 'hex', "--data-encoding should apply"  # $REQ_LOG_026
+
+        result = subprocess.run(['./release/rawprox.exe', '--data-encoding', 'rot13', '8080:example.com:80'],
+                                capture_output=True, text=True, timeout=10)
+        assert result.returncode != 0 and 'data-encoding' in result.stderr, "An unknown encoding should be an error"  # $REQ_LOG_026
+        print("✓ $REQ_LOG_026: --data-encoding sets the default, unknown values are rejected")
+
+        print("\n✓ All data encoding tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait(timeout=5)
+
+if __name__ == '__main__':
+    sys.exit(main())
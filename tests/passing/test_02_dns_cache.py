@@ -0,0 +1,203 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#   "requests",
+# ]
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import socket
+import threading
+import json
+import requests
+
+TARGET_HOST = 'rawprox-dns.test'
+MISSING_HOST = 'rawprox-missing.test'
+TTL_MILLIS = 2000
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def call_tool(endpoint, name, arguments=None):
+    response = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments or {}}
+    }, timeout=10)
+    result = response.json()
+    assert 'error' not in result, f"{name} failed: {result.get('error')}"
+    return result['result']
+
+def dns_stats(endpoint):
+    return json.loads(call_tool(endpoint, 'get-stats')['content'][0]['text'])['dns']
+
+def echo_through(local_port, message):
+    """Send message through the proxy; return the echo, or b'' if the proxy closed the connection."""
+    client = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+    try:
+        client.sendall(message)
+        received = b''
+        while len(received) < len(message):
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            received += chunk
+        return received
+    except ConnectionResetError:
+        return b''
+    finally:
+        client.close()
+
+def write_hosts(path, names):
+    # Rewrite in place: the proxy sees this file through a bind mount of the same inode
+    with open(path, 'w') as f:
+        f.write("127.0.0.1 localhost\n")
+        for name in names:
+            f.write(f"127.0.0.1 {name}\n")
+
+def can_unshare():
+    """Whether a private mount namespace is available to give the proxy its own hosts file."""
+    try:
+        return subprocess.run(['unshare', '-rm', 'true'], capture_output=True, timeout=10).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+def main():
+    """Test the target resolution cache: TTL expiry, background refresh, failed lookups and stale answers."""
+
+    if not sys.platform.startswith('linux') or not can_unshare():
+        print("✓ Skipped: needs Linux with unshare to give the proxy its own hosts file")
+        return 0
+
+    process = None
+    hosts_file = os.path.abspath('./tmp/test_dns_cache_hosts')
+    target = start_echo_target()
+    target_port = target.getsockname()[1]
+
+    try:
+        os.makedirs(os.path.dirname(hosts_file), exist_ok=True)
+        write_hosts(hosts_file, [TARGET_HOST])
+
+        process = subprocess.Popen(
+            ['unshare', '-rm', 'sh', '-c', 'mount --bind "$0" /etc/hosts && exec "$@"', hosts_file,
+             './release/rawprox.exe', '--mcp-port', '0', '--dns-ttl-millis', str(TTL_MILLIS)],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+        local_port = find_free_port()
+        missing_port = find_free_port()
+        call_tool(endpoint, 'add-port-rule', {'local_port': local_port, 'target_host': TARGET_HOST, 'target_port': target_port})
+        call_tool(endpoint, 'add-port-rule', {'local_port': missing_port, 'target_host': MISSING_HOST, 'target_port': target_port})
+
+        # First connect resolves, the next one reuses the cached addresses
+        assert echo_through(local_port, b'first') == b'first', "Connect through a resolved name should work"  # $REQ_SIMPLE_038
+        resolved_at = time.monotonic()
+        assert echo_through(local_port, b'cached') == b'cached', "Connect through a cached name should work"  # $REQ_SIMPLE_038
+        stats = dns_stats(endpoint)
+        assert stats['misses'] == 1 and stats['hits'] == 1, f"The second connect should be served from the cache, got {stats}"  # $REQ_SIMPLE_038
+        print("✓ $REQ_SIMPLE_038: Second connect reused the cached addresses")
+
+        # A hit in the last fifth of the TTL starts a background refresh and does not wait for it
+        time.sleep(max(0, resolved_at + TTL_MILLIS * 0.9 / 1000 - time.monotonic()))
+        assert echo_through(local_port, b'refresh') == b'refresh', "Connect near expiry should work"  # $REQ_SIMPLE_038
+        refreshed_at = time.monotonic()
+        time.sleep(0.2)
+        stats = dns_stats(endpoint)
+        assert stats['refreshes'] == 1 and stats['hits'] == 2 and stats['misses'] == 1, \
+            f"A hit near expiry should refresh in the background, got {stats}"  # $REQ_SIMPLE_038
+        # The refresh renewed the entry: past the first TTL the name is still a hit
+        time.sleep(max(0, resolved_at + TTL_MILLIS * 1.2 / 1000 - time.monotonic()))
+        assert echo_through(local_port, b'renewed') == b'renewed', "Connect after a refresh should work"  # $REQ_SIMPLE_038
+        stats = dns_stats(endpoint)
+        assert stats['hits'] == 3 and stats['misses'] == 1, f"A refreshed entry should outlive the first TTL, got {stats}"  # $REQ_SIMPLE_038
+        print("✓ $REQ_SIMPLE_038: A connect near expiry refreshed the entry in the background")
+
+        # Once the TTL runs out with no traffic, the next connect queries the resolver again
+        time.sleep(max(0, refreshed_at + TTL_MILLIS * 1.2 / 1000 - time.monotonic()))
+        assert echo_through(local_port, b'expired') == b'expired', "Connect after expiry should work"  # $REQ_SIMPLE_038
+        stats = dns_stats(endpoint)
+        assert stats['misses'] == 2 and stats['failures'] == 0, f"An expired entry should be resolved again, got {stats}"  # $REQ_SIMPLE_038
+        expired_at = time.monotonic()
+        print("✓ $REQ_SIMPLE_038: An expired entry was resolved again")
+
+        # The name stops resolving: after expiry the last good addresses are served
+        write_hosts(hosts_file, [])
+        time.sleep(max(0, expired_at + TTL_MILLIS * 1.2 / 1000 - time.monotonic()))
+        assert echo_through(local_port, b'stale') == b'stale', "A failed refresh should still connect to the last good address"  # $REQ_SIMPLE_038
+        assert echo_through(local_port, b'stale-again') == b'stale-again', "A stale entry should keep serving"  # $REQ_SIMPLE_038
+        stats = dns_stats(endpoint)
+        assert stats['failures'] == 1 and stats['stale_hits'] == 2, f"A failed lookup should serve the stale entry, got {stats}"  # $REQ_SIMPLE_038
+        print("✓ $REQ_SIMPLE_038: A name that stopped resolving was served from its last good addresses")
+
+        # A name that never resolved is refused from the cache instead of querying again
+        misses = stats['misses']
+        assert echo_through(missing_port, b'missing') == b'', "A name that does not resolve should close the connection"  # $REQ_SIMPLE_038
+        assert echo_through(missing_port, b'missing') == b'', "A cached failure should close the connection"  # $REQ_SIMPLE_038
+        stats = dns_stats(endpoint)
+        assert stats['misses'] == misses + 1 and stats['failures'] == 2 and stats['negative_hits'] == 1, \
+            f"A failed lookup should be cached, got {stats}"  # $REQ_SIMPLE_038
+        print("✓ $REQ_SIMPLE_038: A failed lookup was cached and the retry refused without a query")
+
+        print("\n✓ All DNS cache tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        if process and process.poll() is None:
+            process.kill()
+            process.wait(timeout=5)
+
+if __name__ == '__main__':
+    sys.exit(main())
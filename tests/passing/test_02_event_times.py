@@ -0,0 +1,165 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = []
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import re
+import shutil
+import socket
+import threading
+import json
+from datetime import datetime, timezone
+
+TIME_PATTERN = re.compile(r'^\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}\.\d{6}Z$')
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def chatter(local_port, writes):
+    """Small writes without waiting for the echo, so both directions overlap."""
+    client = socket.create_connection(('127.0.0.1', local_port), timeout=10)
+    received = [0]
+
+    def drain():
+        try:
+            while True:
+                data = client.recv(65536)
+                if not data:
+                    return
+                received[0] += len(data)
+        except OSError:
+            pass
+
+    reader = threading.Thread(target=drain, daemon=True)
+    reader.start()
+    for i in range(writes):
+        client.sendall(b'x' * (1 + i % 200))
+    client.shutdown(socket.SHUT_WR)
+    reader.join(timeout=10)
+    client.close()
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait(timeout=5)
+
+def parse(value):
+    return datetime.strptime(value, '%Y-%m-%dT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc)
+
+def main():
+    """Test that every connection's events carry non-decreasing times in log order."""
+
+    process = None
+    log_dir = os.path.abspath("./tmp/test_event_times")
+    target = start_echo_target()
+    target_port = target.getsockname()[1]
+
+    try:
+        if os.path.exists(log_dir):
+            shutil.rmtree(log_dir)
+
+        local_port = find_free_port()
+        started = datetime.now(timezone.utc)
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', f'{local_port}:127.0.0.1:{target_port}', f'@{log_dir}',
+             '--filename-format', 'rawprox.ndjson', '--flush-millis', '200'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        time.sleep(1)
+
+        clients = [threading.Thread(target=chatter, args=(local_port, 2000)) for _ in range(8)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join(timeout=60)
+        time.sleep(0.8)
+        stop(process)
+        ended = datetime.now(timezone.utc)
+
+        with open(os.path.join(log_dir, 'rawprox.ndjson'), encoding='utf-8') as f:
+            events = [json.loads(line) for line in f]
+
+        for e in events:
+            assert TIME_PATTERN.match(e['time']), f"Timestamps should be ISO 8601 UTC with microseconds, got {e['time']}"  # $REQ_SIMPLE_016
+            moment = parse(e['time'])
+            assert started.timestamp() - 1 <= moment.timestamp() <= ended.timestamp() + 1, \
+                f"Event times should follow the system clock, got {e['time']}"  # $REQ_SIMPLE_016
+        print("✓ $REQ_SIMPLE_016: timestamps are ISO 8601 UTC with microseconds and follow the system clock")
+
+        connections = {}
+        for e in events:
+            if 'ConnID' in e:
+                connections.setdefault(e['ConnID'], []).append(e)
+        assert len(connections) == 8, f"Expected 8 connections, got {len(connections)}"
+        data_events = 0
+        for conn_id, conn_events in connections.items():
+            assert conn_events[0].get('event') == 'open' and conn_events[-1].get('event') == 'close', \
+                f"Connection {conn_id} should start with open and end with close"
+            times = [e['time'] for e in conn_events]
+            assert times == sorted(times), f"Connection {conn_id} has an event earlier than the one before it"  # $REQ_SIMPLE_033
+            senders = {e['from'] for e in conn_events[1:-1]}
+            assert len(senders) == 2, f"Connection {conn_id} should have data events in both directions"
+            data_events += len(conn_events) - 2
+        print(f"✓ $REQ_SIMPLE_033: {data_events} events of 8 overlapping connections carry non-decreasing times")
+
+        print("\n✓ All event time tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    finally:
+        if process and process.poll() is None:
+            stop(process)
+        target.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,146 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = []
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import socket
+import threading
+
+RESPONSE_SIZE = 5 * 1024 * 1024
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_target(handler):
+    """Start a one-shot TCP server on localhost that runs handler(conn)."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(1)
+
+    def run():
+        try:
+            conn, _ = server.accept()
+            handler(conn)
+        except Exception:
+            pass
+        finally:
+            server.close()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server.getsockname()[1]
+
+def read_until_eof(sock):
+    received = bytearray()
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return bytes(received)
+        received.extend(chunk)
+
+def main():
+    """Test that a client half-close is propagated and the response still streams to completion."""
+
+    processes = []
+    try:
+        # $REQ_SIMPLE_025: Half-Close Propagation
+        # Target reads the request until EOF (the propagated FIN), then streams a large response
+        request_seen = []
+
+        def respond_after_eof(conn):
+            request_seen.append(read_until_eof(conn))
+            conn.sendall(b'R' * RESPONSE_SIZE)
+            conn.close()
+
+        target_port = start_target(respond_after_eof)
+        local_port = find_free_port()
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', f'{local_port}:127.0.0.1:{target_port}'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        processes.append(process)
+        time.sleep(1)
+        assert process.poll() is None, "Process should be running"
+
+        client = socket.create_connection(('127.0.0.1', local_port), timeout=10)
+        client.sendall(b'upload finished')
+        client.shutdown(socket.SHUT_WR)
+        response = read_until_eof(client)
+        client.close()
+
+        assert request_seen == [b'upload finished'], "Target should see the request followed by end of stream"  # $REQ_SIMPLE_025
+        assert len(response) == RESPONSE_SIZE, f"Full response should arrive after half-close, got {len(response)} bytes"  # $REQ_SIMPLE_025
+        print("✓ $REQ_SIMPLE_025: Half-close propagated, response streamed to completion")
+
+        process.kill()
+        process.wait(timeout=5)
+        processes.remove(process)
+
+        # $REQ_SIMPLE_026: Linger Deadline
+        # Target keeps trickling data after the client half-closes; --linger-millis cuts it off
+        def trickle_after_eof(conn):
+            read_until_eof(conn)
+            try:
+                for _ in range(50):
+                    conn.sendall(b'tick')
+                    time.sleep(0.1)
+            except OSError:
+                pass
+            conn.close()
+
+        target_port = start_target(trickle_after_eof)
+        local_port = find_free_port()
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', '--linger-millis', '500', f'{local_port}:127.0.0.1:{target_port}'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        processes.append(process)
+        time.sleep(1)
+
+        client = socket.create_connection(('127.0.0.1', local_port), timeout=10)
+        client.sendall(b'done')
+        client.shutdown(socket.SHUT_WR)
+        started = time.time()
+        try:
+            read_until_eof(client)
+        except ConnectionResetError:
+            pass
+        elapsed = time.time() - started
+        client.close()
+
+        assert elapsed < 3.0, f"Connection should close at the linger deadline, took {elapsed:.1f}s"  # $REQ_SIMPLE_026
+        print(f"✓ $REQ_SIMPLE_026: Linger deadline closed the connection after {elapsed:.1f}s")
+
+        print("\n✓ All half-close tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        for process in processes:
+            try:
+                process.kill()
+                process.wait(timeout=5)
+            except Exception:
+                pass
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#   "requests",
+# ]
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import socket
+import threading
+import json
+import requests
+
+MAX_POOLED_BYTES = 64 * 1024 * 1024
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(64)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(262144)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def call_tool(endpoint, name, arguments=None):
+    response = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments or {}}
+    }, timeout=10)
+    result = response.json()
+    assert 'error' not in result, f"{name} failed: {result.get('error')}"
+    return result['result']
+
+def relay_buffers(endpoint):
+    return json.loads(call_tool(endpoint, 'get-stats')['content'][0]['text'])['relay_buffers']
+
+def bulk_echo(local_port, payload):
+    """Stream payload through the proxy while reading the echo back."""
+    client = socket.create_connection(('127.0.0.1', local_port), timeout=10)
+    sender = threading.Thread(target=lambda: (client.sendall(payload), client.shutdown(socket.SHUT_WR)), daemon=True)
+    sender.start()
+    received = bytearray()
+    while True:
+        chunk = client.recv(1 << 20)
+        if not chunk:
+            break
+        received += chunk
+    sender.join(timeout=10)
+    client.close()
+    return bytes(received)
+
+def main():
+    """Test the relay buffer pool: reuse, growth for bulk streams, a bounded pool and no buffers for idle connections."""
+
+    process = None
+    clients = []
+    target = start_echo_target()
+    target_port = target.getsockname()[1]
+
+    try:
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', '--mcp-port', '0'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+        local_port = find_free_port()
+        call_tool(endpoint, 'add-port-rule', {'local_port': local_port, 'target_host': '127.0.0.1', 'target_port': target_port})
+        # Nothing captures, so buffers go back to the pool as soon as each chunk is sent
+        call_tool(endpoint, 'stop-logging')
+
+        # Several bulk streams in a row: the pool serves most rents after the first
+        payload = os.urandom(8 * 1024 * 1024)
+        for _ in range(4):
+            assert bulk_echo(local_port, payload) == payload, "Bulk data should be relayed unchanged"  # $REQ_SIMPLE_037
+        time.sleep(0.2)
+        stats = relay_buffers(endpoint)
+        assert stats['rents'] >= 4 * 2 * len(payload) // (256 * 1024), f"Each chunk should rent a buffer, got {stats}"  # $REQ_SIMPLE_037
+        assert stats['hits'] + stats['misses'] == stats['rents'], f"Every rent is a hit or a miss, got {stats}"  # $REQ_SIMPLE_037
+        assert stats['misses'] * 10 <= stats['rents'], f"Most rents should reuse pooled buffers, got {stats}"  # $REQ_SIMPLE_037
+        print(f"✓ $REQ_SIMPLE_037: {stats['hits']} of {stats['rents']} rents reused pooled buffers")
+
+        pooled = stats['pooled_buffers']
+        assert pooled['128k'] + pooled['256k'] > 0, f"Reads that fill their buffer should grow it, got {pooled}"  # $REQ_SIMPLE_037
+        pooled_bytes = sum(int(size[:-1]) * 1024 * count for size, count in pooled.items())
+        assert pooled_bytes == stats['pooled_bytes'] <= MAX_POOLED_BYTES, f"Idle buffers kept should stay within the pool limit, got {stats}"  # $REQ_SIMPLE_037
+        assert stats['outstanding_buffers'] == 0 and stats['outstanding_bytes'] == 0, f"Closed connections should return their buffers, got {stats}"  # $REQ_SIMPLE_037
+        print(f"✓ $REQ_SIMPLE_037: Bulk streams grew buffers to large size classes, {stats['pooled_bytes']} bytes pooled")
+
+        # Open connections that went quiet hold no buffer while they wait for data
+        for i in range(20):
+            client = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+            client.sendall(b'keep-alive')
+            received = b''
+            while len(received) < len(b'keep-alive'):
+                received += client.recv(64)
+            clients.append(client)
+        time.sleep(0.2)
+        stats = relay_buffers(endpoint)
+        assert stats['outstanding_buffers'] == 0, f"Idle connections should hold no relay buffers, got {stats}"  # $REQ_SIMPLE_037
+        print(f"✓ $REQ_SIMPLE_037: {len(clients)} idle connections hold no relay buffers")
+
+        print("\n✓ All relay buffer tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        for client in clients:
+            client.close()
+        target.close()
+        if process and process.poll() is None:
+            process.kill()
+            process.wait(timeout=5)
+
+if __name__ == '__main__':
+    sys.exit(main())
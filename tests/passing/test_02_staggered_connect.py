@@ -0,0 +1,176 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#   "requests",
+# ]
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import socket
+import threading
+import json
+import requests
+
+TARGET_HOST = 'rawprox-multi.test'
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_blackhole(port):
+    """Listen on 127.0.0.1 with a full accept queue, so further connects get no answer."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.bind(('127.0.0.1', port))
+    server.listen(0)
+    filler = socket.create_connection(('127.0.0.1', port), timeout=5)
+    probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    probe.settimeout(0.5)
+    try:
+        probe.connect(('127.0.0.1', port))
+        return None
+    except socket.timeout:
+        return server, filler
+    finally:
+        probe.close()
+
+def start_echo_target(host, port):
+    """Start a TCP echo server on host:port."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((host, port))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def call_tool(endpoint, name, arguments=None):
+    response = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments or {}}
+    }, timeout=10)
+    result = response.json()
+    assert 'error' not in result, f"{name} failed: {result.get('error')}"
+    return result['result']
+
+def can_unshare():
+    """Whether a private mount namespace is available to give the proxy its own hosts file."""
+    try:
+        return subprocess.run(['unshare', '-rm', 'true'], capture_output=True, timeout=10).returncode == 0
+    except (OSError, subprocess.TimeoutExpired):
+        return False
+
+def main():
+    """Test the staggered upstream connect: a silent first address does not hold up the connect."""
+
+    if not sys.platform.startswith('linux') or not can_unshare():
+        print("✓ Skipped: needs Linux with unshare to give the target several addresses")
+        return 0
+
+    process = None
+    servers = []
+    hosts_file = os.path.abspath('./tmp/test_staggered_connect_hosts')
+
+    try:
+        os.makedirs(os.path.dirname(hosts_file), exist_ok=True)
+        # The resolver lists 127.0.0.1 first: it is the blackholed address
+        with open(hosts_file, 'w') as f:
+            f.write(f"127.0.0.1 {TARGET_HOST}\n127.0.0.2 {TARGET_HOST}\n")
+
+        target_port = find_free_port()
+        blackhole = start_blackhole(target_port)
+        if blackhole is None:
+            print("✓ Skipped: a full accept queue does not drop connects here")
+            return 0
+        servers.extend(blackhole)
+        servers.append(start_echo_target('127.0.0.2', target_port))
+
+        process = subprocess.Popen(
+            ['unshare', '-rm', 'sh', '-c', 'mount --bind "$0" /etc/hosts && exec "$@"', hosts_file,
+             './release/rawprox.exe', '--mcp-port', '0'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+        local_port = find_free_port()
+        call_tool(endpoint, 'add-port-rule', {'local_port': local_port, 'target_host': TARGET_HOST, 'target_port': target_port})
+
+        for i in range(3):
+            started = time.monotonic()
+            client = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+            message = f'staggered-{i}'.encode()
+            client.sendall(message)
+            received = b''
+            while len(received) < len(message):
+                chunk = client.recv(65536)
+                assert chunk, "The proxied connection should reach the answering address"  # $REQ_SIMPLE_035
+                received += chunk
+            elapsed = time.monotonic() - started
+            client.close()
+            assert received == message, "Echo should come back through the winning connection"  # $REQ_SIMPLE_035
+            # One attempt delay, far below the seconds a SYN retransmit to the silent address takes
+            assert elapsed < 0.9, f"A silent address should delay the connect by one attempt delay, took {elapsed:.2f}s"  # $REQ_SIMPLE_035
+        print(f"✓ $REQ_SIMPLE_035: Connected past a silent first address in {elapsed:.2f}s")
+
+        time.sleep(0.2)
+        connect = json.loads(call_tool(endpoint, 'get-stats')['content'][0]['text'])['connect']
+        silent = connect['addresses'].get('127.0.0.1', {})
+        answering = connect['addresses'].get('127.0.0.2', {})
+        assert connect['connects'] == 3 and connect['fallbacks'] == 3, f"Every connect should be won by the second address, got {connect}"  # $REQ_SIMPLE_035
+        assert answering.get('successes') == 3, f"The answering address should win each race, got {connect}"  # $REQ_SIMPLE_035
+        assert silent.get('successes') == 0 and silent.get('cancelled') == 3, \
+            f"Attempts to the silent address should be cancelled once another wins, got {connect}"  # $REQ_SIMPLE_035
+        print("✓ $REQ_SIMPLE_035: The first connection to succeed is kept and the losing attempts are cancelled")
+
+        print("\n✓ All staggered connect tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        for server in servers:
+            server.close()
+        if process and process.poll() is None:
+            process.kill()
+            process.wait(timeout=5)
+
+if __name__ == '__main__':
+    sys.exit(main())
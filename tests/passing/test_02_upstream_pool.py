@@ -0,0 +1,118 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = []
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import socket
+import threading
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target(accepted):
+    """Start a TCP echo server on localhost that records every accepted socket."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            accepted.append(conn)
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def round_trip(port, payload):
+    client = socket.create_connection(('127.0.0.1', port), timeout=5)
+    try:
+        client.sendall(payload)
+        return client.recv(65536)
+    finally:
+        client.close()
+
+def main():
+    """Test that --pool-min keeps upstream sockets connected ahead of clients."""
+
+    process = None
+    accepted = []
+    target = start_echo_target(accepted)
+    try:
+        # $REQ_SIMPLE_027: Warm Upstream Pool
+        local_port = find_free_port()
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', '--pool-min', '2', f'{local_port}:127.0.0.1:{target.getsockname()[1]}'],
+            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+        )
+        time.sleep(1.5)
+        assert process.poll() is None, "Process should be running"
+
+        assert len(accepted) == 2, f"Pool should pre-connect 2 upstream sockets before any client, got {len(accepted)}"  # $REQ_SIMPLE_027
+        print("✓ $REQ_SIMPLE_027: Upstream sockets connected before any client arrived")
+
+        for i in range(4):
+            payload = f'pooled {i}'.encode()
+            assert round_trip(local_port, payload) == payload, "Pooled connection should relay traffic"  # $REQ_SIMPLE_027
+        print("✓ $REQ_SIMPLE_027: Clients paired with pooled upstream sockets")
+
+        # Target drops every idle pooled socket; the next client must not get a dead one
+        time.sleep(0.5)
+        for conn in list(accepted):
+            try:
+                conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        time.sleep(0.3)
+        assert round_trip(local_port, b'after drop') == b'after drop', "Closed pooled sockets should be discarded"  # $REQ_SIMPLE_027
+        print("✓ $REQ_SIMPLE_027: Pooled sockets closed by the target are discarded")
+
+        print("\n✓ All upstream pool tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        if process:
+            try:
+                process.kill()
+                process.wait(timeout=5)
+            except Exception:
+                pass
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = []
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import glob
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def main():
+    """Test that events are written to the file of the period of their own timestamp."""
+
+    process = None
+    log_dir = "./tmp/test_period_buffers"
+    target = start_echo_target()
+
+    try:
+        if os.path.exists(log_dir):
+            shutil.rmtree(log_dir)
+
+        # Per-second files with a 3 second flush: every flush spans several periods
+        local_port = find_free_port()
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', f'{local_port}:127.0.0.1:{target.getsockname()[1]}', f'@{log_dir}',
+             '--filename-format', 'rawprox_%Y-%m-%d-%H-%M-%S.ndjson', '--flush-millis', '3000'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        time.sleep(0.5)
+        assert process.poll() is None, "Process failed to start"
+
+        client = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+        for i in range(12):
+            client.sendall(f'chunk {i}'.encode())
+            client.recv(65536)
+            time.sleep(0.25)
+        client.close()
+        time.sleep(4)
+
+        files = sorted(glob.glob(os.path.join(log_dir, '*.ndjson')))
+        assert len(files) >= 3, f"Traffic over 3 seconds should produce several per-second files, got {len(files)}"
+        data_events = 0
+        for path in files:
+            stamp = os.path.basename(path)[len('rawprox_'):-len('.ndjson')]
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    event = json.loads(line)
+                    # 2025-10-22T15:32:47.123456Z -> 2025-10-22-15-32-47
+                    event_stamp = event['time'][:19].replace('T', '-').replace(':', '-')
+                    assert event_stamp == stamp, f"Event at {event['time']} written to {os.path.basename(path)}"  # $REQ_ROT_013
+                    data_events += 'data' in event
+        assert data_events == 24, f"All data events should be logged, got {data_events}"
+        print("✓ $REQ_ROT_013: Events buffered per period of their timestamp and written to that period's file")
+
+        print("\n✓ All period buffer tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        if process:
+            try:
+                process.kill()
+                process.wait(timeout=5)
+            except Exception:
+                pass
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,209 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = []
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import glob
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def run_proxy(log_dir, target, *extra):
+    local_port = find_free_port()
+    process = subprocess.Popen(
+        ['./release/rawprox.exe', f'{local_port}:127.0.0.1:{target.getsockname()[1]}', f'@{log_dir}',
+         '--flush-millis', '200', *extra],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8'
+    )
+    time.sleep(0.5)
+    assert process.poll() is None, "Process failed to start"
+    return process, local_port
+
+def send_messages(port, prefix, count, size):
+    client = socket.create_connection(('127.0.0.1', port), timeout=5)
+    try:
+        for i in range(count):
+            message = f'{prefix}{i:04d}'.ljust(size, 'x').encode()
+            client.sendall(message)
+            received = b''
+            while len(received) < len(message):
+                received += client.recv(65536)
+    finally:
+        client.close()
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait(timeout=5)
+
+def sequence_files(log_dir):
+    """rawprox.ndjson, rawprox.1.ndjson, ... in sequence order."""
+    def sequence(path):
+        parts = os.path.basename(path).split('.')
+        return int(parts[1]) if len(parts) == 3 else 0
+    return sorted(glob.glob(os.path.join(log_dir, 'rawprox*.ndjson')), key=sequence)
+
+def sent_data(files, prefix):
+    """Messages with this prefix in file order; each is logged once per direction."""
+    data = []
+    for path in files:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                event = json.loads(line)
+                message = event.get('data', '')[:len(prefix) + 4]
+                if message.startswith(prefix) and (not data or data[-1] != message):
+                    data.append(message)
+    return data
+
+def main():
+    """Test size-based rotation and retention limits."""
+
+    processes = []
+    log_dir = "./tmp/test_size_rotation"
+    retain_dir = "./tmp/test_log_retention"
+    target = start_echo_target()
+
+    try:
+        for path in (log_dir, retain_dir):
+            if os.path.exists(path):
+                shutil.rmtree(path)
+
+        # Test 1: A period's file continues in sequence files at the size limit
+        process, port = run_proxy(log_dir, target, '--filename-format', 'rawprox.ndjson', '--max-file-bytes', '4000')
+        processes.append(process)
+        send_messages(port, 'a', 30, 300)
+        time.sleep(1)
+        stop(process)
+
+        files = sequence_files(log_dir)
+        names = [os.path.basename(f) for f in files]
+        assert len(files) >= 3, f"Expected several sequence files, got {names}"  # $REQ_ROT_016
+        assert names[0] == 'rawprox.ndjson' and names[1] == 'rawprox.1.ndjson', f"Unexpected names {names}"  # $REQ_ROT_016
+        for path in files:
+            assert os.path.getsize(path) <= 4000, f"{path} exceeds the size limit"  # $REQ_ROT_016
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    json.loads(line)  # every file holds whole lines
+        prefixes = sent_data(files, 'a')
+        expected = [f'a{i:04d}' for i in range(30)]
+        assert prefixes == expected, "Events should be split across sequence files in order"  # $REQ_ROT_016
+        print(f"✓ $REQ_ROT_016: Size limit rotated into {len(files)} sequence files, in order")
+
+        # Test 2: A restart continues with the last sequence file instead of the first
+        first_size = os.path.getsize(files[0])
+        last = names[-1]
+        process, port = run_proxy(log_dir, target, '--filename-format', 'rawprox.ndjson', '--max-file-bytes', '4000')
+        processes.append(process)
+        send_messages(port, 'b', 2, 300)
+        time.sleep(1)
+        stop(process)
+        files = sequence_files(log_dir)
+        assert os.path.getsize(files[0]) == first_size, "The first file should not be written again"  # $REQ_ROT_016
+        later = [f for f in files if [os.path.basename(g) for g in files].index(os.path.basename(f)) >= names.index(last)]
+        assert sent_data(later, 'b') == ['b0000', 'b0001'], "A restart should continue at the last sequence file"  # $REQ_ROT_016
+        print("✓ $REQ_ROT_016: Restart resumes at the last sequence file")
+
+        # Test 3: Retention deletes expired and oldest files of this destination only
+        os.makedirs(retain_dir)
+        now = time.time()
+        old_files = {
+            'rawprox_2020-01-01-00.ndjson': now - 7200,   # expired
+            'rawprox_2020-01-01-01.ndjson': now - 600,    # oldest within age, over the size limit
+            'rawprox_2020-01-01-02.ndjson': now - 500,    # fits with the current file
+            'rawprox_2020-01-01-03.1.ndjson': now - 400,
+            'notes.txt': now - 7200,                       # not a log file of this destination
+        }
+        for name, mtime in old_files.items():
+            path = os.path.join(retain_dir, name)
+            with open(path, 'w') as f:
+                f.write('x' * 1000)
+            os.utime(path, (mtime, mtime))
+
+        process, port = run_proxy(retain_dir, target, '--retain-seconds', '3600', '--retain-bytes', '3500')
+        processes.append(process)
+        send_messages(port, 'c', 1, 100)
+        time.sleep(2)
+        remaining = set(os.listdir(retain_dir))
+        stop(process)
+
+        assert 'rawprox_2020-01-01-00.ndjson' not in remaining, "Expired file should be deleted"  # $REQ_ROT_017
+        assert 'rawprox_2020-01-01-01.ndjson' not in remaining, "Oldest file beyond the size limit should be deleted"  # $REQ_ROT_017
+        assert 'rawprox_2020-01-01-02.ndjson' in remaining and 'rawprox_2020-01-01-03.1.ndjson' in remaining, \
+            f"Newer files within the limits should be kept: {sorted(remaining)}"  # $REQ_ROT_017
+        assert 'notes.txt' in remaining, "Files not matching the filename format should never be deleted"  # $REQ_ROT_017
+        current = [name for name in remaining if name not in old_files]
+        assert len(current) == 1, f"The file being written should be kept: {sorted(remaining)}"  # $REQ_ROT_017
+        print("✓ $REQ_ROT_017: Retention deleted expired and oldest log files, kept others")
+
+        print("\n✓ All size rotation and retention tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait(timeout=5)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -143,13 +143,15 @@ def main():
 
         tools = tools_response['result']['tools']
         assert isinstance(tools, list), "Tools should be an array"  # $REQ_MCP_029
-        assert len(tools) == 5, "Should have exactly 5 tools"  # $REQ_MCP_039
+        assert len(tools) == 7, "Should have exactly 7 tools"  # $REQ_MCP_039
 
         tool_names = [tool['name'] for tool in tools]
         assert 'start-logging' in tool_names, "Should include start-logging tool"  # $REQ_MCP_039
         assert 'stop-logging' in tool_names, "Should include stop-logging tool"  # $REQ_MCP_039
         assert 'add-port-rule' in tool_names, "Should include add-port-rule tool"  # $REQ_MCP_039
         assert 'remove-port-rule' in tool_names, "Should include remove-port-rule tool"  # $REQ_MCP_039
+        assert 'set-capture' in tool_names, "Should include set-capture tool"  # $REQ_MCP_039
+        assert 'get-stats' in tool_names, "Should include get-stats tool"  # $REQ_MCP_039
         assert 'shutdown' in tool_names, "Should include shutdown tool"  # $REQ_MCP_039
 
         # Verify tool structure
@@ -178,7 +180,7 @@ def main():
                 assert 'properties' in tool['inputSchema'], "Schema should have properties"  # $REQ_MCP_038
                 assert len(tool['inputSchema']['properties']) == 0, "Shutdown should have empty properties"  # $REQ_MCP_038
 
-        print(f"✓ $REQ_MCP_009, $REQ_MCP_029, $REQ_MCP_034, $REQ_MCP_035, $REQ_MCP_036, $REQ_MCP_037, $REQ_MCP_038, $REQ_MCP_039: Tools list with all 5 tools and correct schemas")
+        print(f"✓ $REQ_MCP_009, $REQ_MCP_029, $REQ_MCP_034, $REQ_MCP_035, $REQ_MCP_036, $REQ_MCP_037, $REQ_MCP_038, $REQ_MCP_039: Tools list with all 7 tools and correct schemas")
 
         # $REQ_MCP_010: Tools call method
         # $REQ_MCP_030: Tool call parameters
@@ -209,6 +211,27 @@ def main():
 
         print(f"✓ $REQ_MCP_010, $REQ_MCP_014, $REQ_MCP_017, $REQ_MCP_030, $REQ_MCP_031: Tools call method with add-port-rule")
 
+        # $REQ_MCP_040: Get stats tool
+        get_stats_request = {
+            'jsonrpc': '2.0',
+            'id': 30,
+            'method': 'tools/call',
+            'params': {
+                'name': 'get-stats',
+                'arguments': {}
+            }
+        }
+
+        response = requests.post(endpoint_url, json=get_stats_request, headers=headers)
+        assert response.status_code == 200, "Get stats should succeed"  # $REQ_MCP_040
+
+        stats = json.loads(response.json()['result']['content'][0]['text'])
+        assert 'active_connections' in stats, "Stats should include active_connections"  # $REQ_MCP_040
+        assert 'relay_buffers' in stats, "Stats should include relay_buffers"  # $REQ_MCP_040
+        assert 'dns' in stats and 'hits' in stats['dns'], "Stats should include dns cache counters"  # $REQ_MCP_040
+
+        print(f"✓ $REQ_MCP_040: Get stats tool returns runtime statistics")
+
         # $REQ_MCP_012: Start logging tool
         temp_dir = tempfile.mkdtemp(prefix='rawprox_test_mcp_')
         temp_dirs.append(temp_dir)
@@ -0,0 +1,226 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#   "requests",
+# ]
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import glob
+import gzip
+import requests
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def run_proxy(log_dir, target, *extra):
+    local_port = find_free_port()
+    process = subprocess.Popen(
+        ['./release/rawprox.exe', f'{local_port}:127.0.0.1:{target.getsockname()[1]}', f'@{log_dir}',
+         '--filename-format', 'rawprox.ndjson', '--flush-millis', '200', *extra],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8'
+    )
+    time.sleep(0.5)
+    assert process.poll() is None, "Process failed to start"
+    return process, local_port
+
+def exchange(client, message):
+    client.sendall(message)
+    received = b''
+    while len(received) < len(message):
+        received += client.recv(65536)
+    time.sleep(0.05)
+
+def call_tool(endpoint, name, arguments=None):
+    response = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments or {}}
+    }, timeout=10)
+    result = response.json()
+    assert 'error' not in result, f"{name} failed: {result.get('error')}"
+    return result['result']['content'][0]['text']
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait(timeout=5)
+
+def decode(*paths):
+    result = subprocess.run(['./release/rawprox.exe', '--decode', *paths],
+                            capture_output=True, text=True, encoding='utf-8', timeout=30)
+    assert result.returncode == 0, f"--decode failed: {result.stderr}"
+    return result.stdout.splitlines()
+
+def traffic(lines):
+    """Connection events, as parsed JSON."""
+    return [event for event in map(json.loads, lines) if 'ConnID' in event]
+
+def main():
+    """Test the binary log format and --decode."""
+
+    processes = []
+    log_dir = "./tmp/test_binary_format"
+    target = start_echo_target()
+
+    try:
+        for suffix in ('ndjson', 'binary', 'rotated'):
+            if os.path.exists(f'{log_dir}_{suffix}'):
+                shutil.rmtree(f'{log_dir}_{suffix}')
+
+        # Test 1: Binary next to NDJSON via start-logging; decoding gives the same events
+        ndjson_dir = os.path.abspath(f'{log_dir}_ndjson')
+        binary_dir = os.path.abspath(f'{log_dir}_binary')
+        local_port = find_free_port()
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', '--mcp-port', '0', '--flush-millis', '200',
+             f'{local_port}:127.0.0.1:{target.getsockname()[1]}'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        processes.append(process)
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+        call_tool(endpoint, 'start-logging', {'directory': ndjson_dir, 'filename_format': 'rawprox.ndjson'})
+
+        # The connection opens before the binary destination starts, so its file has to declare it
+        early = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+        exchange(early, b'before binary logging\r\n')
+        call_tool(endpoint, 'start-logging', {
+            'directory': binary_dir, 'filename_format': 'rawprox.ndjson', 'log_format': 'binary'
+        })
+        for _ in range(10):
+            exchange(early, os.urandom(2048))
+        client = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+        exchange(client, b'GET / HTTP/1.1\r\nHost: "quoted"\r\n\r\n')
+        exchange(client, bytes(range(256)))
+        client.close()
+        early.close()
+        time.sleep(0.6)
+
+        stats = json.loads(call_tool(endpoint, 'get-stats'))
+        formats = {d['directory']: d['format'] for d in stats['log_buffers']['destinations']}
+        assert formats[binary_dir] == 'binary' and formats[ndjson_dir] == 'ndjson', "Stats should report the format"  # $REQ_LOG_024
+        call_tool(endpoint, 'stop-logging', {'directory': binary_dir})
+        call_tool(endpoint, 'stop-logging', {'directory': ndjson_dir})
+        time.sleep(0.4)
+        stop(process)
+
+        binary_path = os.path.join(binary_dir, 'rawprox.rpx')
+        ndjson_path = os.path.join(ndjson_dir, 'rawprox.ndjson')
+        assert os.path.exists(binary_path), "Binary files should use the .rpx extension"  # $REQ_LOG_024
+        assert not os.path.exists(os.path.join(binary_dir, 'rawprox.ndjson')), "No NDJSON file should be written"  # $REQ_LOG_024
+        with open(binary_path, 'rb') as f:
+            assert f.read(1) != b'{', "The file should hold binary records"  # $REQ_LOG_024
+        assert os.path.getsize(binary_path) < os.path.getsize(ndjson_path) * 0.6, "Binary payloads should not be escaped"  # $REQ_LOG_024
+        print("✓ $REQ_LOG_024: Binary destination writes raw payloads to .rpx files")
+
+        with open(ndjson_path, encoding='utf-8') as f:
+            expected = traffic(f.read().splitlines())
+        decoded_lines = decode(binary_path)
+        decoded = traffic(decoded_lines)
+        assert len(decoded) >= 14, f"Expected the events after binary logging started, got {len(decoded)}"  # $REQ_LOG_024
+        assert decoded == expected[-len(decoded):], "Decoded events should match the NDJSON destination"  # $REQ_CMD_019
+        assert 'event' not in decoded[0] and decoded[0]['from'] != 'unknown', "A declared connection should decode with its endpoints"  # $REQ_LOG_024
+        controls = [json.loads(line)['event'] for line in decoded_lines if 'ConnID' not in json.loads(line)]
+        assert 'start-logging' in controls and 'stop-logging' in controls, "Control events should decode unchanged"  # $REQ_LOG_024
+        print("✓ $REQ_CMD_019: --decode reproduces the NDJSON events")
+
+        with open(ndjson_path, encoding='utf-8') as f:
+            assert decode(ndjson_path) == f.read().splitlines(), "NDJSON input should pass through"  # $REQ_CMD_019
+        print("✓ $REQ_CMD_019: --decode passes NDJSON files through")
+
+        # Test 2: With size rotation and gzip, each file declares the connections it continues
+        rotated_dir = f'{log_dir}_rotated'
+        process, port = run_proxy(rotated_dir, target, '--log-format', 'binary', '--max-file-bytes', '3000', '--compress', 'gzip')
+        processes.append(process)
+        client = socket.create_connection(('127.0.0.1', port), timeout=5)
+        for i in range(12):
+            exchange(client, f'message {i} '.encode() + os.urandom(500))
+        client.close()
+        time.sleep(0.6)
+        stop(process)
+        files = [os.path.join(rotated_dir, 'rawprox.rpx.gz')]
+        files += sorted(glob.glob(os.path.join(rotated_dir, 'rawprox.*.rpx.gz')),
+                        key=lambda p: int(os.path.basename(p).split('.')[1]))
+        assert len(files) >= 3, f"Expected several sequence files, got {files}"  # $REQ_LOG_024
+        with gzip.open(files[1], 'rb') as f:
+            assert f.read(1) == b'\x05', "A continued file should start by declaring its connection"  # $REQ_LOG_024
+        events = traffic(decode(*files))
+        assert [e.get('event') for e in events][0] == 'open' and events[-1].get('event') == 'close', "Open and close should decode"  # $REQ_LOG_024
+        assert len({e['ConnID'] for e in events}) == 1, "Every file should decode the same connection"  # $REQ_LOG_024
+        assert sum(1 for e in events if 'data' in e) == 24, "Every data event should decode"  # $REQ_LOG_024
+        print("✓ $REQ_LOG_024: Rotated, compressed binary files declare connections and decode")
+
+        print("\n✓ All binary format tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait(timeout=5)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#   "requests",
+# ]
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import glob
+import requests
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def call_tool(endpoint, name, arguments=None):
+    response = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments or {}}
+    }, timeout=10)
+    result = response.json()
+    assert 'error' not in result, f"{name} failed: {result.get('error')}"
+    return result['result']['content'][0]['text']
+
+def round_trip(port, payload):
+    client = socket.create_connection(('127.0.0.1', port), timeout=5)
+    try:
+        client.sendall(payload)
+        client.recv(65536)
+    finally:
+        client.close()
+
+def open_paths(pid):
+    """Files the process holds open (Linux only)."""
+    paths = set()
+    for fd in glob.glob(f'/proc/{pid}/fd/*'):
+        try:
+            paths.add(os.readlink(fd))
+        except OSError:
+            pass
+    return paths
+
+def main():
+    """Test keeping log files open between flushes."""
+
+    process = None
+    log_dir = os.path.abspath("./tmp/test_keep_files_open")
+    target = start_echo_target()
+
+    try:
+        if os.path.exists(log_dir):
+            shutil.rmtree(log_dir)
+
+        local_port = find_free_port()
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', '--mcp-port', '0', '--flush-millis', '300',
+             f'{local_port}:127.0.0.1:{target.getsockname()[1]}'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+        call_tool(endpoint, 'start-logging', {
+            'directory': log_dir, 'filename_format': 'rawprox.ndjson', 'keep_files_open': True
+        })
+        log_file = os.path.join(log_dir, 'rawprox.ndjson')
+
+        round_trip(local_port, b'first')
+        time.sleep(1)
+        assert os.path.exists(log_file), "Log file should be written"  # $REQ_LOG_022
+        if sys.platform.startswith('linux'):
+            assert log_file in open_paths(process.pid), "Log file should stay open between flushes"  # $REQ_LOG_022
+        round_trip(local_port, b'second')
+        time.sleep(1)
+        with open(log_file, encoding='utf-8') as f:
+            data = [json.loads(line).get('data') for line in f]
+        assert 'first' in data and 'second' in data, "Events of consecutive flushes should be appended"  # $REQ_LOG_022
+        print("✓ $REQ_LOG_022: Log file kept open and appended across flushes")
+
+        # Move the file away: the next flush must write a new file at the path
+        moved = log_file + '.moved'
+        os.rename(log_file, moved)
+        moved_size = os.path.getsize(moved)
+        round_trip(local_port, b'third')
+        time.sleep(1)
+        assert os.path.getsize(moved) == moved_size, "A moved file should not be written to"  # $REQ_LOG_022
+        with open(log_file, encoding='utf-8') as f:
+            data = [json.loads(line).get('data') for line in f]
+        assert 'third' in data, "Events after the move should go to a new file at the path"  # $REQ_LOG_022
+        stats = json.loads(call_tool(endpoint, 'get-stats'))
+        destination = next(d for d in stats['log_buffers']['destinations'] if d['directory'] == log_dir)
+        assert destination['open_files']['reopens'] >= 1, "Moving the file should be counted as a reopen"  # $REQ_LOG_022
+        print("✓ $REQ_LOG_022: File moved externally is detected and reopened")
+
+        print("\n✓ All keep-files-open tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        if process:
+            try:
+                process.kill()
+                process.wait(timeout=5)
+            except Exception:
+                pass
+
+if __name__ == '__main__':
+    sys.exit(main())
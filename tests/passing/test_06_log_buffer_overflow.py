@@ -0,0 +1,151 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = []
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import glob
+import urllib.parse
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def send_chunks(port, count, size):
+    """Send count chunks of size bytes, waiting for each echo so every chunk is its own data event."""
+    client = socket.create_connection(('127.0.0.1', port), timeout=5)
+    try:
+        for i in range(count):
+            chunk = bytes([ord('a') + i % 26]) * size
+            client.sendall(chunk)
+            received = b''
+            while len(received) < size:
+                received += client.recv(65536)
+    finally:
+        client.close()
+
+def run_proxy(log_dir, target_port, policy, max_buffer_bytes=6000, flush_millis=1500):
+    """Proxy a burst of traffic through a small buffer budget and return the logged events."""
+    if os.path.exists(log_dir):
+        shutil.rmtree(log_dir)
+    local_port = find_free_port()
+    process = subprocess.Popen(
+        ['./release/rawprox.exe', f'{local_port}:127.0.0.1:{target_port}', f'@{log_dir}',
+         '--flush-millis', str(flush_millis), '--max-buffer-bytes', str(max_buffer_bytes), '--overflow-policy', policy],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8'
+    )
+    try:
+        time.sleep(0.5)
+        assert process.poll() is None, "Process failed to start"
+        send_chunks(local_port, 20, 1000)
+        time.sleep(flush_millis / 1000 + 2)
+    finally:
+        process.kill()
+        process.wait(timeout=5)
+
+    events = []
+    for path in glob.glob(os.path.join(log_dir, '*.ndjson')):
+        with open(path, encoding='utf-8') as f:
+            events.extend(json.loads(line) for line in f if line.strip())
+    return events
+
+def main():
+    """Test bounded log buffers, overflow policies and capture-gap events."""
+
+    target = start_echo_target()
+    target_port = target.getsockname()[1]
+
+    try:
+        # $REQ_LOG_020: drop-newest keeps the budget and reports what was lost
+        events = run_proxy('./tmp/test_overflow_drop', target_port, 'drop-newest')
+        assert events and events[0].get('event') == 'start-logging', "Control events should never be dropped"
+        gaps = [e for e in events if e.get('event') == 'capture-gap']
+        assert gaps, "Dropped events should be reported by a capture-gap event"
+        data_events = [e for e in events if 'data' in e]
+        assert len(data_events) < 40, "Events beyond the budget should be dropped"
+        conn_id = data_events[0]['ConnID'] if data_events else next(e['ConnID'] for e in events if 'ConnID' in e)
+        dropped = sum(g['dropped_events'] for g in gaps)
+        assert dropped > 0 and sum(g['dropped_bytes'] for g in gaps) > 0, "capture-gap should count dropped events and bytes"
+        assert any(conn_id in g['connections'] for g in gaps), "capture-gap should list drops per ConnID"
+        assert all('since' in g for g in gaps), "capture-gap should record when the gap started"
+        print("✓ $REQ_LOG_020: drop-newest drops events over budget and emits capture-gap")
+
+        # $REQ_LOG_020: drop-oldest never evicts control events, even with a budget smaller than them
+        events = run_proxy('./tmp/test_overflow_drop_oldest', target_port, 'drop-oldest',
+                           max_buffer_bytes=200, flush_millis=5000)
+        assert any(e.get('event') == 'start-logging' for e in events), "drop-oldest should keep start-logging"
+        assert any(e.get('event') == 'capture-gap' for e in events), "Evicted events should be reported by a capture-gap event"
+        print("✓ $REQ_LOG_020: drop-oldest keeps control events and the proxied request completes")
+
+        # $REQ_LOG_020: truncate keeps the start of each payload and its original length
+        events = run_proxy('./tmp/test_overflow_truncate', target_port, 'truncate')
+        truncated = [e for e in events if 'truncated' in e]
+        assert truncated, "Events over budget should be truncated"
+        for event in truncated:
+            assert event['truncated'] == 1000, "truncated should hold the original payload length"
+            assert len(urllib.parse.unquote_to_bytes(event['data'])) == 256, "Truncated data should keep 256 bytes"
+        print("✓ $REQ_LOG_020: truncate keeps the first 256 payload bytes with the original length")
+
+        print("\n✓ All log buffer overflow tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#   "requests",
+# ]
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import glob
+import gzip
+import zlib
+import requests
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def run_proxy(log_dir, target, *extra):
+    local_port = find_free_port()
+    process = subprocess.Popen(
+        ['./release/rawprox.exe', f'{local_port}:127.0.0.1:{target.getsockname()[1]}', f'@{log_dir}',
+         '--filename-format', 'rawprox.ndjson', '--flush-millis', '200', *extra],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8'
+    )
+    time.sleep(0.5)
+    assert process.poll() is None, "Process failed to start"
+    return process, local_port
+
+def send_messages(port, prefix, count):
+    client = socket.create_connection(('127.0.0.1', port), timeout=5)
+    try:
+        for i in range(count):
+            message = f'GET /api/{prefix}/{i} HTTP/1.1\r\nHost: example.test\r\nAccept: application/json\r\n\r\n'.encode()
+            client.sendall(message)
+            received = b''
+            while len(received) < len(message):
+                received += client.recv(65536)
+            time.sleep(0.05)
+    finally:
+        client.close()
+
+def call_tool(endpoint, name, arguments=None):
+    response = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments or {}}
+    }, timeout=10)
+    result = response.json()
+    assert 'error' not in result, f"{name} failed: {result.get('error')}"
+    return result['result']['content'][0]['text']
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait(timeout=5)
+
+def gzip_members(path):
+    """Number of gzip members in the file."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    members = 0
+    while data:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        decompressor.decompress(data)
+        assert decompressor.eof, "Every member should be complete"
+        data = decompressor.unused_data
+        members += 1
+    return members
+
+def paths(lines, prefix):
+    found = []
+    for line in lines:
+        event = json.loads(line)
+        data = event.get('data', '')
+        marker = f'/api/{prefix}/'
+        if marker in data:
+            found.append(data.split(marker)[1].split(' ')[0])
+    return found
+
+def main():
+    """Test compressed log output."""
+
+    processes = []
+    log_dir = "./tmp/test_log_compression"
+    target = start_echo_target()
+
+    try:
+        for codec in ('gzip', 'brotli'):
+            if os.path.exists(f'{log_dir}_{codec}'):
+                shutil.rmtree(f'{log_dir}_{codec}')
+
+        # Test 1: gzip files are readable while still being written, one member per flush
+        gzip_dir = f'{log_dir}_gzip'
+        process, port = run_proxy(gzip_dir, target, '--compress', 'gzip')
+        processes.append(process)
+        send_messages(port, 'a', 20)
+        time.sleep(0.6)
+        path = os.path.join(gzip_dir, 'rawprox.ndjson.gz')
+        assert os.path.exists(path), "Compressed file should get the .gz extension"  # $REQ_LOG_023
+        assert not os.path.exists(os.path.join(gzip_dir, 'rawprox.ndjson')), "No uncompressed file should be written"  # $REQ_LOG_023
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        assert paths(lines, 'a')[:20:2] == [str(i) for i in range(10)], "Events should decode while the file is being written"  # $REQ_LOG_023
+        assert gzip_members(path) >= 2, "Each flush should append its own member"  # $REQ_LOG_023
+        stop(process)
+        print("✓ $REQ_LOG_023: gzip output readable while written, one member per flush")
+
+        # Test 2: A restart appends members to the same file
+        process, port = run_proxy(gzip_dir, target, '--compress', 'gzip')
+        processes.append(process)
+        send_messages(port, 'b', 3)
+        time.sleep(0.6)
+        stop(process)
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        for line in lines:
+            json.loads(line)
+        assert paths(lines, 'a')[::2] == [str(i) for i in range(20)], "Events of the first run should remain"  # $REQ_LOG_023
+        assert paths(lines, 'b')[::2] == ['0', '1', '2'], "Events after a restart should be appended"  # $REQ_LOG_023
+        uncompressed = sum(len(line) + 1 for line in lines)
+        assert os.path.getsize(path) < uncompressed, "Output should be smaller than the NDJSON it holds"  # $REQ_LOG_023
+        print("✓ $REQ_LOG_023: Restart appends members to the compressed file")
+
+        # Test 3: Brotli via start-logging; stats report the codec and sizes
+        brotli_dir = os.path.abspath(f'{log_dir}_brotli')
+        local_port = find_free_port()
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', '--mcp-port', '0', '--flush-millis', '200',
+             f'{local_port}:127.0.0.1:{target.getsockname()[1]}'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        processes.append(process)
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+        call_tool(endpoint, 'start-logging', {
+            'directory': brotli_dir, 'filename_format': 'rawprox.ndjson', 'compression': 'brotli'
+        })
+        send_messages(local_port, 'c', 5)
+        time.sleep(0.6)
+        path = os.path.join(brotli_dir, 'rawprox.ndjson.br')
+        assert os.path.exists(path) and os.path.getsize(path) > 0, "Brotli file should get the .br extension"  # $REQ_LOG_023
+        stats = json.loads(call_tool(endpoint, 'get-stats'))
+        destination = next(d for d in stats['log_buffers']['destinations'] if d['directory'] == brotli_dir)
+        compression = destination['compression']
+        assert compression['codec'] == 'brotli', "Stats should report the codec"  # $REQ_LOG_023
+        assert 0 < compression['compressed_bytes'] < compression['uncompressed_bytes'], "Stats should report the sizes"  # $REQ_LOG_023
+        assert compression['compressed_bytes'] == os.path.getsize(path), "Compressed bytes should match the file"  # $REQ_LOG_023
+        stop(process)
+        print("✓ $REQ_LOG_023: Brotli output via start-logging, sizes in get-stats")
+
+        print("\n✓ All log compression tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait(timeout=5)
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#   "requests",
+# ]
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import urllib.parse
+import requests
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def call_tool(endpoint, name, arguments=None):
+    response = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments or {}}
+    }, timeout=10)
+    result = response.json()
+    assert 'error' not in result, f"{name} failed: {result.get('error')}"
+    return result['result']
+
+def tool_error(endpoint, name, arguments):
+    result = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments}
+    }, timeout=10).json()
+    return 'error' in result or result['result'].get('isError', False)
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait(timeout=5)
+
+def chatter(local_port, index, sent):
+    """Numbered messages, echoed back, so each connection's order can be checked."""
+    client = socket.create_connection(('127.0.0.1', local_port), timeout=10)
+    payload = b''.join(f'{index}:{i};'.encode() for i in range(400))
+    for start in range(0, len(payload), 37):
+        client.sendall(payload[start:start + 37])
+    received = b''
+    while len(received) < len(payload):
+        received += client.recv(65536)
+    client.close()
+    sent[index] = payload
+
+def main():
+    """Test the per-destination queue rings."""
+
+    process = None
+    log_dir = os.path.abspath("./tmp/test_log_rings")
+    target = start_echo_target()
+    target_port = target.getsockname()[1]
+
+    try:
+        if os.path.exists(log_dir):
+            shutil.rmtree(log_dir)
+
+        for args, message in ((['--log-rings', '-1'], '--log-rings'), (['--log-rings', '1025'], '--log-rings'),
+                              (['--log-ring-slots', '0'], '--log-ring-slots')):
+            result = subprocess.run(['./release/rawprox.exe', *args, '8080:example.com:80'],
+                                    capture_output=True, text=True, encoding='utf-8', timeout=10)
+            assert result.returncode == 1 and message in result.stderr, f"{args} should be rejected"  # $REQ_LOG_027
+        print("✓ $REQ_LOG_027: --log-rings and --log-ring-slots reject values out of range")
+
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', '--mcp-port', '0', '--flush-millis', '300'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+
+        local_port = find_free_port()
+        call_tool(endpoint, 'add-port-rule', {'local_port': local_port, 'target_host': '127.0.0.1', 'target_port': target_port})
+        assert tool_error(endpoint, 'start-logging', {'directory': log_dir, 'log_ring_slots': 0}), \
+            "log_ring_slots 0 should be rejected"  # $REQ_LOG_027
+        # Tiny rings, so they fill up and producers drain them
+        call_tool(endpoint, 'start-logging', {'directory': log_dir, 'filename_format': 'rawprox.ndjson',
+                                              'log_rings': 3, 'log_ring_slots': 3})
+        stats = json.loads(call_tool(endpoint, 'get-stats')['content'][0]['text'])
+        dest = stats['log_buffers']['destinations'][0]
+        assert dest['log_rings'] == 3 and dest['log_ring_slots'] == 4, f"Ring slots round up to a power of two, got {dest}"  # $REQ_LOG_027
+        print("✓ $REQ_LOG_027: start-logging sets the ring count and size")
+
+        sent = {}
+        clients = [threading.Thread(target=chatter, args=(local_port, i, sent)) for i in range(8)]
+        for client in clients:
+            client.start()
+        for client in clients:
+            client.join(timeout=60)
+        time.sleep(0.8)
+        stats = json.loads(call_tool(endpoint, 'get-stats')['content'][0]['text'])
+        dest = stats['log_buffers']['destinations'][0]
+        assert 'ring_full_events' in dest, "Stats should count events that found their ring full"  # $REQ_LOG_027
+        stop(process)
+
+        with open(os.path.join(log_dir, 'rawprox.ndjson'), encoding='utf-8') as f:
+            events = [json.loads(line) for line in f]
+        assert events[0].get('event') == 'start-logging', "Control events are never dropped"  # $REQ_LOG_027
+        gaps = [e for e in events if e.get('event') == 'capture-gap']
+        opens = {e['ConnID']: e for e in events if e.get('event') == 'open'}
+        assert len(opens) == 8, f"Expected 8 connections, got {len(opens)}"
+        complete = 0
+        for conn_id, opened in opens.items():
+            conn_events = [e for e in events if e.get('ConnID') == conn_id]
+            kinds = [e.get('event', 'data') for e in conn_events]
+            assert kinds[0] == 'open' and kinds[-1] == 'close', f"{conn_id}: open first and close last, got {kinds[:3]}...{kinds[-3:]}"  # $REQ_LOG_027
+            for from_client in (True, False):
+                data = b''.join(urllib.parse.unquote_to_bytes(e['data']) for e in conn_events
+                                if 'data' in e and (e['from'] == opened['from']) == from_client)
+                index = int(data.split(b':', 1)[0]) if data else None
+                if index is not None and data == sent[index]:
+                    complete += 1
+                else:
+                    assert gaps, f"{conn_id}: data is missing or out of order without a capture-gap event"  # $REQ_LOG_027
+        assert complete > 0, "Expected complete directions"
+        print(f"✓ $REQ_LOG_027: {complete} of 16 directions complete and in order through 3 rings of 4 slots, "
+              f"{dest['ring_full_events']} events found their ring full")
+
+        print("\n✓ All log ring tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    finally:
+        if process and process.poll() is None:
+            stop(process)
+        target.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,163 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = [
+#   "requests",
+# ]
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import json
+import glob
+import requests
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def call_tool(endpoint, name, arguments=None):
+    response = requests.post(endpoint, json={
+        'jsonrpc': '2.0', 'id': 1, 'method': 'tools/call',
+        'params': {'name': name, 'arguments': arguments or {}}
+    }, timeout=10)
+    result = response.json()
+    assert 'error' not in result, f"{name} failed: {result.get('error')}"
+    return result['result']['content'][0]['text']
+
+def destination_stats(endpoint, directory):
+    stats = json.loads(call_tool(endpoint, 'get-stats'))
+    return next(d for d in stats['log_buffers']['destinations'] if d['directory'] == directory)
+
+def main():
+    """Test that a destination over its buffer budget spills to disk and drains back in order."""
+
+    process = None
+    log_dir = "./tmp/test_spill_logs"
+    spill_dir = "./tmp/test_spill_scratch"
+    target = start_echo_target()
+
+    try:
+        for directory in (log_dir, spill_dir):
+            if os.path.exists(directory):
+                shutil.rmtree(directory)
+
+        local_port = find_free_port()
+        process = subprocess.Popen(
+            ['./release/rawprox.exe', '--mcp-port', '0', '--flush-millis', '2000',
+             f'{local_port}:127.0.0.1:{target.getsockname()[1]}'],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            text=True,
+            encoding='utf-8'
+        )
+        endpoint = json.loads(process.stdout.readline())['endpoint']
+        threading.Thread(target=lambda: process.stdout.read(), daemon=True).start()
+
+        call_tool(endpoint, 'start-logging', {
+            'directory': log_dir, 'max_buffer_bytes': 4096,
+            'overflow_policy': 'spill', 'spill_dir': spill_dir
+        })
+        call_tool(endpoint, 'stop-logging', {'directory': None})
+
+        # 40 data events of ~1.1 KB each within one flush interval: far over the 4 KB budget
+        client = socket.create_connection(('127.0.0.1', local_port), timeout=5)
+        for i in range(20):
+            chunk = bytes([ord('a') + i]) * 1000
+            client.sendall(chunk)
+            received = b''
+            while len(received) < len(chunk):
+                received += client.recv(65536)
+        client.close()
+
+        time.sleep(0.5)
+        spill = destination_stats(endpoint, log_dir)['spill']
+        assert spill['active'] and spill['backlog_bytes'] > 0, "Events over budget should be spilled"  # $REQ_LOG_021
+        assert glob.glob(os.path.join(spill_dir, '*.seg')), "Spilled events should be in segment files"  # $REQ_LOG_021
+        print("✓ $REQ_LOG_021: Events over the buffer budget are spilled to segment files")
+
+        time.sleep(4)
+        destination = destination_stats(endpoint, log_dir)
+        spill = destination['spill']
+        assert not spill['active'] and spill['backlog_bytes'] == 0, "Backlog should drain once the destination catches up"  # $REQ_LOG_021
+        assert spill['drained_bytes'] == spill['spilled_bytes'] > 0, "Everything spilled should be drained"  # $REQ_LOG_021
+        assert destination['dropped_events'] == 0, "Spilling should not drop events"  # $REQ_LOG_021
+        assert not glob.glob(os.path.join(spill_dir, '*.seg')), "Drained segments should be deleted"  # $REQ_LOG_021
+        print("✓ $REQ_LOG_021: Spilled backlog drained and segment files removed")
+
+        events = []
+        for path in glob.glob(os.path.join(log_dir, '*.ndjson')):
+            with open(path, encoding='utf-8') as f:
+                events.extend(json.loads(line) for line in f if line.strip())
+        data = [e for e in events if 'data' in e]
+        assert len(data) == 40, f"All 40 data events should be logged, got {len(data)}"  # $REQ_LOG_021
+        letters = [e['data'][0] for e in data]
+        expected = [chr(ord('a') + i) for i in range(20) for _ in range(2)]
+        assert letters == expected, "Spilled events should be written in their original order"  # $REQ_LOG_021
+        assert [e.get('event') for e in events if 'ConnID' in e and 'data' not in e] == ['open', 'close'], "open should precede data and close follow it"  # $REQ_LOG_021
+        assert not any(e.get('event') == 'capture-gap' for e in events), "No capture-gap when nothing was dropped"
+        print("✓ $REQ_LOG_021: Spilled events written to the destination in original order")
+
+        print("\n✓ All log spill tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        if process:
+            try:
+                process.kill()
+                process.wait(timeout=5)
+            except Exception:
+                pass
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,216 @@
+#!/usr/bin/env uvrun
+# /// script
+# requires-python = ">=3.8"
+# dependencies = []
+# ///
+
+import sys
+# Fix Windows console encoding
+if sys.stdout.encoding != 'utf-8':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.stderr.reconfigure(encoding='utf-8')
+
+import subprocess
+import time
+import os
+import shutil
+import socket
+import threading
+import gzip
+import struct
+
+def find_free_port():
+    """Find a free port by briefly opening and closing a socket."""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def start_echo_target():
+    """Start a TCP echo server on localhost."""
+    server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind(('127.0.0.1', 0))
+    server.listen(16)
+
+    def echo(conn):
+        try:
+            while True:
+                data = conn.recv(65536)
+                if not data:
+                    break
+                conn.sendall(data)
+        except OSError:
+            pass
+        conn.close()
+
+    def run():
+        while True:
+            try:
+                conn, _ = server.accept()
+            except OSError:
+                return
+            threading.Thread(target=echo, args=(conn,), daemon=True).start()
+
+    threading.Thread(target=run, daemon=True).start()
+    return server
+
+def run_proxy(log_dir, target, *extra):
+    local_port = find_free_port()
+    process = subprocess.Popen(
+        ['./release/rawprox.exe', f'{local_port}:127.0.0.1:{target.getsockname()[1]}', f'@{log_dir}',
+         '--filename-format', 'rawprox.ndjson', '--flush-millis', '200', *extra],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8'
+    )
+    time.sleep(0.5)
+    assert process.poll() is None, "Process failed to start"
+    return process, local_port
+
+def exchange(client, message):
+    client.sendall(message)
+    received = b''
+    while len(received) < len(message):
+        received += client.recv(65536)
+    time.sleep(0.05)
+
+def stop(process):
+    process.terminate()
+    try:
+        process.wait(timeout=5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait(timeout=5)
+
+def read_pcapng(data):
+    """Sections and packets of a pcapng file: (section count, [packet dict])."""
+    sections = 0
+    packets = []
+    position = 0
+    while position < len(data):
+        block_type, length = struct.unpack_from('<II', data, position)
+        assert length % 4 == 0 and position + length <= len(data), "Blocks should be whole and aligned"
+        assert struct.unpack_from('<I', data, position + length - 4)[0] == length, "Trailing length should match"
+        block = data[position:position + length]
+        if block_type == 0x0A0D0D0A:
+            assert struct.unpack_from('<I', block, 8)[0] == 0x1A2B3C4D, "Byte-order magic"
+            sections += 1
+        elif block_type == 1:
+            assert struct.unpack_from('<H', block, 8)[0] == 101, "Link type should be raw IP"
+        elif block_type == 6:
+            assert sections > 0, "Packets should follow a section header"
+            ts_high, ts_low, captured, original = struct.unpack_from('<IIII', block, 12)
+            packet = block[28:28 + captured]
+            assert packet[0] >> 4 == 4, "Loopback packets should be IPv4"
+            total_length = struct.unpack_from('>H', packet, 2)[0]
+            assert total_length == original, "IP length should be the original packet length"
+            src = '.'.join(map(str, packet[12:16]))
+            dst = '.'.join(map(str, packet[16:20]))
+            sport, dport, seq, ack = struct.unpack_from('>HHII', packet, 20)
+            flags = packet[33]
+            comment = None
+            options = 28 + ((captured + 3) & ~3)
+            if options < length - 4:
+                code, option_length = struct.unpack_from('<HH', block, options)
+                if code == 1:
+                    comment = block[options + 4:options + 4 + option_length].decode()
+            packets.append({
+                'time': ((ts_high << 32) | ts_low) / 1e6,
+                'src': (src, sport), 'dst': (dst, dport), 'seq': seq, 'ack': ack, 'flags': flags,
+                'payload': packet[40:], 'payload_length': original - 40, 'comment': comment
+            })
+        position += length
+    return sections, packets
+
+SYN, FIN, ACK = 0x02, 0x01, 0x10
+
+def main():
+    """Test pcapng output."""
+
+    processes = []
+    log_dir = "./tmp/test_pcapng_output"
+    target = start_echo_target()
+
+    try:
+        for suffix in ('plain', 'gzip'):
+            if os.path.exists(f'{log_dir}_{suffix}'):
+                shutil.rmtree(f'{log_dir}_{suffix}')
+
+        # Test 1: Handshake, data with tracked sequence numbers, and FIN exchange
+        plain_dir = f'{log_dir}_plain'
+        process, port = run_proxy(plain_dir, target, '--log-format', 'pcapng')
+        processes.append(process)
+        client = socket.create_connection(('127.0.0.1', port), timeout=5)
+        client_port = client.getsockname()[1]
+        messages = [b'GET / HTTP/1.1\r\n\r\n', bytes(range(256)) * 4, os.urandom(150000)]
+        for message in messages:
+            exchange(client, message)
+        client.close()
+        time.sleep(0.6)
+        stop(process)
+
+        path = os.path.join(plain_dir, 'rawprox.pcapng')
+        assert os.path.exists(path), "pcapng files should use the .pcapng extension"  # $REQ_LOG_025
+        with open(path, 'rb') as f:
+            sections, packets = read_pcapng(f.read())
+        assert sections == 1, "The file should start with one section header"  # $REQ_LOG_025
+        proxy = ('127.0.0.1', port)
+        peer = ('127.0.0.1', client_port)
+        assert [p['flags'] for p in packets[:3]] == [SYN, SYN | ACK, ACK], "An open should be a SYN handshake"  # $REQ_LOG_025
+        assert packets[0]['src'] == peer and packets[0]['dst'] == proxy, "Packets should show the client and listener"  # $REQ_LOG_025
+        assert packets[0]['comment'] and 'ConnID' in packets[0]['comment'], "The SYN should name the connection"  # $REQ_LOG_025
+        assert [p['flags'] & (FIN | SYN) for p in packets[-3:]] == [FIN, FIN, 0], "A close should be a FIN exchange"  # $REQ_LOG_025
+        print("✓ $REQ_LOG_025: Connections appear as TCP handshakes and FIN exchanges")
+
+        data = [p for p in packets[3:-3]]
+        sent = {peer: 1, proxy: 1}
+        streams = {peer: b'', proxy: b''}
+        for packet in data:
+            assert packet['seq'] == sent[packet['src']], "Sequence numbers should follow the bytes sent"  # $REQ_LOG_025
+            assert packet['ack'] == sent[packet['dst']], "Acks should follow the bytes received"  # $REQ_LOG_025
+            assert packet['payload_length'] <= 65000, "Large chunks should be split into packets"  # $REQ_LOG_025
+            sent[packet['src']] += packet['payload_length']
+            streams[packet['src']] += packet['payload']
+        expected = b''.join(messages)
+        assert streams[peer] == expected and streams[proxy] == expected, "Payloads should be captured in full"  # $REQ_LOG_025
+        assert packets[-3]['seq'] == sent[peer] and packets[-2]['seq'] == sent[proxy], "FINs should follow the data"  # $REQ_LOG_025
+        print("✓ $REQ_LOG_025: Data packets carry the payload with continuous sequence numbers")
+
+        # Test 2: Compressed files and a restart each start their own section
+        gzip_dir = f'{log_dir}_gzip'
+        for run in range(2):
+            process, port = run_proxy(gzip_dir, target, '--log-format', 'pcapng', '--compress', 'gzip')
+            processes.append(process)
+            client = socket.create_connection(('127.0.0.1', port), timeout=5)
+            exchange(client, f'run {run}'.encode())
+            client.close()
+            time.sleep(0.6)
+            stop(process)
+        with gzip.open(os.path.join(gzip_dir, 'rawprox.pcapng.gz'), 'rb') as f:
+            sections, packets = read_pcapng(f.read())
+        assert sections == 2, f"Each run should start a section, got {sections}"  # $REQ_LOG_025
+        payloads = [p['payload'] for p in packets if p['payload']]
+        assert payloads == [b'run 0', b'run 0', b'run 1', b'run 1'], "Both runs' packets should be readable"  # $REQ_LOG_025
+        print("✓ $REQ_LOG_025: Restarts append sections to compressed pcapng files")
+
+        print("\n✓ All pcapng output tests passed")
+        return 0
+
+    except AssertionError as e:
+        print(f"\n✗ Test failed: {e}")
+        return 1
+    except Exception as e:
+        print(f"\n✗ Unexpected error: {e}")
+        import traceback
+        traceback.print_exc()
+        return 1
+    finally:
+        target.close()
+        for process in processes:
+            if process.poll() is None:
+                process.kill()
+                process.wait(timeout=5)
+
+if __name__ == '__main__':
+    sys.exit(main())